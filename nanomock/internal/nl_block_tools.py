@@ -1,11 +1,57 @@
+import asyncio
+import json
 import time
 import unittest
 from itertools import islice
 from math import ceil, floor
 
 from nanomock.modules.nl_rpc import NanoRpc
-from nanomock.modules.nl_parse_config import ConfigParser, ConfigReadWrite
-from nanomock.modules.nl_nanolib import NanoLibTools, raw_high_precision_multiply
+from nanomock.modules.nl_block_corpus import BlockCorpusReader, BlockCorpusWriter, CORPUS_SUFFIX
+from nanomock.modules.nl_parse_config import ConfigReadWrite
+from nanomock.modules.nl_nanolib import NanoLibTools
+from nanomock.modules.nl_balance_planner import plan_account_split
+from nanomock.modules.nl_work_engine import WorkEngine
+from nanomock.modules.nl_corpus_cache import corpus_key
+
+# destination indexes of the account splitter are assigned breadth first since version 2,
+# the recursive (depth first) splitter of version 1 opened the same seed indexes in another tree
+SPLITTER_LAYOUT_VERSION = 2
+
+
+def _split_level(sources, first_index, number_of_accounts, split_count):
+    next_index = first_index
+    for source_index in sources:
+        if next_index >= number_of_accounts:
+            return
+        count = min(split_count, number_of_accounts - next_index)
+        yield source_index, range(next_index, next_index + count)
+        next_index = next_index + count
+
+
+async def iter_bounded(coroutines, limit):
+    """Runs coroutines with at most {limit} in flight, yields their results as they complete.
+
+    Coroutines are pulled from the (lazy) iterable only when a slot frees up
+    and the consumer asked for the next result, so a slow consumer throttles
+    the producer and memory stays bounded by {limit}.
+    """
+    coroutines = iter(coroutines)
+    pending = {
+        asyncio.ensure_future(coroutine)
+        for coroutine in islice(coroutines, limit)
+    }
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+                coroutine = next(coroutines, None)
+                if coroutine is not None:
+                    pending.add(asyncio.ensure_future(coroutine))
+    finally:
+        for task in pending:
+            task.cancel()
 
 
 class BlockGenerator():
@@ -13,28 +59,36 @@ class BlockGenerator():
     single_change_rep = None
 
     def __init__(self,
-                 rpc_url,
+                 rpc_url=None,
                  broadcast_blocks=False,
                  rpc_user=None,
                  rpc_password=None,
-                 log_to_console=False):
+                 log_to_console=False,
+                 config_parser=None,
+                 nano_rpc=None,
+                 work_engine=None):
 
-        self.conf_p = ConfigParser()
-        rpc_url = self.conf_p.get_nodes_rpc(
-        )[0] if rpc_url is None else rpc_url
+        if nano_rpc is None and rpc_url is None:
+            if config_parser is None:
+                raise ValueError("BlockGenerator needs one of rpc_url, nano_rpc or config_parser")
+            rpc_url = config_parser.get_nodes_rpc()[0]
 
         self.broadcast = broadcast_blocks
         self.log_to_console = log_to_console
         self.single_account_open_counter = 0
         self.nano_lib = NanoLibTools()
-        self.nano_rpc_default = NanoRpc(rpc_url,
-                                        username=rpc_user,
-                                        password=rpc_password)
+        # process pool used to sign and solve work of batched blocks (see iter_fork_depth)
+        self.work_engine = work_engine
+        # an engine created by get_work_engine belongs to this generator and is shut down by close()
+        self._owns_work_engine = False
+        self.nano_rpc_default = nano_rpc or NanoRpc(rpc_url,
+                                                    username=rpc_user,
+                                                    password=rpc_password)
 
     def get_nano_rpc_default(self):
         return self.nano_rpc_default
 
-    def blockgen_single_account_opener(
+    async def blockgen_single_account_opener(
             self,
             representative=None,
             source_key=None,  #
@@ -64,17 +118,18 @@ class BlockGenerator():
                                                     seed=source_seed,
                                                     index=source_index)
 
-        send_block = nano_rpc.create_send_block_pkey(source["private"],
-                                                     destination["account"],
-                                                     send_amount,
-                                                     broadcast=self.broadcast)
-
-        open_block = nano_rpc.create_open_block(destination["account"],
-                                                destination["private"],
-                                                send_amount,
-                                                representative,
-                                                send_block["hash"],
-                                                broadcast=self.broadcast)
+        send_block = await nano_rpc.create_send_block_pkey(
+            source["private"],
+            destination["account"],
+            send_amount,
+            broadcast=self.broadcast)
+
+        open_block = await nano_rpc.create_open_block(destination["account"],
+                                                      destination["private"],
+                                                      send_amount,
+                                                      representative,
+                                                      send_block["hash"],
+                                                      broadcast=self.broadcast)
         open_block["account_data"]["source_seed"] = destination_seed
         open_block["account_data"]["source_index"] = destination_index
 
@@ -125,38 +180,6 @@ class BlockGenerator():
                 f"Either source_private_key({source_private_key})   OR   source_seed({source_seed}) and source_index({source_index}) must not be None"
             )
 
-    def recursive_split(self, source_account_data, destination_seed,
-                        representative, number_of_accounts, splitting_depth,
-                        current_depth, final_account_balance_raw, split_count):
-
-        blocks_current_depth = self.blockgen_single_account_opener(
-            representative=representative,
-            source_key=source_account_data["private"],
-            destination_seed=destination_seed,
-            # destination_index=source_dest_account_data["index"] + 1,
-            accounts_keep_track=True,
-            increment_index=True,
-            number_of_accounts=number_of_accounts,
-            send_amount=int(
-                raw_high_precision_multiply(
-                    (split_count**(splitting_depth - current_depth + 1) -
-                     split_count) + 1, final_account_balance_raw)))
-
-        if len(blocks_current_depth) == 0:
-            return blocks_current_depth
-
-        blocks_next_depth = self.blockgen_account_splitter(
-            number_of_accounts=number_of_accounts,
-            destination_seed=destination_seed,
-            current_depth=current_depth + 1,
-            representative=representative,
-            source_private_key=blocks_current_depth[1]["account_data"]
-            ["private"],
-            final_account_balance_raw=final_account_balance_raw,
-            split_count=split_count)
-        # blocks_current_depth.extends(blocks_next_depth)
-        return blocks_current_depth + blocks_next_depth
-
     def get_spliting_depth(self, number_of_accounts, split_count):
         sum_l = 0
         for exponent in range(1, 128):
@@ -171,64 +194,207 @@ class BlockGenerator():
             accounts = accounts + (split_count**i)
         return accounts
 
-    def blockgen_account_splitter(self,
-                                  source_private_key=None,
-                                  source_seed=None,
-                                  source_index=0,
-                                  destination_seed=None,
-                                  number_of_accounts=1000,
-                                  current_depth=1,
-                                  split_count=2,
-                                  representative=None,
-                                  final_account_balance_raw=10**30,
-                                  nano_rpc=None):
-        '''create {split_count} new accounts from 1 account recursively until {number_of_accounts} is reached.
-           each account sends its funds to {split_count}  other accounts and keeps a minimum balance of {final_account_balance_raw}
-           returns 2 * {number_of_accounts} blocks
+    def get_split_levels(self, number_of_accounts, split_count):
+        """Assigns destination indexes level by level (breadth first).
+
+        Yields one lazy iterator per depth of (source_index, destination_indexes),
+        source_index None being the funding account. Every source opens its
+        destinations in one independent chain.
+        """
+        sources = [None]
+        next_index = 0
+        while next_index < number_of_accounts:
+            level_size = min(
+                len(sources) * split_count, number_of_accounts - next_index)
+            yield _split_level(sources, next_index, number_of_accounts,
+                               split_count)
+            sources = range(next_index, next_index + level_size)
+            next_index = next_index + level_size
+
+    async def _split_chain(self, nano_rpc, source_private_key,
+                           destination_seed, destination_indexes, send_amount,
+                           representative):
+        # sends of one source depend on each other, every open only on its send
+        blocks = []
+        for destination_index in destination_indexes:
+            destination = self.nano_lib.nanolib_account_data(
+                seed=destination_seed, index=destination_index)
+            send_block = await nano_rpc.create_send_block_pkey(
+                source_private_key,
+                destination["account"],
+                send_amount,
+                broadcast=self.broadcast)
+            blocks.append(send_block)
+            if not send_block["success"]:
+                break
+            open_block = await nano_rpc.create_open_block(
+                destination["account"],
+                destination["private"],
+                send_amount,
+                representative,
+                send_block["hash"],
+                broadcast=self.broadcast)
+            open_block["account_data"]["source_seed"] = destination_seed
+            open_block["account_data"]["source_index"] = destination_index
+            blocks.append(open_block)
+        return blocks
+
+    async def blockgen_account_splitter_iter(self,
+                                             source_private_key=None,
+                                             source_seed=None,
+                                             source_index=0,
+                                             destination_seed=None,
+                                             number_of_accounts=1000,
+                                             split_count=2,
+                                             representative=None,
+                                             final_account_balance_raw=10**30,
+                                             max_concurrency=32,
+                                             nano_rpc=None):
+        '''create {split_count} new accounts from 1 account, depth by depth until {number_of_accounts} is reached.
+           each account sends its funds to {split_count} other accounts and keeps a minimum balance of {final_account_balance_raw}
+           all chains of one depth are created concurrently (at most {max_concurrency} at a time).
+           yields 2 * {number_of_accounts} blocks in dependency order, new chains only start while the consumer keeps pulling
+           destination indexes are assigned depth by depth (see SPLITTER_LAYOUT_VERSION) : index i is funded by another
+           account than with the former depth first splitter, the set of opened indexes is the same
            '''
+        nano_rpc = nano_rpc or self.get_nano_rpc_default()
+        # every send amount is known before the first block is created
+        split_plan = plan_account_split(number_of_accounts, split_count,
+                                        final_account_balance_raw)
+        max_accounts_for_depth = self.get_accounts_for_depth(
+            split_count, split_plan.splitting_depth)
+        print(
+            f"Creating {number_of_accounts} of {max_accounts_for_depth} possible accounts for current splitting_depth : {split_plan.splitting_depth} and split_count {split_count}"
+        )
 
-        splitting_depth = self.get_spliting_depth(number_of_accounts,
-                                                  split_count)
-
-        if current_depth > splitting_depth:
-            return []  # end of recursion is reached
+        source_account_data = self.nano_lib.nanolib_account_data(
+            private_key=source_private_key,
+            seed=source_seed,
+            index=source_index)
+        source_balance = await nano_rpc.check_balance(
+            source_account_data["account"])
+        if source_balance is None:
+            raise ValueError(
+                f'Balance of {source_account_data["account"]} could not be read from {nano_rpc.get_url()}')
+        split_plan.validate(source_balance["balance_raw"], split_count)
+        if representative is None:  # keep the same representative for all opened accounts
+            representative = (await nano_rpc.account_info(
+                source_account_data["account"]))["representative"]
+
+        accounts_opened = 0
+        for current_depth, level in enumerate(
+                self.get_split_levels(number_of_accounts, split_count), 1):
+            send_amount = split_plan.amounts[current_depth - 1]
+            chains = (self._split_chain(
+                nano_rpc, source_account_data["private"]
+                if chain_source_index is None else
+                self.nano_lib.nanolib_account_data(
+                    seed=destination_seed, index=chain_source_index)["private"],
+                destination_seed, destination_indexes, send_amount,
+                representative) for chain_source_index, destination_indexes in level)
+
+            # a depth only starts once every account of the previous depth is opened
+            async for chain_blocks in iter_bounded(chains, max_concurrency):
+                accounts_opened = accounts_opened + len(chain_blocks) // 2
+                if self.log_to_console:
+                    print("accounts opened:  {:>6}".format(accounts_opened),
+                          end='\r')
+                for block in chain_blocks:
+                    yield block
+
+    async def blockgen_account_splitter(self,
+                                        source_private_key=None,
+                                        source_seed=None,
+                                        source_index=0,
+                                        destination_seed=None,
+                                        number_of_accounts=1000,
+                                        split_count=2,
+                                        representative=None,
+                                        final_account_balance_raw=10**30,
+                                        max_concurrency=32,
+                                        nano_rpc=None):
+        '''returns the blocks of blockgen_account_splitter_iter as one list, in dependency order'''
+        return [
+            block async for block in self.blockgen_account_splitter_iter(
+                source_private_key=source_private_key,
+                source_seed=source_seed,
+                source_index=source_index,
+                destination_seed=destination_seed,
+                number_of_accounts=number_of_accounts,
+                split_count=split_count,
+                representative=representative,
+                final_account_balance_raw=final_account_balance_raw,
+                max_concurrency=max_concurrency,
+                nano_rpc=nano_rpc)
+        ]
+
+    async def blockgen_account_splitter_cached(self,
+                                               corpus_cache,
+                                               source_private_key=None,
+                                               source_seed=None,
+                                               source_index=0,
+                                               destination_seed=None,
+                                               number_of_accounts=1000,
+                                               split_count=2,
+                                               representative=None,
+                                               final_account_balance_raw=10**30,
+                                               max_concurrency=32):
+        '''returns the path of a binary corpus holding the blocks of blockgen_account_splitter_iter.
+           the blocks are only generated when {corpus_cache} has no corpus for the same source frontier, parameters and difficulty
+           the source frontier is read from the node ledger, the local frontier store may be ahead of it (blocks created but not published)
+           on a hit the frontier store is moved to the heads of the cached corpus, as if its blocks had just been created
+           '''
+        if self.broadcast:
+            raise ValueError("Cached corpora are replayed, not broadcast while generated")
         nano_rpc = self.get_nano_rpc_default()
-
         source_account_data = self.nano_lib.nanolib_account_data(
             private_key=source_private_key,
             seed=source_seed,
             index=source_index)
-        if current_depth == 1:
-            max_accounts_for_depth = self.get_accounts_for_depth(
-                split_count, splitting_depth)
-            print(
-                f"Creating {number_of_accounts} of {max_accounts_for_depth} possible accounts for current splitting_depth : {splitting_depth} and split_count {split_count}"
-            )
-            # reset variable when multiple tests run successively
-            self.single_account_open_counter = 0
-            unittest.TestCase().assertGreater(
-                int(
-                    nano_rpc.check_balance(
-                        source_account_data["account"])["balance_raw"]),
-                int(
-                    raw_high_precision_multiply(number_of_accounts,
-                                                final_account_balance_raw)))
-            if representative is None:  # keep the same representative for all blocks
-                representative = nano_rpc.account_info(
-                    source_account_data["account"]
-                )["representative"]  # keep the same representative for all opened accounts
-
-        all_blocks = []
-        for _ in range(0, split_count):
-            all_blocks.extend(
-                self.recursive_split(source_account_data, destination_seed,
-                                     representative, number_of_accounts,
-                                     splitting_depth, current_depth,
-                                     final_account_balance_raw, split_count))
-
-        if current_depth == 1:
-            self.single_account_open_counter = 0  # reset counter for next call
-        return all_blocks
+        source_info = await nano_rpc.account_info(source_account_data["account"])
+        if not isinstance(source_info, dict) or "frontier" not in source_info:
+            raise ValueError(
+                f'No ledger frontier for {source_account_data["account"]} : {source_info}')
+        key = corpus_key(
+            generator="account_splitter",
+            layout_version=SPLITTER_LAYOUT_VERSION,
+            source_account=source_account_data["account"],
+            source_frontier=source_info["frontier"],
+            source_balance=source_info["balance"],
+            representative=representative or source_info["representative"],
+            destination_seed=destination_seed,
+            number_of_accounts=number_of_accounts,
+            split_count=split_count,
+            final_account_balance_raw=final_account_balance_raw,
+            difficulty=(await nano_rpc.difficulty_cache.get())["network_minimum"])
+
+        generated = False
+
+        async def generate(path):
+            nonlocal generated
+            generated = True
+            await BlockReadWrite().write_blocks_stream(
+                self.blockgen_account_splitter_iter(
+                    source_private_key=source_account_data["private"],
+                    destination_seed=destination_seed,
+                    number_of_accounts=number_of_accounts,
+                    split_count=split_count,
+                    representative=representative,
+                    final_account_balance_raw=final_account_balance_raw,
+                    max_concurrency=max_concurrency), path)
+
+        path = await corpus_cache.get_or_generate(key, generate)
+        if not generated:
+            self._set_frontiers_from_corpus(nano_rpc, path)
+        return path
+
+    def _set_frontiers_from_corpus(self, nano_rpc, path):
+        # blocks of a corpus are in chain order, the last block of each account is its head
+        with BlockCorpusReader(path) as reader:
+            for block_hash, json_block in reader:
+                nano_rpc.frontier_store.set(json_block["account"], block_hash,
+                                            json_block["balance"],
+                                            json_block["representative"])
 
     def get_hashes_from_blocks(self, blocks):
         if isinstance(blocks, list):
@@ -237,105 +403,198 @@ class BlockGenerator():
         elif isinstance(blocks, dict):
             return blocks.get("hash", "")
 
-    def make_deep_forks(self,
-                        source_seed,
-                        source_index,
-                        dest_seed,
-                        amount_raw,
-                        peer_count,
-                        forks_per_peer=1,
-                        max_depth=5,
-                        current_depth=0):
-        fork_blocks = {"gap": [], "forks": []}
+    async def make_deep_forks_iter(self,
+                                   source_seed,
+                                   source_index,
+                                   dest_seed,
+                                   amount_raw,
+                                   peer_count,
+                                   forks_per_peer=1,
+                                   max_depth=5,
+                                   current_depth=0):
+        '''yields ("gap", block) for the gap send, then ("forks", block) for every fork block, level by level'''
         nano_rpc = self.get_nano_rpc_default()
-        send_block = nano_rpc.create_block(
+        send_block = await nano_rpc.create_block(
             "send",
             source_seed=source_seed,
             source_index=source_index,
-            destination_account=nano_rpc.generate_account(
-                source_seed, source_index)["account"],
+            destination_account=self.nano_lib.nanolib_account_data(
+                seed=source_seed, index=source_index)["account"],
             amount_raw=amount_raw,
             read_in_memory=False,
             add_in_memory=True)
 
-        fork_blocks["gap"].append(nano_rpc.get_block_result(send_block, False))
-
-        fork_blocks["forks"] = self.recursive_fork_depth(
-            source_seed,
-            source_index,
-            dest_seed,
-            amount_raw,
-            peer_count,
-            forks_per_peer=forks_per_peer,
-            max_depth=max_depth,
-            current_depth=current_depth)
+        yield "gap", await nano_rpc.get_block_result(send_block, False)
 
+        async for block in self.iter_fork_depth(source_seed,
+                                                source_index,
+                                                dest_seed,
+                                                amount_raw,
+                                                peer_count,
+                                                forks_per_peer=forks_per_peer,
+                                                max_depth=max_depth,
+                                                current_depth=current_depth):
+            yield "forks", block
+
+    async def make_deep_forks(self,
+                              source_seed,
+                              source_index,
+                              dest_seed,
+                              amount_raw,
+                              peer_count,
+                              forks_per_peer=1,
+                              max_depth=5,
+                              current_depth=0):
+        fork_blocks = {"gap": [], "forks": []}
+        async for kind, block in self.make_deep_forks_iter(
+                source_seed,
+                source_index,
+                dest_seed,
+                amount_raw,
+                peer_count,
+                forks_per_peer=forks_per_peer,
+                max_depth=max_depth,
+                current_depth=current_depth):
+            fork_blocks[kind].append(block)
         return fork_blocks
 
-    def recursive_fork_depth(self,
-                             source_seed,
-                             source_index,
-                             dest_seed,
-                             amount_raw,
-                             peer_count,
-                             forks_per_peer=1,
-                             max_depth=5,
-                             current_depth=0):
-        res = []
-        if current_depth >= max_depth:
-            return res
-
+    def get_work_engine(self):
+        if self.work_engine is None:
+            self.work_engine = self.get_nano_rpc_default().work_engine
+        if self.work_engine is None:
+            self.work_engine = WorkEngine()
+            self._owns_work_engine = True
+        return self.work_engine
+
+    def close(self):
+        if self._owns_work_engine:
+            self.work_engine.shutdown()
+            self.work_engine = None
+            self._owns_work_engine = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    async def _get_frontier(self, nano_rpc, account):
+        frontier_record = nano_rpc.frontier_store.get(account)
+        if frontier_record is not None:
+            return frontier_record.to_account_info()
+        return await nano_rpc.account_info(account)
+
+    def _fork_block(self, lib_block, private_key, sub_type, amount_raw):
+        # same layout as NanoRpc.create_block
+        block = {
+            "hash": lib_block.block_hash,
+            "difficulty": lib_block.difficulty,
+            "block": json.loads(lib_block.json()),
+            "private": private_key,
+            "subtype": sub_type,
+            "amount_raw": amount_raw,
+            "success": True,
+            "error": None
+        }
+        block["block"]["subtype"] = sub_type
+        return block
+
+    async def iter_fork_depth(self,
+                              source_seed,
+                              source_index,
+                              dest_seed,
+                              amount_raw,
+                              peer_count,
+                              forks_per_peer=1,
+                              max_depth=5,
+                              current_depth=0):
+        '''yields the blocks of every fork level from {current_depth} to {max_depth}, one level after the other.
+           each level forks {forks_per_peer * peer_count} sends on the frontier of one account and opens every destination,
+           the first destination is the forked account of the next level.
+           keys are derived locally, every level is signed and worked as one batch by the work engine
+           '''
         nano_rpc = self.get_nano_rpc_default()
-        next_depth = current_depth + 1
-        current_dest_start_index = (forks_per_peer * peer_count *
-                                    next_depth) + next_depth
-        previous_dest_start_index = (forks_per_peer * peer_count *
-                                     current_depth) + current_depth
-
-        # current_dest_start_index = (100 ** next_depth)
-        # previous_dest_start_index = 100 ** current_depth
-
-        for i in range(0, forks_per_peer * peer_count):
-            dest_index = current_dest_start_index + i
-            dest_account = nano_rpc.generate_account(dest_seed,
-                                                     dest_index)["account"]
-            send_block = nano_rpc.create_block(
-                "send",
-                source_seed=source_seed,
-                # source_index=source_index if current_depth == 0 else 100 ** current_depth,
-                source_index=source_index
-                if current_depth == 0 else previous_dest_start_index,
-                destination_account=dest_account,
-                amount_raw=amount_raw,
-                read_in_memory=True,
-                add_in_memory=False)
-
-            receive_block = nano_rpc.create_block(
-                "receive",
-                source_seed=dest_seed,
-                source_index=dest_index,
-                destination_account=dest_account,
-                representative=dest_account,
-                amount_raw=amount_raw,
-                link=send_block["hash"],
-                read_in_memory=False,
-                add_in_memory=True,
-            )
-            res.append(nano_rpc.get_block_result(send_block, False))
-            res.append(nano_rpc.get_block_result(receive_block, False))
-
-            next_res = self.recursive_fork_depth(dest_seed,
-                                                 dest_index,
-                                                 dest_seed,
-                                                 amount_raw,
-                                                 peer_count,
-                                                 max_depth=max_depth,
-                                                 current_depth=next_depth)
-            res.extend(next_res)
-        # print(
-        #     ">>>>DEBUG", "Current_depth : {:>2}  results {:>6}".format(
-        #         current_depth, len(res)))
-        return res
+        work_engine = self.get_work_engine()
+        fork_count = forks_per_peer * peer_count
+        difficulty = (await nano_rpc.difficulty_cache.get())["network_minimum"]
+
+        if current_depth == 0:
+            source = self.nano_lib.nanolib_account_data(seed=source_seed,
+                                                        index=source_index)
+        else:
+            source = self.nano_lib.nanolib_account_data(
+                seed=dest_seed, index=fork_count * current_depth + current_depth)
+        source_info = await self._get_frontier(nano_rpc, source["account"])
+
+        for depth in range(current_depth, max_depth):
+            dest_start_index = fork_count * (depth + 1) + depth + 1
+            destinations = [
+                self.nano_lib.nanolib_account_data(seed=dest_seed,
+                                                   index=dest_start_index + i)
+                for i in range(fork_count)
+            ]
+
+            send_params, open_params = [], []
+            for destination in destinations:
+                send = {
+                    "account": source["account"],
+                    "representative": source_info["representative"],
+                    "previous": source_info["frontier"],
+                    "balance": int(source_info["balance"]) - int(amount_raw),
+                    "link": destination["public"],
+                }
+                # the hash doesn't depend on signature and work, opens can be built in the same batch
+                send_hash = self.nano_lib.get_state_block(**send).block_hash
+                send_params.append({**send, "key": source["private"], "difficulty": difficulty})
+                open_params.append({
+                    "account": destination["account"],
+                    "representative": destination["account"],
+                    "previous": None,
+                    "balance": int(amount_raw),
+                    "link": send_hash,
+                    "key": destination["private"],
+                    "difficulty": difficulty
+                })
+
+            lib_blocks = await work_engine.create_state_blocks(send_params + open_params)
+
+            for i, destination in enumerate(destinations):
+                send_block = self._fork_block(lib_blocks[i], source["private"],
+                                              "send", amount_raw)
+                open_block = self._fork_block(lib_blocks[fork_count + i],
+                                              destination["private"], "open",
+                                              amount_raw)
+                nano_rpc.frontier_store.set(destination["account"],
+                                            open_block["hash"], int(amount_raw),
+                                            destination["account"])
+                yield await nano_rpc.get_block_result(send_block, False)
+                yield await nano_rpc.get_block_result(open_block, False)
+
+            # the next level forks the first destination of this level
+            source = destinations[0]
+            source_info = nano_rpc.frontier_store.get(
+                source["account"]).to_account_info()
+
+    async def recursive_fork_depth(self,
+                                   source_seed,
+                                   source_index,
+                                   dest_seed,
+                                   amount_raw,
+                                   peer_count,
+                                   forks_per_peer=1,
+                                   max_depth=5,
+                                   current_depth=0):
+        return [
+            block async for block in self.iter_fork_depth(
+                source_seed,
+                source_index,
+                dest_seed,
+                amount_raw,
+                peer_count,
+                forks_per_peer=forks_per_peer,
+                max_depth=max_depth,
+                current_depth=current_depth)
+        ]
 
 
 class BlockReadWrite():
@@ -348,7 +607,10 @@ class BlockReadWrite():
                               seeds=False,
                               hashes=False,
                               blocks=False):
-        res = self.conf_rw.read_json(path)
+        if path.endswith(".jsonl"):
+            res = self.read_blocks_stream(path)
+        else:
+            res = self.conf_rw.read_json(path)
         if seeds:
             return res["s"]
         if hashes:
@@ -377,6 +639,47 @@ class BlockReadWrite():
         res = {"h": hash_list, "s": seed_list, "b": block_list}
         self.conf_rw.write_json(path, res)
 
+    def iter_blocks_from_disk(self, path):
+        """Yields {"h": hash, "b": block, "s": seed} one by one from a file written by BlockStreamWriter"""
+        with open(path, "r", encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def open_blocks_corpus(self, path):
+        return BlockCorpusReader(path)
+
+    def read_blocks_stream(self, path):
+        # same layout as read_json on a file written by write_blocks_to_disk
+        hash_list, seed_list, block_list = [], set(), []
+        for entry in self.iter_blocks_from_disk(path):
+            hash_list.append(entry["h"])
+            block_list.append(entry["b"])
+            if entry.get("s") is not None:
+                seed_list.add(entry["s"])
+        return {"h": [hash_list], "s": [sorted(seed_list)], "b": [block_list]}
+
+    async def write_blocks_stream(self, rpc_blocks, path):
+        """Writes every block of a sync or async iterable to {path} as soon as it is produced.
+
+        Nothing is buffered beyond the file buffer, pulling the next block only
+        after the current one is written. Paths ending in CORPUS_SUFFIX get the
+        binary corpus format (BlockCorpusWriter), any other path JSON lines.
+        Memory stays flat for corpora too : the index keeps at most
+        INDEX_RUN_ENTRIES entries in memory and spills the rest to disk.
+        Returns the number of blocks written.
+        """
+        writer_cls = BlockCorpusWriter if path.endswith(
+            CORPUS_SUFFIX) else BlockStreamWriter
+        with writer_cls(path) as writer:
+            if hasattr(rpc_blocks, "__aiter__"):
+                async for rpc_block in rpc_blocks:
+                    writer.write(rpc_block)
+            else:
+                for rpc_block in rpc_blocks:
+                    writer.write(rpc_block)
+            return writer.count
+
     def extract_hashes(self, rpc_block_list):
         return list(map(lambda x: x["hash"], rpc_block_list))
 
@@ -411,3 +714,41 @@ class BlockReadWrite():
             tc.assertTrue(blocks["success"])
         else:
             tc.fail("Blocks must be of list or dict type")
+
+
+class BlockStreamWriter():
+    """Appends block results to a JSON lines file, one {"h", "b", "s"} object per line."""
+
+    def __init__(self, path, flush_every=1000):
+        self.path = path
+        self.flush_every = flush_every
+        self.count = 0
+        self._file = None
+        self._tc = unittest.TestCase()
+
+    def open(self):
+        self._file = open(self.path, "w", encoding='utf-8')
+        return self
+
+    def write(self, rpc_block):
+        self._tc.assertTrue(rpc_block["success"])
+        entry = {"h": rpc_block["hash"], "b": rpc_block["block"]}
+        source_seed = rpc_block.get("account_data", {}).get("source_seed")
+        if source_seed is not None:
+            entry["s"] = source_seed
+        self._file.write(json.dumps(entry, separators=(",", ":")))
+        self._file.write("\n")
+        self.count = self.count + 1
+        if self.count % self.flush_every == 0:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
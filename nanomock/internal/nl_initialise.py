@@ -1,16 +1,31 @@
+import json
+
+from nano_lib_py import Block
+
 from nanomock.modules.nl_rpc import NanoRpc
-from nanomock.modules.nl_nanolib import raw_high_precision_percent
+from nanomock.modules.nl_rpc_pool import NanoRpcRegistry
+from nanomock.modules.nl_block_publisher import ALREADY_PUBLISHED_ERRORS
+from nanomock.modules.nl_corpus_cache import CorpusCache, corpus_key
+from nanomock.modules.nl_balance_planner import plan_weight_distribution
 from nanomock.modules.nl_parse_config import ConfigParser
 from nanomock.internal.utils import get_mock_logger
 
+GENESIS_BALANCE = 340282366920938463463374607431768211455
+# bump when the bundle layout or the way initial blocks are built changes
+BUNDLE_VERSION = 2
+
 
 class InitialBlocks:
 
-    def __init__(self, config_parser: ConfigParser, rpc_url, logger=None):
+    def __init__(self, config_parser: ConfigParser, rpc_url, logger=None, rpc_registry=None,
+                 bundle_cache: CorpusCache = None):
         logger = logger or get_mock_logger()
         self.logger = logger
-        self.nanorpc = NanoRpc(rpc_url)
+        self.rpc_registry = rpc_registry or NanoRpcRegistry()
+        self.nanorpc = self.rpc_registry.get(rpc_url)
         self.conf_p = config_parser
+        # optional cache of precomputed initial blocks, keyed by get_bundle_key
+        self.bundle_cache = bundle_cache
 
     def __epoch_link(self, epoch: int):
         message = f"epoch v{epoch} block"
@@ -18,22 +33,22 @@ class InitialBlocks:
         link = as_hex.upper().ljust(64, '0')
         return link
 
-    async def __publish_epochs(self):
-        e = 1
-        await self.__log_active_difficulty()
-        while e <= self.conf_p.get_all()["epoch_count"]:
-            link = self.__epoch_link(e)
-            epoch_block = await self.nanorpc.create_epoch_block(
-                link,
-                self.conf_p.get_genesis_account_data()["private"],
-                self.conf_p.get_genesis_account_data()["account"],
-            )
-            self.logger.append_log(
-                "InitialBlocks", "INFO",
-                f"EPOCH {e} sent by genesis : HASH {epoch_block['hash']}"
-            )
-            await self.__log_active_difficulty()
-            e += 1
+    async def create_node_wallet(self,
+                                 rpc_url,
+                                 node_name,
+                                 private_key=None,
+                                 seed=None):
+        node_rpc = self.rpc_registry.get(rpc_url)
+
+        if private_key != None:
+            wallet = await node_rpc.wallet_create()
+            account = await node_rpc.wallet_add(wallet["wallet"], private_key)
+        if seed != None:
+            wallet = await node_rpc.wallet_create(seed=seed)
+            account = await node_rpc.generate_account(seed, 0)
+        self.logger.append_log(
+            "InitialBlocks", "INFO",
+            f'WALLET {wallet["wallet"]} CREATED FOR {node_name} WITH ACCOUNT {account.get("account")}')
 
     async def __log_active_difficulty(self):
         diff = await self.nanorpc.active_difficulty()
@@ -42,37 +57,62 @@ class InitialBlocks:
             f'current_diff : [{diff["network_current"]}]  current_receive_diff: [{diff["network_receive_current"]}]'
         )
 
-    async def __publish_canary(self):
-
-        fv_canary_send_block = await self.nanorpc.create_send_block_pkey(
-            self.conf_p.get_genesis_account_data()["private"],
-            self.conf_p.get_canary_account_data()["account"], 1)
-        self.logger.append_log(
-            "InitialBlocks", "INFO",
-            "SEND FINAL VOTES CANARY BLOCK FROM {} To {} : HASH {}".format(
-                self.conf_p.get_genesis_account_data()["account"],
-                self.conf_p.get_canary_account_data()["account"],
-                fv_canary_send_block["hash"]))
-
-        fv_canary_open_block = await self.nanorpc.create_open_block(
-            self.conf_p.get_canary_account_data()["account"],
-            self.conf_p.get_canary_account_data()["private"], 1,
-            self.conf_p.get_genesis_account_data()["account"],
-            fv_canary_send_block["hash"])
-        self.logger.append_log(
-            "InitialBlocks", "INFO",
-            "OPENED CANARY ACCOUNT {} : HASH {}".format(
-                self.conf_p.get_canary_account_data()["account"],
-                fv_canary_open_block["hash"]))
-
-    async def __send_to_burn(self):
+    async def __add_block(self, nano_rpc, pipeline, message, sub_type, **kwargs):
+        # blocks are created locally on top of the frontier store, nothing is published yet
+        block = await nano_rpc.create_block(sub_type, offline=True, **kwargs)
+        if not block["success"]:
+            self.logger.append_log("InitialBlocks", "ERROR",
+                                   f'{sub_type} block not created : {block["error"]}')
+            return None
+        pipeline.append((block, message.format(hash=block["hash"])))
+        return block
+
+    async def __build_epochs(self, nano_rpc, pipeline):
+        genesis_account_data = self.conf_p.get_genesis_account_data()
+        for e in range(1, self.conf_p.get_all()["epoch_count"] + 1):
+            await self.__add_block(
+                nano_rpc,
+                pipeline,
+                f"EPOCH {e} sent by genesis : HASH {{hash}}",
+                "epoch",
+                source_private_key=genesis_account_data["private"],
+                destination_account=genesis_account_data["account"],
+                link=self.__epoch_link(e))
+
+    async def __build_canary(self, nano_rpc, pipeline, opens):
+        genesis_account = self.conf_p.get_genesis_account_data()["account"]
+        canary_account_data = self.conf_p.get_canary_account_data()
+
+        fv_canary_send_block = await self.__add_block(
+            nano_rpc,
+            pipeline,
+            "SEND FINAL VOTES CANARY BLOCK FROM {} To {} : HASH {{hash}}".format(
+                genesis_account, canary_account_data["account"]),
+            "send",
+            source_private_key=self.conf_p.get_genesis_account_data()["private"],
+            destination_account=canary_account_data["account"],
+            amount_raw=1)
+        if fv_canary_send_block is None:
+            return
+
+        await self.__add_block(
+            nano_rpc,
+            opens,
+            "OPENED CANARY ACCOUNT {} : HASH {{hash}}".format(canary_account_data["account"]),
+            "receive",
+            source_private_key=canary_account_data["private"],
+            destination_account=canary_account_data["account"],
+            representative=genesis_account,
+            amount_raw=1,
+            link=fv_canary_send_block["hash"])
+
+    async def __build_burn(self, nano_rpc, pipeline):
         if "burn_amount" not in self.conf_p.get_all():
             self.logger.debug("[burn_amount] is not set. exit send_to_burn()")
             return False
 
         genesis_account_data = self.conf_p.get_genesis_account_data()
-        genesis_balance_data = await self.nanorpc.check_balance(genesis_account_data["account"])
-        genesis_balance = int(genesis_balance_data["balance_raw"])
+        genesis_balance = self.__get_genesis_balance(nano_rpc)
 
         if int(self.conf_p.get_all()["burn_amount"]) > genesis_balance:
             self.logger.append_log(
@@ -80,138 +120,247 @@ class InitialBlocks:
                 "[burn_amount] exceeds genesis balance. exit send_to_burn()")
             return False
 
-        send_block = await self.nanorpc.create_send_block_pkey(
-            self.conf_p.get_genesis_account_data()["private"],
-            self.conf_p.get_burn_account_data()["account"],
-            self.conf_p.get_all()["burn_amount"])
-
-        self.logger.append_log(
-            "InitialBlocks", "INFO",
-            "SENT {:>40} FROM {} To {} : HASH {}".format(
-                send_block["amount_raw"],
-                self.conf_p.get_genesis_account_data()["account"],
-                self.conf_p.get_burn_account_data()["account"],
-                send_block["hash"]))
-
-    async def __convert_weight_percentage_to_balance(self):
-        balance = await self.nanorpc.check_balance(
-            self.conf_p.get_genesis_account_data()["account"],
-            include_only_confirmed=False)
-        genesis_balance = int(balance["balance_raw"])
-
-        genesis_remaing = genesis_balance
+        await self.__add_block(
+            nano_rpc,
+            pipeline,
+            "SENT {:>40} FROM {} To {} : HASH {{hash}}".format(
+                self.conf_p.get_all()["burn_amount"],
+                genesis_account_data["account"],
+                self.conf_p.get_burn_account_data()["account"]),
+            "send",
+            source_private_key=genesis_account_data["private"],
+            destination_account=self.conf_p.get_burn_account_data()["account"],
+            amount_raw=self.conf_p.get_all()["burn_amount"])
+        return True
+
+    async def __load_frontiers(self):
+        not_loaded = await self.nanorpc.load_frontiers(self.__get_accounts())
+        genesis_account = self.conf_p.get_genesis_account_data()["account"]
+        if self.nanorpc.frontier_store.get(genesis_account) is None:
+            raise ValueError(
+                f'Genesis account {genesis_account} could not be read from the node : '
+                f'{not_loaded.get(genesis_account)}')
+
+    def __get_genesis_balance(self, nano_rpc):
+        # balance after the blocks created so far, published or not
+        return nano_rpc.frontier_store.get(
+            self.conf_p.get_genesis_account_data()["account"]).balance
+
+    def __convert_weight_percentage_to_balance(self, nano_rpc):
+        genesis_balance = self.__get_genesis_balance(nano_rpc)
+
+        # every amount is planned up front with exact integer arithmetic
+        weight_plan = plan_weight_distribution(genesis_balance,
+                                               self.conf_p.get_nodes_config())
 
         for node_conf in self.conf_p.get_nodes_config():
 
-            if "vote_weight_percent" not in node_conf and "balance" not in node_conf:
+            if node_conf["name"] not in weight_plan.requested:
                 continue  # skip genesis that was added as node
-            if "vote_weight_percent" in node_conf:
-                node_conf["balance"] = raw_high_precision_percent(
-                    genesis_balance, node_conf["vote_weight_percent"])
-            node_conf["balance"] = int(node_conf["balance"])
+            node_conf["balance"] = weight_plan.requested[node_conf["name"]]
+            planned_balance = weight_plan.balances[node_conf["name"]]
 
-            if genesis_remaing <= 0:
+            if planned_balance <= 0 < node_conf["balance"]:
                 self.logger.append_log(
                     "InitialBlocks", "WARNING",
                     f'No Genesis funds remaining! Account [{node_conf["account_data"]["account"]}] will not be opened!'
                 )
-                # self.conf_p["node_account_data"].remove(node_account_data)
+                self.conf_p.set_node_balance(node_conf["name"], 0)
                 continue
-            if genesis_remaing < node_conf["balance"]:
+            if planned_balance < node_conf["balance"]:
                 self.logger.append_log(
                     "InitialBlocks", "WARNING",
-                    f'Genesis remaining balance is too small! Send {genesis_remaing} instead of {node_conf["balance"]}.'
+                    f'Genesis remaining balance is too small! Send {planned_balance} instead of {node_conf["balance"]}.'
                 )
 
-            self.conf_p.set_node_balance(
-                node_conf["name"], min(node_conf["balance"], genesis_remaing))
-            genesis_remaing = max(0, genesis_remaing - node_conf["balance"])
-
-    async def __send_vote_weight(self):
-
-        for node_conf in self.conf_p.get_nodes_config():
-
-            if "balance" not in node_conf:
+            self.conf_p.set_node_balance(node_conf["name"], planned_balance)
 
-                continue  # skip genesis that was added as node
-            node_account_data = node_conf["account_data"]
-
-            send_block = await self.nanorpc.create_send_block_pkey(
-                self.conf_p.get_genesis_account_data()["private"],
-                node_account_data["account"], node_conf["balance"])
-
-            self.logger.append_log(
-                "InitialBlocks", "INFO",
-                "SENT {:>40} FROM {} To {} : HASH {}".format(
-                    send_block["amount_raw"],
-                    self.conf_p.get_genesis_account_data()["account"],
-                    node_account_data["account"], send_block["hash"]))
-
-            open_block = await self.nanorpc.create_open_block(
-                node_account_data["account"], node_account_data["private"],
-                node_conf["balance"], node_account_data["account"],
-                send_block["hash"])
-
-            self.logger.append_log(
-                "InitialBlocks", "INFO",
-                "OPENED PR ACCOUNT {} : HASH {}".format(
-                    node_account_data["account"], open_block["hash"]))
-
-    async def __open_accounts(self):
+    async def __build_vote_weight(self, nano_rpc, pipeline, opens, move_weight):
+        genesis_account_data = self.conf_p.get_genesis_account_data()
 
         for node_conf in self.conf_p.get_nodes_config():
 
-            if "balance" not in node_conf:
-
+            if "balance" not in node_conf or int(node_conf["balance"]) <= 0:
                 continue  # skip genesis that was added as node
             node_account_data = node_conf["account_data"]
 
-            send_block = await self.nanorpc.create_send_block_pkey(
-                self.conf_p.get_genesis_account_data()["private"],
-                node_account_data["account"], node_conf["balance"])
-
-            self.logger.append_log(
-                "InitialBlocks", "INFO",
-                "SENT {:>40} FROM {} To {} : HASH {}".format(
-                    send_block["amount_raw"],
-                    self.conf_p.get_genesis_account_data()["account"],
-                    node_account_data["account"], send_block["hash"]))
-
-            open_block = await self.nanorpc.create_open_block(
-                node_account_data["account"], node_account_data["private"],
-                node_conf["balance"], self.conf_p.get_genesis_account_data()[
-                    "account"],
-                send_block["hash"])
+            send_block = await self.__add_block(
+                nano_rpc,
+                pipeline,
+                "SENT {:>40} FROM {} To {} : HASH {{hash}}".format(
+                    node_conf["balance"], genesis_account_data["account"],
+                    node_account_data["account"]),
+                "send",
+                source_private_key=genesis_account_data["private"],
+                destination_account=node_account_data["account"],
+                amount_raw=node_conf["balance"])
+            if send_block is None:
+                continue
 
+            # with move_weight, every PR votes for itself. Otherwise genesis keeps the weight
+            representative = node_account_data["account"] if move_weight else genesis_account_data["account"]
+            await self.__add_block(
+                nano_rpc,
+                opens,
+                "OPENED PR ACCOUNT {} : HASH {{hash}}".format(node_account_data["account"]),
+                "receive",
+                source_private_key=node_account_data["private"],
+                destination_account=node_account_data["account"],
+                representative=representative,
+                amount_raw=node_conf["balance"],
+                link=send_block["hash"])
+
+    def __get_accounts(self):
+        return [
+            self.conf_p.get_genesis_account_data()["account"],
+            self.conf_p.get_canary_account_data()["account"]
+        ] + [node_conf["account_data"]["account"]
+             for node_conf in self.conf_p.get_nodes_config()
+             if "account_data" in node_conf]
+
+    async def build_initial_blocks(self, move_weight=True, nano_rpc=None):
+        """Creates every initial block locally, without publishing.
+
+        Returns [(block, log message)] : the genesis chain in ledger order,
+        followed by the opens of the accounts it sends to.
+        Without nano_rpc, the blocks build on the frontiers of the node ledger.
+        """
+        if nano_rpc is None:
+            nano_rpc = self.nanorpc
+            # one concurrent round trip for all accounts, then no rpc until publishing
+            await self.__load_frontiers()
+
+        pipeline, opens = [], []
+        await self.__build_epochs(nano_rpc, pipeline)
+        await self.__build_canary(nano_rpc, pipeline, opens)
+        await self.__build_burn(nano_rpc, pipeline)
+        self.__convert_weight_percentage_to_balance(nano_rpc)
+        await self.__build_vote_weight(nano_rpc, pipeline, opens, move_weight)
+        return pipeline + opens
+
+    def __get_genesis_hash(self):
+        genesis_account = self.conf_p.get_genesis_account_data()
+        return Block(block_type="open",
+                     account=genesis_account["account"],
+                     representative=genesis_account["account"],
+                     source=genesis_account["public"]).block_hash
+
+    def __get_bundle_difficulty(self):
+        # the highest work threshold of the test network is valid for every block
+        return "{:016x}".format(max(
+            int(self.conf_p.get_all()[threshold], 16)
+            for threshold in ("NANO_TEST_EPOCH_1", "NANO_TEST_EPOCH_2", "NANO_TEST_EPOCH_2_RECV")))
+
+    def get_bundle_key(self, move_weight=True):
+        """Cache key of the initial blocks : every config value they are derived from."""
+        return corpus_key(
+            bundle_version=BUNDLE_VERSION,
+            genesis=self.conf_p.get_genesis_account_data()["account"],
+            canary=self.conf_p.get_canary_account_data()["account"],
+            burn=self.conf_p.get_burn_account_data()["account"],
+            burn_amount=self.conf_p.get_config_value("burn_amount"),
+            epoch_count=self.conf_p.get_all()["epoch_count"],
+            difficulty=self.__get_bundle_difficulty(),
+            move_weight=move_weight,
+            nodes=[(node_conf["name"], node_conf["account_data"]["account"],
+                    node_conf.get("vote_weight_percent", node_conf.get("balance")))
+                   for node_conf in self.conf_p.get_nodes_config()
+                   if "account_data" in node_conf])
+
+    async def __generate_bundle(self, path, move_weight):
+        # a fresh local ledger only holds the genesis block, no node is needed to build on it
+        builder = NanoRpc(self.nanorpc.get_url(), offline=True,
+                          work_engine=self.nanorpc.work_engine)
+        builder.set_offline_difficulty(self.__get_bundle_difficulty())
+        genesis_account = self.conf_p.get_genesis_account_data()["account"]
+        builder.frontier_store.set(genesis_account, self.__get_genesis_hash(),
+                                   GENESIS_BALANCE, genesis_account)
+
+        pipeline = await self.build_initial_blocks(move_weight, nano_rpc=builder)
+        bundle = {
+            "balances": {node_conf["name"]: node_conf["balance"]
+                         for node_conf in self.conf_p.get_nodes_config()
+                         if "balance" in node_conf},
+            "blocks": [{"hash": block["hash"], "block": block["block"],
+                        "subtype": block.get("subtype"), "message": message}
+                       for block, message in pipeline]
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(bundle, f)
+
+    def __is_fresh_ledger(self):
+        genesis_account = self.conf_p.get_genesis_account_data()["account"]
+        genesis_record = self.nanorpc.frontier_store.get(genesis_account)
+        return (genesis_record is not None
+                and genesis_record.frontier.upper() == self.__get_genesis_hash().upper()
+                and not any(account in self.nanorpc.frontier_store
+                            for account in self.__get_accounts()
+                            if account != genesis_account))
+
+    async def get_initial_blocks(self, move_weight=True):
+        """Same blocks as build_initial_blocks, read from the bundle cache when the ledger is fresh."""
+        if self.bundle_cache is None or self.conf_p.get_env() != "local":
+            return await self.build_initial_blocks(move_weight)
+
+        await self.__load_frontiers()
+        if not self.__is_fresh_ledger():
             self.logger.append_log(
                 "InitialBlocks", "INFO",
-                "OPENED PR ACCOUNT {} : HASH {}".format(
-                    node_account_data["account"], open_block["hash"]))
-
-    async def create_node_wallet(self,
-                                 rpc_url,
-                                 node_name,
-                                 private_key=None,
-                                 seed=None):
-        node_rpc = NanoRpc(rpc_url)
-
-        if private_key != None:
-            wallet = await node_rpc.wallet_create()
-            account = await node_rpc.wallet_add(wallet["wallet"], private_key)
-        if seed != None:
-            wallet = await node_rpc.wallet_create(seed=seed)
-            account = await node_rpc.generate_account(seed, 0)
-        self.logger.append_log(
-            "InitialBlocks", "INFO",
-            f'WALLET {wallet["wallet"]} CREATED FOR {node_name} WITH ACCOUNT {account.get("account")}')
+                "Ledger already holds blocks beyond genesis. Initial blocks are created live")
+            return await self.build_initial_blocks(move_weight)
+
+        path = await self.bundle_cache.get_or_generate(
+            self.get_bundle_key(move_weight),
+            lambda path: self.__generate_bundle(path, move_weight))
+        with open(path, "r", encoding="utf-8") as f:
+            bundle = json.load(f)
+
+        for node_name, balance in bundle["balances"].items():
+            self.conf_p.set_node_balance(node_name, balance)
+        pipeline = []
+        for entry in bundle["blocks"]:
+            json_block = entry["block"]
+            # same frontier store state as after build_initial_blocks
+            self.nanorpc.frontier_store.set(json_block["account"], entry["hash"],
+                                            json_block["balance"], json_block["representative"])
+            pipeline.append(({"hash": entry["hash"], "block": json_block, "subtype": entry["subtype"]},
+                             entry["message"]))
+        return pipeline
+
+    async def publish_initial_blocks(self, move_weight=True, max_in_flight=32):
+        await self.__log_active_difficulty()
+        pipeline = await self.get_initial_blocks(move_weight)
+
+        # the genesis chain goes out in order, each open as soon as its send is published
+        rejected, failed_accounts = [], set()
+        async for result in self.nanorpc.publish_block_dag(
+                [block for block, _ in pipeline], max_in_flight=max_in_flight):
+            block, message = pipeline[result["index"]]
+            if result["published"]:
+                self.logger.append_log("InitialBlocks", "INFO", message)
+                if block.get("subtype") == "epoch":
+                    await self.__log_active_difficulty()  # epochs raise the work thresholds
+            elif result["error"] in ALREADY_PUBLISHED_ERRORS:
+                self.logger.append_log("InitialBlocks", "INFO", f'{message} (already on the ledger)')
+            else:
+                self.logger.append_log("InitialBlocks", "ERROR",
+                                       f'NOT PUBLISHED {message} : {result["error"]}')
+                failed_accounts.add(block["block"]["account"])
+                if not result["error"].startswith("Dependency not published"):
+                    rejected.append(f'"{message}" ({result["error"]})')
 
-    async def publish_initial_blocks(self, move_weight=True):
-        await self.__publish_epochs()
-        await self.__publish_canary()
-        await self.__send_to_burn()
-        await self.__convert_weight_percentage_to_balance()
-        if move_weight:
-            await self.__send_vote_weight()
-        else:
-            await self.__open_accounts()
-        return self.logger.pop("InitialBlocks")
+        await self.__log_active_difficulty()
+        log = self.logger.pop("InitialBlocks")
+        if failed_accounts:
+            await self.__reload_frontiers(failed_accounts)
+            raise ValueError(
+                f'Initial blocks of {len(failed_accounts)} accounts not published, '
+                f'the node rejected {rejected[0] if rejected else "a block"}, '
+                f'every block depending on it was skipped. Run reset before init again')
+        return log
+
+    async def __reload_frontiers(self, accounts):
+        # the local frontiers point at blocks the ledger doesn't have
+        for account in accounts:
+            self.nanorpc.frontier_store.remove(account)
+        await self.nanorpc.load_frontiers(accounts)
@@ -23,7 +23,8 @@ def parse_args():
                             'create', 'start', 'start_nodes', 'status',
                             'restart', 'init', 'init_wallets', 'conf_edit',
                             'stop', 'stop_nodes', 'update', 'remove', 'reset',
-                            'down', 'destroy', 'rpc', 'beta_create', 'beta_init'
+                            'down', 'destroy', 'rpc', 'beta_create', 'beta_init',
+                            'replay', 'snapshot', 'restore', 'export', 'import'
                         ])
     parser.add_argument('--path',
                         default=_get_default_app_dir(),
@@ -42,7 +43,7 @@ def parse_args():
     parser.add_argument(
         '--payload',
         type=json.loads,
-        help="JSON request payload (only required for rpc command)")
+        help="JSON request payload (only required for rpc, conf_edit, replay, export and import commands, optional \"name\" for snapshot and restore)")
 
     return parser.parse_args()
 
@@ -51,7 +52,10 @@ async def main_async(args=None):
     args = args or parse_args()
     manager = NanoLocalManager(args.path, args.project_name, environ.get(
         "NL_CONF_FILE", "nl_config.toml"))
-    await manager.execute_command(args.command, args.nodes, args.payload)
+    try:
+        await manager.execute_command(args.command, args.nodes, args.payload)
+    finally:
+        await manager.close()
 
 
 def main(args=None):
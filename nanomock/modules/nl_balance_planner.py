@@ -0,0 +1,103 @@
+from fractions import Fraction
+from typing import Dict, NamedTuple, Tuple
+
+
+def exact(value) -> Fraction:
+    # str() keeps the decimal value as written (0.1 stays 1/10), Fraction keeps it exact
+    return Fraction(str(value))
+
+
+def scale_raw(raw, multiplier) -> int:
+    """raw * multiplier, truncated to an integer raw amount."""
+    return int(exact(raw) * exact(multiplier))
+
+
+def percent_of_raw(raw, percent) -> int:
+    """percent % of raw, truncated to an integer raw amount."""
+    return int(exact(raw) * exact(percent) / 100)
+
+
+class SplitPlan(NamedTuple):
+    """Every amount of an account split tree, computed before the first block is created.
+
+    amounts[d - 1] is sent to each account opened at depth d,
+    level_sizes[d - 1] is the number of accounts opened at depth d.
+    """
+    splitting_depth: int
+    amounts: Tuple[int, ...]
+    level_sizes: Tuple[int, ...]
+
+    @property
+    def required_raw(self) -> int:
+        # the funding account only pays for the first depth, deeper ones are paid by their parents
+        return self.level_sizes[0] * self.amounts[0] if self.amounts else 0
+
+    def validate(self, source_balance_raw, split_count):
+        if int(source_balance_raw) < self.required_raw:
+            raise ValueError(
+                f"Source balance {source_balance_raw} is too small, the split needs {self.required_raw} raw")
+        for depth in range(1, len(self.amounts)):
+            # an account at depth d can fund up to split_count children at depth d + 1
+            if self.amounts[depth - 1] < split_count * self.amounts[depth]:
+                raise ValueError(
+                    f"Accounts at depth {depth} receive {self.amounts[depth - 1]} raw but must send {split_count} x {self.amounts[depth]} raw")
+
+
+def get_splitting_depth(number_of_accounts, split_count):
+    accounts, depth = 0, 0
+    while accounts < number_of_accounts:
+        depth = depth + 1
+        accounts = accounts + split_count**depth
+    return depth
+
+
+def plan_account_split(number_of_accounts, split_count, final_account_balance_raw) -> SplitPlan:
+    """Plans a breadth first split of one account into number_of_accounts accounts.
+
+    Each account keeps at least final_account_balance_raw once it funded its subtree.
+    """
+    splitting_depth = get_splitting_depth(number_of_accounts, split_count)
+    final_balance = exact(final_account_balance_raw)
+    amounts = tuple(
+        int((split_count**(splitting_depth - depth + 1) - split_count + 1) * final_balance)
+        for depth in range(1, splitting_depth + 1))
+
+    level_sizes, remaining, level_size = [], number_of_accounts, split_count
+    while remaining > 0:
+        level_sizes.append(min(level_size, remaining))
+        remaining = remaining - level_sizes[-1]
+        level_size = level_sizes[-1] * split_count
+    return SplitPlan(splitting_depth, amounts, tuple(level_sizes))
+
+
+class WeightPlan(NamedTuple):
+    """Raw amounts sent to every node, requested[name] is what its config asked for."""
+    requested: Dict[str, int]
+    balances: Dict[str, int]
+    remaining_raw: int
+
+    def validate(self):
+        missing = sum(self.requested.values()) - sum(self.balances.values())
+        if missing > 0:
+            raise ValueError(f"Source balance is {missing} raw short of the requested vote weights")
+
+
+def plan_weight_distribution(source_balance_raw, nodes_config) -> WeightPlan:
+    """Raw amount for every node that has a "vote_weight_percent" (of source_balance_raw) or a fixed "balance".
+
+    Nodes are served in order, a node that doesn't fit in the remaining
+    balance gets what is left.
+    """
+    remaining = int(source_balance_raw)
+    requested, balances = {}, {}
+    for node_conf in nodes_config:
+        if "vote_weight_percent" in node_conf:
+            balance = percent_of_raw(source_balance_raw, node_conf["vote_weight_percent"])
+        elif "balance" in node_conf:
+            balance = int(node_conf["balance"])
+        else:
+            continue
+        requested[node_conf["name"]] = balance
+        balances[node_conf["name"]] = min(balance, remaining)
+        remaining = max(0, remaining - balance)
+    return WeightPlan(requested, balances, remaining)
@@ -0,0 +1,248 @@
+import heapq
+import mmap
+import os
+import struct
+import tempfile
+from functools import lru_cache
+
+from nano_lib_py import get_account_id, get_account_public_key, AccountIDPrefix
+
+from nanomock.modules.nl_nanolib import NanoLibTools
+
+CORPUS_SUFFIX = ".corpus"
+CORPUS_MAGIC = b"NLBC"
+CORPUS_VERSION = 1
+
+# magic, version, record_size, record count, index offset, 8 reserved bytes
+HEADER = struct.Struct("<4sHHQQ8x")
+# account, previous, representative, balance (u128), link, signature, work, hash, subtype, padding
+RECORD = struct.Struct(">32s32s32s16s32s64sQ32sB7x")
+# hash, record number. Sorted by hash for binary search
+INDEX_ENTRY = struct.Struct(">32sQ")
+# index entries sorted in memory at once, larger indexes are merged from sorted runs on disk
+INDEX_RUN_ENTRIES = 2**16
+
+SUBTYPES = ("", "send", "receive", "open", "change", "epoch")
+_SUBTYPE_CODES = {subtype: code for code, subtype in enumerate(SUBTYPES)}
+
+
+@lru_cache(maxsize=2**16)
+def _account_id(public_key):
+    # accounts and representatives repeat a lot across a corpus
+    return get_account_id(public_key=public_key.hex(),
+                          prefix=AccountIDPrefix.NANO)
+
+
+def _public_key(account):
+    return bytes.fromhex(get_account_public_key(account_id=account))
+
+
+def pack_block(json_block, block_hash):
+    if json_block.get("type", "state") != "state":
+        raise ValueError(f'Only state blocks can be stored, got {json_block.get("type")}')
+    return RECORD.pack(_public_key(json_block["account"]),
+                       bytes.fromhex(json_block["previous"]),
+                       _public_key(json_block["representative"]),
+                       int(json_block["balance"]).to_bytes(16, "big"),
+                       bytes.fromhex(json_block["link"]),
+                       bytes.fromhex(json_block["signature"]),
+                       int(json_block["work"], 16),
+                       bytes.fromhex(block_hash),
+                       _SUBTYPE_CODES.get(json_block.get("subtype", ""), 0))
+
+
+def unpack_block(record):
+    """Returns (block_hash, json_block) in the layout of the node's json blocks."""
+    (account, previous, representative, balance, link, signature, work,
+     block_hash, subtype) = RECORD.unpack(record)
+    json_block = {
+        "type": "state",
+        "account": _account_id(account),
+        "previous": previous.hex().upper(),
+        "representative": _account_id(representative),
+        "balance": str(int.from_bytes(balance, "big")),
+        "link": link.hex().upper(),
+        "link_as_account": _account_id(link),
+        "signature": signature.hex().upper(),
+        "work": f"{work:016x}",
+    }
+    if subtype:
+        json_block["subtype"] = SUBTYPES[subtype]
+    return block_hash.hex().upper(), json_block
+
+
+class BlockCorpusWriter():
+    """Writes blocks as fixed width binary records followed by a hash index.
+
+    write() takes block results ({"hash", "block"} as returned by NanoRpc.get_block_result),
+    the header and the index are written on close.
+    Index entries are packed into a buffer of at most {run_entries} entries,
+    full buffers are sorted and spilled to a temporary file and the sorted runs
+    are merged into the index on close. Memory is bounded by one run plus a
+    few bytes of bookkeeping per spilled run.
+    """
+
+    def __init__(self, path, run_entries=None):
+        self.path = path
+        self.count = 0
+        self.run_entries = run_entries or INDEX_RUN_ENTRIES
+        self._file = None
+        self._run = bytearray()
+        self._runs_file = None
+        self._runs = []
+        self.nano_lib = NanoLibTools()
+
+    def open(self):
+        self._file = open(self.path, "wb")
+        self._file.write(HEADER.pack(CORPUS_MAGIC, CORPUS_VERSION, RECORD.size, 0, 0))
+        return self
+
+    def write(self, rpc_block):
+        self.write_block(rpc_block["block"], rpc_block.get("hash"))
+
+    def write_block(self, json_block, block_hash=None):
+        if not block_hash:
+            block_hash = self.nano_lib.get_block_hash(json_block)
+        self._file.write(pack_block(json_block, block_hash))
+        self._run += INDEX_ENTRY.pack(bytes.fromhex(block_hash), self.count)
+        self.count = self.count + 1
+        if len(self._run) >= self.run_entries * INDEX_ENTRY.size:
+            self._spill_run()
+
+    def _sorted_run(self):
+        size = INDEX_ENTRY.size
+        entries = [self._run[i:i + size] for i in range(0, len(self._run), size)]
+        entries.sort()
+        self._run = bytearray()
+        return b"".join(entries)
+
+    def _spill_run(self):
+        if self._runs_file is None:
+            self._runs_file = tempfile.TemporaryFile(
+                dir=os.path.dirname(os.path.abspath(self.path)))
+        run = self._sorted_run()
+        self._runs.append((self._runs_file.tell(), len(run)))
+        self._runs_file.write(run)
+
+    def _iter_run(self, offset, length, read_size):
+        size = INDEX_ENTRY.size
+        fileno = self._runs_file.fileno()
+        end = offset + length
+        while offset < end:
+            data = os.pread(fileno, min(read_size, end - offset), offset)
+            offset += len(data)
+            for i in range(0, len(data), size):
+                yield data[i:i + size]
+
+    def _write_index(self):
+        if not self._runs:
+            self._file.write(self._sorted_run())
+            return
+        if self._run:
+            self._spill_run()
+        self._runs_file.flush()
+        # the merge reads all runs at once, together they buffer no more than one run
+        read_size = max(1, self.run_entries // len(self._runs)) * INDEX_ENTRY.size
+        self._file.writelines(
+            heapq.merge(*(self._iter_run(offset, length, read_size)
+                          for offset, length in self._runs)))
+
+    def close(self):
+        if self._file is None:
+            return
+        index_offset = HEADER.size + self.count * RECORD.size
+        self._write_index()
+        self._file.seek(0)
+        self._file.write(HEADER.pack(CORPUS_MAGIC, CORPUS_VERSION, RECORD.size,
+                                     self.count, index_offset))
+        self._file.close()
+        self._file = None
+        if self._runs_file is not None:
+            self._runs_file.close()
+            self._runs_file = None
+        self._runs = []
+        self._run = bytearray()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class BlockCorpusReader():
+    """Memory maps a corpus written by BlockCorpusWriter.
+
+    Opening is constant time, records are only decoded when accessed,
+    by position (reader[i]), by hash (get_by_hash) or in order (iteration).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, self.count, self._index_offset = HEADER.unpack_from(
+            self._mmap, 0)
+        if magic != CORPUS_MAGIC or version != CORPUS_VERSION or record_size != RECORD.size:
+            self.close()
+            raise ValueError(f"{path} is not a version {CORPUS_VERSION} block corpus")
+
+    def __len__(self):
+        return self.count
+
+    def _record_offset(self, index):
+        if index < 0:
+            index = index + self.count
+        if not 0 <= index < self.count:
+            raise IndexError("block index out of range")
+        return HEADER.size + index * RECORD.size
+
+    def get(self, index):
+        """Returns (block_hash, json_block) of the block at position index."""
+        offset = self._record_offset(index)
+        return unpack_block(self._mmap[offset:offset + RECORD.size])
+
+    def get_hash(self, index):
+        # the hash sits at a fixed position, no need to decode the whole record
+        offset = self._record_offset(index) + RECORD.size - 40
+        return self._mmap[offset:offset + 32].hex().upper()
+
+    def __getitem__(self, index):
+        return self.get(index)[1]
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self.get(index)
+
+    def index_of(self, block_hash):
+        """Binary search in the hash index, returns the block position or None."""
+        key = bytes.fromhex(block_hash)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            entry_hash, position = INDEX_ENTRY.unpack_from(
+                self._mmap, self._index_offset + middle * INDEX_ENTRY.size)
+            if entry_hash == key:
+                return position
+            if entry_hash < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def __contains__(self, block_hash):
+        return self.index_of(block_hash) is not None
+
+    def get_by_hash(self, block_hash):
+        position = self.index_of(block_hash)
+        return None if position is None else self[position]
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,337 @@
+import asyncio
+import random
+import time
+from collections import deque
+
+from nanomock.internal.utils import logger
+from nanomock.modules.nl_nanolib import NanoLibTools
+
+# process errors that resolve themselves once the missing dependency has been published
+RETRY_ON_ERRORS = ("Gap previous block", "Gap source block")
+# the block is already on the ledger : its dependents can be published
+ALREADY_PUBLISHED_ERRORS = ("Old block",)
+
+_WORKER_DONE = object()
+
+
+def backoff_delay(attempt, base_s=0.05, max_s=2.0):
+    # full jitter : uniform delay between 0 and the capped exponential backoff
+    return random.uniform(0, min(max_s, base_s * 2**attempt))
+
+
+def _split_block(block):
+    # accepts either a create_block / get_block_result dict or a plain json block
+    if "block" in block:
+        return block["block"], block.get("hash")
+    return block, block.get("hash")
+
+
+class BlockPublisher:
+    """Publishes blocks via the process rpc with a bounded number of blocks in flight.
+
+    Retries use an async exponential backoff with jitter, so other coroutines
+    keep running while a publish is waiting.
+    """
+
+    def __init__(self,
+                 nano_rpc,
+                 max_in_flight=32,
+                 max_retries=5,
+                 backoff_base_s=0.05,
+                 backoff_max_s=2.0,
+                 async_process=False,
+                 tracker=None,
+                 validator=None):
+        self.nano_rpc = nano_rpc
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.async_process = async_process
+        # optional LatencyTracker, timestamps every block with the start of its accepted publish attempt
+        self.tracker = tracker
+        # optional BlockValidator, invalid blocks are rejected without a process call
+        self.validator = validator
+
+    def _is_published(self, response):
+        if not isinstance(response, dict) or "error" in response:
+            return False
+        # with async_ the node only acknowledges the block : {"started": "1"}
+        return "hash" in response or response.get("started") == "1"
+
+    def _is_retryable(self, response):
+        if response is None:
+            return True
+        return isinstance(response, dict) and response.get(
+            "error") in RETRY_ON_ERRORS
+
+    @staticmethod
+    def _rejected(block_hash, error):
+        logger.warning("Block rejected locally: %s %s", block_hash, error)
+        return {
+            "hash": block_hash,
+            "published": False,
+            "attempts": 0,
+            "error": f"Rejected locally: {error}",
+            "response": None
+        }
+
+    async def validate_many(self, blocks):
+        """Validates blocks as one batch (on the validator pool). Returns one error or None per block."""
+        return await self.validator.validate([_split_block(block)[::-1] for block in blocks])
+
+    async def publish(self, block, validate=True):
+        """Publishes one block. validate=False skips the validator, for blocks already checked by validate_many."""
+        json_block, block_hash = _split_block(block)
+        response, error = None, None
+        if validate and self.validator is not None:
+            # a single signature check still takes a few ms, keep it off the event loop
+            error = await asyncio.get_running_loop().run_in_executor(
+                None, self.validator.validate_one, json_block, block_hash)
+            if error is not None:
+                return self._rejected(block_hash, error)
+        if self.tracker is not None and block_hash:
+            self.tracker.track(block_hash)
+
+        for attempt in range(self.max_retries + 1):
+            attempt_at = time.time()
+            try:
+                response = await self.nano_rpc.process(
+                    json_block,
+                    json_block=True,
+                    async_=True if self.async_process else None)
+                error = response.get("error") if isinstance(response, dict) else None
+            except Exception as exc:  # pylint: disable=broad-except
+                response, error = None, str(exc)
+
+            if self._is_published(response) or not self._is_retryable(response):
+                break
+            await asyncio.sleep(
+                backoff_delay(attempt, self.backoff_base_s, self.backoff_max_s))
+
+        published = self._is_published(response)
+        if not published:
+            logger.warning("Block not published: %s %s", block_hash, error)
+        elif "hash" in response:
+            block_hash = response["hash"]
+        if published and self.tracker is not None and block_hash:
+            self.tracker.mark_published(block_hash, attempt_at)
+
+        return {
+            "hash": block_hash,
+            "published": published,
+            "attempts": attempt + 1,
+            "error": None if published else error,
+            "response": response
+        }
+
+    async def publish_many(self, blocks, validate_batch_size=None):
+        """Async generator that yields one result per block as soon as its publish completes.
+
+        blocks can be any iterable or async iterable. Each result holds the
+        submission "index" of its block, since results arrive out of order.
+        With a validator, blocks are validated in batches of validate_batch_size
+        (default : large enough for the validator pool) and rejected blocks are
+        yielded without a process call.
+        """
+        pending = asyncio.Queue(maxsize=self.max_in_flight)
+        results = asyncio.Queue()
+        workers_count = self.max_in_flight
+        if self.validator is not None:
+            batch_size = validate_batch_size or max(self.validator.min_pool_batch, self.max_in_flight)
+
+        async def enqueue(batch):
+            # with a validator, blocks are checked in batches before they are queued
+            errors = await self.validate_many([block for _, block in batch])
+            for (index, block), error in zip(batch, errors):
+                if error is None:
+                    await pending.put((index, block))
+                else:
+                    result = self._rejected(_split_block(block)[1], error)
+                    result["index"] = index
+                    await results.put(result)
+
+        async def add(batch, index, block):
+            if self.validator is None:
+                await pending.put((index, block))
+                return
+            batch.append((index, block))
+            if len(batch) >= batch_size:
+                await enqueue(batch)
+                batch.clear()
+
+        async def produce():
+            index = 0
+            batch = []
+            try:
+                if hasattr(blocks, "__aiter__"):
+                    async for block in blocks:
+                        await add(batch, index, block)
+                        index += 1
+                else:
+                    for block in blocks:
+                        await add(batch, index, block)
+                        index += 1
+                if batch:
+                    await enqueue(batch)
+            finally:
+                for _ in range(workers_count):
+                    await pending.put(None)
+
+        async def work():
+            while True:
+                item = await pending.get()
+                if item is None:
+                    await results.put(_WORKER_DONE)
+                    return
+                index, block = item
+                result = await self.publish(block, validate=False)
+                result["index"] = index
+                await results.put(result)
+
+        tasks = [asyncio.create_task(produce())]
+        tasks.extend(asyncio.create_task(work()) for _ in range(workers_count))
+
+        try:
+            finished_workers = 0
+            while finished_workers < workers_count:
+                result = await results.get()
+                if result is _WORKER_DONE:
+                    finished_workers += 1
+                    continue
+                yield result
+            await tasks[0]  # surface errors raised while iterating the blocks
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def publish_all(self, blocks, validate_batch_size=None):
+        # convenience wrapper that returns the results in submission order
+        results = [result async for result in self.publish_many(blocks, validate_batch_size)]
+        return sorted(results, key=lambda result: result["index"])
+
+
+def block_dependencies(json_block, known_hashes):
+    """Hashes among known_hashes that must be on the ledger before json_block.
+
+    A block depends on its previous block and, for opens and receives, on the
+    send it receives (link). Dependencies outside known_hashes are assumed to be
+    on the ledger already.
+    """
+    dependencies = []
+    previous = json_block.get("previous", "").upper()
+    if previous in known_hashes:
+        dependencies.append(previous)
+    link = json_block.get("link", "").upper()
+    if link in known_hashes and link != previous:
+        dependencies.append(link)
+    return dependencies
+
+
+class DependencyScheduler:
+    """Publishes a block list as a dependency DAG.
+
+    Every block whose dependencies are published is in flight at once
+    (up to publisher.max_in_flight), no block is sent before its previous
+    block or its source send. Blocks depending on a failed publish are
+    skipped instead of being sent into a gap, blocks the node already has
+    ("Old block") count as published for their dependents.
+    The publisher must not use async_process : the node only acknowledges
+    those blocks, a dependent could reach it before its dependency is processed.
+    """
+
+    def __init__(self, publisher: BlockPublisher):
+        if publisher.async_process:
+            raise ValueError("Dependency ordering needs a publisher without async_process")
+        self.publisher = publisher
+        self.nano_lib = NanoLibTools()
+
+    @staticmethod
+    def _is_on_ledger(result):
+        return result["published"] or result["error"] in ALREADY_PUBLISHED_ERRORS
+
+    def _get_hash(self, block):
+        json_block, block_hash = _split_block(block)
+        return (block_hash or self.nano_lib.get_block_hash(json_block)).upper()
+
+    def build(self, blocks):
+        """Returns (hashes, waiting, children) : the unpublished dependency count and the dependents of every block."""
+        hashes = [self._get_hash(block) for block in blocks]
+        index_of = {block_hash: index for index, block_hash in enumerate(hashes)}
+        waiting = [0] * len(blocks)
+        children = [[] for _ in blocks]
+        for index, block in enumerate(blocks):
+            json_block, _ = _split_block(block)
+            for dependency in block_dependencies(json_block, index_of):
+                waiting[index] += 1
+                children[index_of[dependency]].append(index)
+        return hashes, waiting, children
+
+    def _skip(self, failed_index, hashes, children, skipped):
+        # every block that (transitively) depends on the failed one
+        stack = list(children[failed_index])
+        while stack:
+            index = stack.pop()
+            if skipped[index]:
+                continue
+            skipped[index] = True
+            stack.extend(children[index])
+            yield {
+                "hash": hashes[index],
+                "published": False,
+                "attempts": 0,
+                "error": f"Dependency not published: {hashes[failed_index]}",
+                "response": None,
+                "index": index
+            }
+
+    async def publish_many(self, blocks):
+        """Async generator that yields one result per block (with its "index") as soon as it is known."""
+        blocks = list(blocks)
+        hashes, waiting, children = self.build(blocks)
+        skipped = [False] * len(blocks)
+        in_flight = {}  # task -> block index
+
+        if self.publisher.validator is not None:
+            # validate the whole DAG as one batch, rejected blocks and their dependents are never sent
+            errors = await self.publisher.validate_many(blocks)
+            for index, error in enumerate(errors):
+                if error is None or skipped[index]:
+                    continue
+                skipped[index] = True
+                result = self.publisher._rejected(hashes[index], error)
+                result["index"] = index
+                yield result
+                for skipped_result in self._skip(index, hashes, children, skipped):
+                    yield skipped_result
+        ready = deque(index for index, count in enumerate(waiting) if count == 0 and not skipped[index])
+
+        try:
+            while ready or in_flight:
+                while ready and len(in_flight) < self.publisher.max_in_flight:
+                    index = ready.popleft()
+                    task = asyncio.create_task(self.publisher.publish(blocks[index], validate=False))
+                    in_flight[task] = index
+
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    index = in_flight.pop(task)
+                    result = task.result()
+                    result["index"] = index
+                    yield result
+
+                    if not self._is_on_ledger(result):
+                        for skipped_result in self._skip(index, hashes, children, skipped):
+                            yield skipped_result
+                        continue
+                    for child in children[index]:
+                        waiting[child] -= 1
+                        if waiting[child] == 0 and not skipped[child]:
+                            ready.append(child)
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+    async def publish_all(self, blocks):
+        results = [result async for result in self.publish_many(blocks)]
+        return sorted(results, key=lambda result: result["index"])
@@ -0,0 +1,174 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from hashlib import blake2b
+
+from nano_lib_py import get_account_public_key
+from nano_lib_py.blocks import VerifyingKey, BadSignatureError
+from nano_lib_py.work import validate_work
+from nano_lib_py.exceptions import InvalidWork
+
+ZERO_HASH = "0" * 64
+STATE_BLOCK_PREAMBLE = bytes(31) + b"\x06"
+# hex of "epoch v", the start of every epoch link
+EPOCH_LINK_PREFIX = "65706F63682076"
+# subtypes the node creates with the (lower) receive work threshold
+RECEIVE_THRESHOLD_SUBTYPES = ("open", "receive", "epoch")
+
+
+@lru_cache(maxsize=2**16)
+def account_public_key(account):
+    return get_account_public_key(account_id=account).upper()
+
+
+def hash_state_block(json_block) -> str:
+    """blake2b hash of a json state block, computed locally (same as the block_hash rpc)."""
+    digest = blake2b(digest_size=32)
+    digest.update(STATE_BLOCK_PREAMBLE)
+    digest.update(bytes.fromhex(account_public_key(json_block["account"])))
+    digest.update(bytes.fromhex(json_block["previous"]))
+    digest.update(bytes.fromhex(account_public_key(json_block["representative"])))
+    digest.update(int(json_block["balance"]).to_bytes(16, "big"))
+    digest.update(bytes.fromhex(json_block["link"]))
+    return digest.hexdigest().upper()
+
+
+def _is_signed_by(block_hash, signature, public_key):
+    try:
+        VerifyingKey(bytes.fromhex(public_key)).verify(sig=bytes.fromhex(signature),
+                                                       msg=bytes.fromhex(block_hash))
+        return True
+    except BadSignatureError:
+        return False
+
+
+def get_work_difficulty(json_block, difficulty, receive_difficulty=None):
+    """Work threshold of json_block : receive_difficulty for opens, receives and epochs, difficulty otherwise.
+
+    Blocks without "subtype" only use receive_difficulty when they open an account.
+    """
+    if receive_difficulty is None:
+        return difficulty
+    subtype = json_block.get("subtype")
+    if subtype is None and json_block["previous"] == ZERO_HASH:
+        subtype = "open"
+    return receive_difficulty if subtype in RECEIVE_THRESHOLD_SUBTYPES else difficulty
+
+
+def validate_block(json_block, block_hash=None, difficulty=None, epoch_signers=None, receive_difficulty=None):
+    """Returns None for a valid block, the reason otherwise.
+
+    Checks the hash (when block_hash is given), the signature and the work
+    (when difficulty is given, see get_work_difficulty for receive_difficulty).
+    Epoch blocks are checked against epoch_signers (public keys), their
+    signature is skipped when None.
+    """
+    try:
+        computed_hash = hash_state_block(json_block)
+        if block_hash and computed_hash != block_hash.upper():
+            return f"Hash mismatch, computed {computed_hash}"
+
+        if json_block["link"].upper().startswith(EPOCH_LINK_PREFIX):
+            signers = epoch_signers
+        else:
+            signers = [account_public_key(json_block["account"])]
+        if signers is not None and not any(
+                _is_signed_by(computed_hash, json_block["signature"], signer)
+                for signer in signers):
+            return "Invalid signature"
+
+        difficulty = get_work_difficulty(json_block, difficulty, receive_difficulty)
+        if difficulty is not None:
+            previous = json_block["previous"]
+            work_hash = account_public_key(json_block["account"]) if previous == ZERO_HASH else previous
+            validate_work(block_hash=work_hash, work=json_block["work"], difficulty=difficulty)
+    except InvalidWork:
+        return f"Work below difficulty {difficulty}"
+    except Exception as exc:  # pylint: disable=broad-except
+        return f"Invalid block: {exc}"
+    return None
+
+
+def validate_batch(batch, difficulty=None, epoch_signers=None, receive_difficulty=None):
+    # batch of (block_hash, json_block). Module level so it can run in a worker process
+    return [
+        validate_block(json_block, block_hash, difficulty, epoch_signers, receive_difficulty)
+        for block_hash, json_block in batch
+    ]
+
+
+def hash_batch(json_blocks):
+    return [hash_state_block(json_block) for json_block in json_blocks]
+
+
+def _chunks(items, chunk_size):
+    for i in range(0, len(items), chunk_size):
+        yield items[i:i + chunk_size]
+
+
+class BlockValidator:
+    """Hashes and validates whole batches of json state blocks before they reach a node.
+
+    Batches smaller than min_pool_batch run in a thread, larger ones are split
+    over a process pool (created on first use).
+    """
+
+    def __init__(self, difficulty=None, epoch_signers=None, max_workers=None,
+                 chunk_size=256, min_pool_batch=512, receive_difficulty=None):
+        self.difficulty = difficulty
+        self.receive_difficulty = receive_difficulty
+        self.epoch_signers = epoch_signers
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.min_pool_batch = min_pool_batch
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def _map(self, func, items, *args):
+        loop = asyncio.get_running_loop()
+        if len(items) < self.min_pool_batch:
+            # not worth the pool, but still off the event loop
+            return await loop.run_in_executor(None, func, items, *args)
+        chunk_results = await asyncio.gather(*(
+            loop.run_in_executor(self._get_executor(), func, chunk, *args)
+            for chunk in _chunks(items, self.chunk_size)))
+        return [result for chunk_result in chunk_results for result in chunk_result]
+
+    async def hash_blocks(self, json_blocks) -> list:
+        return await self._map(hash_batch, list(json_blocks))
+
+    def validate_one(self, json_block, block_hash=None):
+        return validate_block(json_block, block_hash, self.difficulty, self.epoch_signers,
+                              self.receive_difficulty)
+
+    async def validate(self, blocks) -> list:
+        """blocks are (block_hash, json_block) pairs (hash may be None). Returns one error or None per block."""
+        return await self._map(validate_batch, list(blocks), self.difficulty, self.epoch_signers,
+                               self.receive_difficulty)
+
+    async def filter_valid(self, blocks):
+        """Splits (block_hash, json_block) pairs into (valid, [(pair, error)])."""
+        blocks = list(blocks)
+        valid, rejected = [], []
+        for block, error in zip(blocks, await self.validate(blocks)):
+            if error is None:
+                valid.append(block)
+            else:
+                rejected.append((block, error))
+        return valid, rejected
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
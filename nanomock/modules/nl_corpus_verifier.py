@@ -0,0 +1,126 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from nanomock.modules.nl_block_validator import validate_batch, account_public_key, ZERO_HASH
+
+
+def _verify_crypto_batch(batch, difficulty, epoch_signers, receive_difficulty):
+    # runs inside a worker process. Returns (index, error) for every block that fails a check
+    errors = validate_batch([(block_hash, json_block) for _, block_hash, json_block in batch],
+                            difficulty, epoch_signers, receive_difficulty)
+    return [(index, error) for (index, _, _), error in zip(batch, errors) if error]
+
+
+class ChainChecker:
+    """Follows every account chain of a corpus in order.
+
+    Checks that each block builds on the previous block of its account and
+    that balance changes match the amounts of the sends they receive.
+    Blocks built on frontiers or sends outside the corpus are assumed valid.
+    """
+
+    def __init__(self):
+        self.accounts = {}  # account -> (frontier, balance)
+        self.sends = {}  # send hash -> (destination public key, amount), until received
+
+    def check(self, block_hash, json_block):
+        """Returns an error message or None."""
+        account = json_block["account"]
+        previous = json_block["previous"].upper()
+        link = json_block["link"].upper()
+        balance = int(json_block["balance"])
+        frontier, previous_balance = self.accounts.get(account, (None, None))
+
+        if frontier is not None and previous != frontier:
+            return f"Previous {previous} doesn't follow the account frontier {frontier}"
+        if frontier is None and previous != ZERO_HASH:
+            # the chain starts outside the corpus, its balance is unknown
+            previous_balance = None
+
+        if previous == ZERO_HASH or (previous_balance is not None and balance > previous_balance):
+            amount = balance - (previous_balance or 0)
+            error = self._receive(account, link, amount)
+            if error:
+                return error
+        elif previous_balance is not None and balance < previous_balance:
+            self.sends[block_hash.upper()] = (link, previous_balance - balance)
+
+        self.accounts[account] = (block_hash.upper(), balance)
+        return None
+
+    def _receive(self, account, link, amount):
+        if link not in self.sends:
+            return None  # source outside the corpus
+        destination, send_amount = self.sends.pop(link)
+        if destination != account_public_key(account):
+            return f"Receives send {link} addressed to another account"
+        if amount != send_amount:
+            return f"Receives {amount} raw but send {link} is {send_amount} raw"
+        return None
+
+
+async def verify_corpus(blocks, difficulty=None, epoch_signers=None, batch_size=512, max_workers=None,
+                        receive_difficulty=None):
+    """Verifies (block_hash, json_block) pairs as they stream in, see iter_corpus.
+
+    Chain links and balances are checked in this process, hashes, signatures
+    and work (if difficulty is set) in batches in a process pool. Opens,
+    receives and epochs only need receive_difficulty when it is set.
+    epoch_signers lists the public keys allowed to sign epoch blocks, their
+    signature isn't checked when None.
+    Returns {"blocks": n, "errors": {account: {"index", "hash", "error"}}} with the
+    first broken block of every account.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    loop = asyncio.get_running_loop()
+    checker = ChainChecker()
+    first_errors = {}
+    pending = set()
+    batch_accounts = {}  # batch future -> {index: (account, hash)}
+    count = 0
+
+    def record(index, account, block_hash, error):
+        if account not in first_errors or index < first_errors[account]["index"]:
+            first_errors[account] = {"index": index, "hash": block_hash, "error": error}
+
+    def collect(done):
+        for future in done:
+            accounts = batch_accounts.pop(future)
+            for index, error in future.result():
+                account, block_hash = accounts[index]
+                record(index, account, block_hash, error)
+
+    blocks = iter(blocks)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            batch = list(islice(blocks, batch_size))
+            if not batch:
+                break
+            indexed_batch, accounts = [], {}
+            for block_hash, json_block in batch:
+                account = json_block["account"]
+                if account not in first_errors:
+                    error = checker.check(block_hash, json_block)
+                    if error:
+                        record(count, account, block_hash, error)
+                    indexed_batch.append((count, block_hash, json_block))
+                    accounts[count] = (account, block_hash)
+                count = count + 1
+
+            future = loop.run_in_executor(executor, _verify_crypto_batch,
+                                          indexed_batch, difficulty, epoch_signers,
+                                          receive_difficulty)
+            batch_accounts[future] = accounts
+            pending.add(future)
+            if len(pending) >= 2 * max_workers:
+                # bounded number of batches in flight, the corpus keeps streaming
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                collect(done)
+
+        if pending:
+            done, _ = await asyncio.wait(pending)
+            collect(done)
+
+    return {"blocks": count, "errors": dict(sorted(first_errors.items(), key=lambda item: item[1]["index"]))}
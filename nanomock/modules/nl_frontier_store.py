@@ -0,0 +1,97 @@
+import asyncio
+import json
+import weakref
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+
+class FrontierRecord(NamedTuple):
+    frontier: str
+    balance: int
+    representative: str
+
+    def to_account_info(self):
+        # same keys as the account_info rpc, so records can replace rpc responses
+        return {
+            "frontier": self.frontier,
+            "balance": str(self.balance),
+            "representative": self.representative
+        }
+
+
+class FrontierStore:
+    """Local frontier ledger of one network.
+
+    Keeps the latest (frontier, balance, representative) of every account a block
+    was created for, so that subsequent blocks can be built without publishing
+    the previous one first. With max_accounts set, the least recently used
+    accounts are evicted : once evicted is non zero, a missing account may
+    well be opened on the ledger.
+    """
+
+    def __init__(self, network=None, max_accounts=None):
+        self.network = network
+        self.max_accounts = max_accounts
+        self._records = OrderedDict()
+        self.evicted = 0
+        # locks only live while a coroutine holds or waits for them
+        self._locks = weakref.WeakValueDictionary()
+
+    def __contains__(self, account):
+        return account in self._records
+
+    def __len__(self):
+        return len(self._records)
+
+    def get(self, account) -> Optional[FrontierRecord]:
+        record = self._records.get(account)
+        if record is not None:
+            self._records.move_to_end(account)
+        return record
+
+    def set(self, account, frontier, balance, representative):
+        self._records[account] = FrontierRecord(frontier, int(balance),
+                                                representative)
+        self._records.move_to_end(account)
+        if self.max_accounts is not None:
+            while len(self._records) > self.max_accounts:
+                self._records.popitem(last=False)
+                self.evicted += 1
+
+    def remove(self, account):
+        self._records.pop(account, None)
+
+    def clear(self):
+        self._records.clear()
+
+    def lock(self, account) -> asyncio.Lock:
+        # one lock per account : different accounts never wait on each other
+        lock = self._locks.get(account)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[account] = lock
+        return lock
+
+    def snapshot(self, path):
+        content = {
+            "network": self.network,
+            "accounts": {
+                account: [record.frontier, str(record.balance), record.representative]
+                for account, record in self._records.items()
+            }
+        }
+        with open(path, "w", encoding='utf-8') as f:
+            json.dump(content, f)
+
+    def restore(self, path):
+        with open(path, "r", encoding='utf-8') as f:
+            content = json.load(f)
+
+        if self.network is not None and content["network"] != self.network:
+            raise ValueError(
+                f'Snapshot {path} belongs to network "{content["network"]}", not "{self.network}"')
+
+        self.clear()
+        for account, (frontier, balance, representative) in content["accounts"].items():
+            self.set(account, frontier, balance, representative)
+        return self
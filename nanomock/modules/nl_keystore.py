@@ -0,0 +1,65 @@
+import sqlite3
+
+
+class KeyStore:
+    """Persistent (seed, index) -> account data store, backed by sqlite.
+
+    Deriving keys for large seeds is expensive. A KeyStore keeps them across runs.
+    It stores private keys in clear text, so only use it for test networks.
+    Inserts are buffered and written every flush_every entries (and on close).
+    """
+
+    def __init__(self, path, flush_every=1000):
+        self.path = path
+        self.flush_every = flush_every
+        self._pending = {}
+        self._connection = sqlite3.connect(str(path))
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS account_keys ("
+            "seed TEXT NOT NULL, idx INTEGER NOT NULL, "
+            "private TEXT NOT NULL, public TEXT NOT NULL, account TEXT NOT NULL, "
+            "PRIMARY KEY (seed, idx))")
+
+    def get(self, seed, index):
+        row = self._pending.get((seed, index))
+        if row is None:
+            row = self._connection.execute(
+                "SELECT private, public, account FROM account_keys WHERE seed = ? AND idx = ?",
+                (seed, index)).fetchone()
+        if row is None:
+            return None
+
+        private, public, account = row
+        return {
+            "private": private,
+            "public": public,
+            "account": account,
+            "seed": seed,
+            "index": index
+        }
+
+    def put(self, seed, index, account_data):
+        self._pending[(seed, index)] = (account_data["private"],
+                                        account_data["public"],
+                                        account_data["account"])
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO account_keys VALUES (?, ?, ?, ?, ?)",
+                [(seed, index, *row) for (seed, index), row in self._pending.items()])
+        self._pending.clear()
+
+    def close(self):
+        self.flush()
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,108 @@
+import json
+import time
+
+from nanomock.modules.nl_nanolib import NanoLibTools
+
+
+def percentile(sorted_values, percent):
+    # nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(latencies_s):
+    values = sorted(latencies_s)
+    return {
+        "count": len(values),
+        **{
+            f"p{p}_ms": None if not values else round(percentile(values, p) * 1000, 1)
+            for p in (50, 95, 99)
+        }
+    }
+
+
+class LatencyTracker:
+    """Per node propagation and confirmation latency, measured from publish time.
+
+    Listens on the websockets of a ConfirmationSubscriber : "new_unconfirmed_block"
+    tells when a node first sees a block, "confirmation" when it confirms it.
+    Only blocks registered with track() are recorded, their publish time is
+    set by mark_published (BlockPublisher does both when given a tracker).
+    """
+
+    def __init__(self, subscriber):
+        self.subscriber = subscriber
+        self.nano_lib = NanoLibTools()
+        self.tracked = set()
+        self.published = {}  # hash -> published_at
+        self.seen = {}  # hash -> {node_name: received_at}
+        self.confirmed = {}  # hash -> {node_name: received_at}
+        subscriber.add_listener(self._on_confirmation)
+        for socket in subscriber.sockets.values():
+            socket.add_listener(self._on_message)
+
+    async def start(self):
+        # must run after subscriber.start(), it reuses the open connections
+        options = {"accounts": self.subscriber.accounts} if self.subscriber.accounts else None
+        for socket in self.subscriber.sockets.values():
+            await socket.subscribe("new_unconfirmed_block", options)
+
+    def track(self, block_hash):
+        # before the first publish attempt : nodes may notify before the process call returns
+        self.tracked.add(block_hash)
+
+    def mark_published(self, block_hash, published_at=None):
+        """Publish time of a block, the start of the attempt the node accepted."""
+        self.tracked.add(block_hash)
+        self.published.setdefault(block_hash, published_at or time.time())
+
+    def _on_message(self, node_name, topic, message, received_at):
+        if topic != "new_unconfirmed_block" or not self.tracked:
+            return
+        block_hash = self.nano_lib.get_block_hash(message)
+        if block_hash in self.tracked:
+            self.seen.setdefault(block_hash, {}).setdefault(node_name, received_at)
+
+    def _on_confirmation(self, node_name, message, received_at):
+        if message["hash"] in self.tracked:
+            self.confirmed.setdefault(message["hash"], {}).setdefault(node_name, received_at)
+
+    def _latencies(self, events, node_name):
+        return [
+            node_times[node_name] - self.published[block_hash]
+            for block_hash, node_times in events.items()
+            if block_hash in self.published and node_name in node_times
+        ]
+
+    def report(self):
+        nodes = list(self.subscriber.sockets)
+        report = {"blocks_published": len(self.published), "nodes": {}}
+
+        for node_name in nodes:
+            report["nodes"][node_name] = {
+                "seen": summarize(self._latencies(self.seen, node_name)),
+                "confirmed": summarize(self._latencies(self.confirmed, node_name))
+            }
+
+        first_confirmed, all_confirmed = [], []
+        for block_hash, published_at in self.published.items():
+            node_times = self.confirmed.get(block_hash, {})
+            if node_times:
+                first_confirmed.append(min(node_times.values()) - published_at)
+            if node_times and all(node in node_times for node in nodes):
+                all_confirmed.append(max(node_times.values()) - published_at)
+
+        report["network"] = {
+            "seen": summarize([t for n in nodes for t in self._latencies(self.seen, n)]),
+            "confirmed": summarize([t for n in nodes for t in self._latencies(self.confirmed, n)]),
+            "first_confirmed": summarize(first_confirmed),
+            "all_confirmed": summarize(all_confirmed),
+            "unconfirmed": len(self.published) - len(first_confirmed)
+        }
+        return report
+
+    def write_results(self, path):
+        with open(path, "w", encoding='utf-8') as f:
+            json.dump(self.report(), f, separators=(",", ":"))
@@ -0,0 +1,116 @@
+import errno
+import fcntl
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# ledger and wallet databases inside every node's NanoTest directory
+LEDGER_FILES = ("data.ldb", "wallets.ldb", "rocksdb")
+FRONTIERS_FILE = "frontiers.json"
+# linux FICLONE ioctl : copy on write clone (btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+
+def _reflink(src, dst):
+    with open(src, "rb") as src_f, open(dst, "wb") as dst_f:
+        fcntl.ioctl(dst_f.fileno(), FICLONE, src_f.fileno())
+
+
+def _is_immutable(path: Path):
+    # rocksdb never modifies a table file once written, a hardlink can't be changed behind our back
+    return path.suffix == ".sst" and path.parent.name == "rocksdb"
+
+
+def clone_file(src: Path, dst: Path):
+    """Copies src to dst as cheaply as the filesystem allows.
+
+    Returns "reflink", "hardlink" (immutable rocksdb tables only) or "copy".
+    LMDB files (data.ldb) are written in place and are never hardlinked.
+    """
+    try:
+        _reflink(src, dst)
+        shutil.copystat(src, dst)
+        return "reflink"
+    except OSError as exc:
+        if exc.errno not in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS):
+            raise
+        if dst.exists():
+            dst.unlink()
+
+    if _is_immutable(src):
+        try:
+            os.link(src, dst)
+            return "hardlink"
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+def _ledger_paths(node_dir: Path):
+    return [node_dir / name for name in LEDGER_FILES if (node_dir / name).exists()]
+
+
+def _remove_ledger(node_dir: Path):
+    for path in _ledger_paths(node_dir):
+        if path.is_dir():
+            shutil.rmtree(path)
+        else:
+            path.unlink()
+
+
+def _collect_files(src_dir: Path, dst_dir: Path):
+    # (src, dst) of every ledger file, destination directories are created on the way
+    files = []
+    for path in _ledger_paths(src_dir):
+        if path.is_dir():
+            for file_path in path.rglob("*"):
+                if file_path.is_file():
+                    dst = dst_dir / file_path.relative_to(src_dir)
+                    dst.parent.mkdir(parents=True, exist_ok=True)
+                    files.append((file_path, dst))
+        else:
+            dst_dir.mkdir(parents=True, exist_ok=True)
+            files.append((path, dst_dir / path.name))
+    return files
+
+
+def _clone_dirs(dir_pairs, max_workers=None):
+    files = []
+    for src_dir, dst_dir in dir_pairs:
+        dst_dir.mkdir(parents=True, exist_ok=True)
+        _remove_ledger(dst_dir)
+        files.extend(_collect_files(src_dir, dst_dir))
+
+    stats = {"files": len(files), "reflink": 0, "hardlink": 0, "copy": 0, "bytes": 0}
+    with ThreadPoolExecutor(max_workers=max_workers or min(32, (os.cpu_count() or 1) * 4)) as executor:
+        for (src, _), method in zip(files, executor.map(lambda pair: clone_file(*pair), files)):
+            stats[method] += 1
+            stats["bytes"] += src.stat().st_size
+    return stats
+
+
+def get_node_dir(nodes_path, node_name) -> Path:
+    return Path(nodes_path) / node_name / "NanoTest"
+
+
+def snapshot_ledgers(nodes_path, snapshot_path, node_names, max_workers=None):
+    """Captures the ledger and wallet databases of every node into snapshot_path.
+
+    Nodes must be stopped, a running node may hold a half written ledger.
+    Returns the number of files and bytes and how each file was cloned.
+    """
+    snapshot_path = Path(snapshot_path)
+    return _clone_dirs([(get_node_dir(nodes_path, node_name), snapshot_path / node_name)
+                        for node_name in node_names], max_workers)
+
+
+def restore_ledgers(snapshot_path, nodes_path, node_names, max_workers=None):
+    """Replaces the ledger and wallet databases of every node by those of snapshot_path."""
+    snapshot_path = Path(snapshot_path)
+    missing = [node_name for node_name in node_names if not (snapshot_path / node_name).is_dir()]
+    if missing:
+        raise ValueError(f"Snapshot {snapshot_path} has no ledger for {', '.join(missing)}")
+    return _clone_dirs([(snapshot_path / node_name, get_node_dir(nodes_path, node_name))
+                        for node_name in node_names], max_workers)
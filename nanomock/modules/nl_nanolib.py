@@ -1,46 +1,73 @@
 from nano_lib_py import Block, get_account_id, get_account_key_pair, AccountIDPrefix, generate_account_private_key, get_account_public_key, Block
-from decimal import Decimal, getcontext
+from functools import lru_cache
+
+from nanomock.modules.nl_balance_planner import scale_raw, percent_of_raw
+from nanomock.modules.nl_block_validator import hash_state_block
+
+# derived keys are pure functions of their input, keep the most recent ones in memory
+KEY_CACHE_SIZE = 2**16
 
 
 def raw_high_precision_multiply(raw, multiplier) -> int:
-    getcontext().prec = 1000  # Adjust precision as needed
-    raw_amount = (Decimal(str(raw)) * Decimal(str(multiplier)))
-    return int(raw_amount)
+    # exact rational arithmetic, no global decimal context involved
+    return scale_raw(raw, multiplier)
 
 
 def raw_high_precision_percent(raw, percent) -> int:
-    getcontext().prec = 1000  # Adjust precision as needed
-    raw_amount = (Decimal(str(raw)) * Decimal(str(percent)) / Decimal('100'))
-    return int(raw_amount)
+    return percent_of_raw(raw, percent)
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def _expand_private_key(private_key):
+    account_key_pair = get_account_key_pair(private_key)
+    account = get_account_id(public_key=account_key_pair.public,
+                             prefix=AccountIDPrefix.NANO)
+    return account_key_pair.private, account_key_pair.public, account
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def _derive_private_key(seed, index):
+    return generate_account_private_key(seed, index)
 
 
 class NanoLibTools():
 
+    def __init__(self, keystore=None):
+        # optional persistent KeyStore for accounts derived from seeds
+        self.keystore = keystore
+
     def get_account_from_public(self, public_key):
         return get_account_id(public_key=public_key,
                               prefix=AccountIDPrefix.NANO)
 
     def key_expand(self, private_key):
-        account_key_pair = get_account_key_pair(private_key)
-        account = get_account_id(public_key=account_key_pair.public,
-                                 prefix=AccountIDPrefix.NANO)
+        private, public, account = _expand_private_key(private_key)
         response = {
-            "private": account_key_pair.private,
-            "public": account_key_pair.public,
+            "private": private,
+            "public": public,
             "account": account
         }
         return response
 
     def nanolib_account_data(self, private_key=None, seed=None, index=0):
         if seed is not None:
-            private_key = generate_account_private_key(seed, index)
+            response = self.keystore.get(seed, index) if self.keystore is not None else None
+            if response is not None:
+                return response
+            private_key = _derive_private_key(seed, index)
         response = self.key_expand(private_key)
 
         if seed is not None:
             response["seed"] = seed
             response["index"] = index
+            if self.keystore is not None:
+                self.keystore.put(seed, index, response)
         return response
 
+    def get_block_hash(self, json_block):
+        # local blake2b, json blocks from rpc / websocket may carry extra keys like "subtype"
+        return hash_state_block(json_block)
+
     def get_state_block(self, account, representative, previous, balance,
                         link):
 
@@ -58,10 +85,16 @@ class NanoLibTools():
                            balance,
                            link,
                            key,
-                           difficulty=None):
+                           difficulty=None,
+                           work=None):
 
         block = self.get_state_block(account, representative, previous,
                                      balance, link)
-        block.solve_work(difficulty=difficulty)
+        if work is not None:
+            # precomputed work (e.g. from WorkCache), skip solving
+            block.difficulty = difficulty or block.difficulty
+            block.work = work
+        else:
+            block.solve_work(difficulty=difficulty)
         block.sign(key)
         return block
@@ -0,0 +1,210 @@
+import gzip
+import os
+import queue
+import tarfile
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ARCHIVE_ROOT = "nano_nodes"
+CHUNK_SIZE = 4 * 2**20
+_EOF = object()
+# tarfile's "data" filter (when available) : nothing is written outside of the target directory
+_EXTRACT_FILTER = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+
+
+class ParallelGzipWriter:
+    """Write only file object that gzip compresses on several cores.
+
+    The stream is cut into chunk_size chunks, every chunk is compressed as its
+    own gzip member by a thread pool (zlib releases the GIL) and written in
+    order. Concatenated members are a regular .gz file (gzip, tar -xz, ...).
+    """
+
+    def __init__(self, fileobj, level=6, chunk_size=CHUNK_SIZE, max_workers=None):
+        self.fileobj = fileobj
+        self.level = level
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self._buffer = bytearray()
+        self._pending = deque()
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def _compress(self, chunk):
+        return gzip.compress(chunk, compresslevel=self.level, mtime=0)
+
+    def _write_done(self, wait_for):
+        # members are written in submission order, at most wait_for chunks stay in flight
+        while len(self._pending) > wait_for:
+            member = self._pending.popleft().result()
+            self.fileobj.write(member)
+            self.bytes_out += len(member)
+
+    def _submit(self, chunk):
+        self._pending.append(self._executor.submit(self._compress, bytes(chunk)))
+        self._write_done(2 * self.max_workers)
+
+    def write(self, data):
+        self._buffer.extend(data)
+        self.bytes_in += len(data)
+        while len(self._buffer) >= self.chunk_size:
+            self._submit(self._buffer[:self.chunk_size])
+            del self._buffer[:self.chunk_size]
+        return len(data)
+
+    def close(self):
+        if self._executor is None:
+            return
+        if self._buffer:
+            self._submit(self._buffer)
+            self._buffer = bytearray()
+        self._write_done(0)
+        self._executor.shutdown()
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class PipelinedGzipReader:
+    """Read only file object of a (multi member) .gz file.
+
+    A background thread reads and decompresses ahead of the consumer, so
+    decompression and extraction run on different cores. At most max_chunks
+    chunks of read_size decompressed bytes are buffered. close() stops the
+    thread even if the consumer stopped reading early.
+    """
+
+    def __init__(self, fileobj, read_size=CHUNK_SIZE, max_chunks=8):
+        self.fileobj = fileobj
+        self.read_size = read_size
+        self._chunks = queue.Queue(maxsize=max_chunks)
+        self._chunk = b""
+        self._offset = 0
+        self._eof = False
+        self._error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._decompress, daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        # blocks while the consumer is behind, gives up once the reader is closed
+        while not self._stop.is_set():
+            try:
+                self._chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _decompress(self):
+        try:
+            decompressor = zlib.decompressobj(wbits=31)
+            while not self._stop.is_set():
+                data = self.fileobj.read(self.read_size)
+                if not data:
+                    break
+                while data:
+                    # max_length : a highly compressed chunk can't expand beyond read_size at once
+                    chunk = decompressor.decompress(data, self.read_size)
+                    if chunk and not self._put(chunk):
+                        return
+                    if decompressor.eof:
+                        # next gzip member
+                        data = decompressor.unused_data
+                        decompressor = zlib.decompressobj(wbits=31)
+                    else:
+                        data = decompressor.unconsumed_tail
+            self._put(decompressor.flush())
+        except Exception as exc:  # pylint: disable=broad-except
+            self._error = exc
+        self._put(_EOF)
+
+    def read(self, size=-1):
+        # slices of the current chunk, tarfile reads small records and chunks are large
+        parts = []
+        while size != 0:
+            if self._offset >= len(self._chunk):
+                if self._eof:
+                    break
+                chunk = self._chunks.get()
+                if chunk is _EOF:
+                    self._eof = True
+                    if self._error is not None:
+                        raise self._error
+                    break
+                self._chunk, self._offset = chunk, 0
+                continue
+            end = len(self._chunk) if size < 0 else min(len(self._chunk), self._offset + size)
+            parts.append(self._chunk[self._offset:end])
+            if size > 0:
+                size -= end - self._offset
+            self._offset = end
+        return b"".join(parts)
+
+    def close(self):
+        self._chunk, self._offset, self._eof = b"", 0, True
+        self._stop.set()
+        # unblock a producer waiting on a full queue
+        while True:
+            try:
+                self._chunks.get_nowait()
+            except queue.Empty:
+                break
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def export_network(nodes_path, archive_path, level=6, max_workers=None):
+    """Streams the whole nano_nodes directory (compose file, env, node configs and ledgers) into one .tar.gz."""
+    start = time.time()
+    with open(archive_path, "wb") as f, ParallelGzipWriter(f, level=level,
+                                                           max_workers=max_workers) as writer:
+        with tarfile.open(fileobj=writer, mode="w|") as tar:
+            tar.add(nodes_path, arcname=ARCHIVE_ROOT)
+    return {
+        "bytes": writer.bytes_in,
+        "compressed_bytes": writer.bytes_out,
+        "elapsed_s": round(time.time() - start, 3)
+    }
+
+
+def _strip_root(tar):
+    prefix = f"{ARCHIVE_ROOT}/"
+    for member in tar:
+        if member.name == ARCHIVE_ROOT:
+            continue
+        if not member.name.startswith(prefix):
+            raise ValueError(f"{member.name} is not part of a network archive")
+        member.name = member.name[len(prefix):]
+        yield member
+
+
+def import_network(archive_path, nodes_path):
+    """Unpacks an archive written by export_network into nodes_path, which must be empty or missing."""
+    nodes_path = Path(nodes_path)
+    if nodes_path.exists() and any(nodes_path.iterdir()):
+        raise ValueError(f"{nodes_path} is not empty. Run destroy before importing a network")
+    nodes_path.mkdir(parents=True, exist_ok=True)
+
+    start = time.time()
+    files = 0
+    with open(archive_path, "rb") as f, PipelinedGzipReader(f) as reader:
+        with tarfile.open(fileobj=reader, mode="r|") as tar:
+            for member in _strip_root(tar):
+                tar.extract(member, nodes_path, **_EXTRACT_FILTER)
+                files += member.isfile()
+    return {"files": files, "elapsed_s": round(time.time() - start, 3)}
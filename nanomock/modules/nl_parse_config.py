@@ -12,7 +12,8 @@ import tomli_w
 import oyaml as yaml
 from extradict import NestedData
 
-from nanomock.modules.nl_nanolib import NanoLibTools, raw_high_precision_multiply, Block
+from nanomock.modules.nl_nanolib import NanoLibTools, Block
+from nanomock.modules.nl_balance_planner import scale_raw
 from nanomock.modules.nl_rpc import NanoRpc
 from nanomock.internal.utils import read_from_package_if_needed, is_packaged_version, find_device_for_path, convert_to_bytes, get_mock_logger
 from nanomock.internal.feature_toggle import toggle
@@ -142,7 +143,7 @@ class ConfigParser:
             node["account"] = account_data["account"]
             node["account_data"] = account_data
             if "vote_weight_percent" in node:
-                node["balance"] = raw_high_precision_multiply(
+                node["balance"] = scale_raw(
                     available_supply, node["vote_weight_percent"])
 
     def __set_special_account_data(self):
@@ -329,7 +330,7 @@ class ConfigParser:
         genesis_balance = available_supply
         for node_conf in self.get_nodes_config():
             if "vote_weight" in node_conf:
-                node_conf["balance"] = raw_high_precision_multiply(
+                node_conf["balance"] = scale_raw(
                     available_supply, node_conf["vote_weight"])
             # evaluate if a node is a PR
             # if a node has more than 0.1% of available supply it's considered a PR.
@@ -556,6 +557,13 @@ class ConfigParser:
             api.append(node_conf["rpc_url"])
         return api
 
+    def get_nodes_ws(self, nodes_name=None):
+        nodes_name = nodes_name or self.get_nodes_name()
+        return {
+            node_name: self.get_node_config(node_name)["ws_url"]
+            for node_name in nodes_name
+        }
+
     def get_nodes_rpc_port(self):
         api = {}
         for node_name in self.get_nodes_name():
@@ -0,0 +1,194 @@
+import asyncio
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from nanomock.internal.nl_block_tools import BlockReadWrite
+from nanomock.modules.nl_block_corpus import BlockCorpusReader, CORPUS_SUFFIX
+from nanomock.modules.nl_block_publisher import BlockPublisher
+from nanomock.modules.nl_rpc_pool import NanoRpcRegistry
+
+
+def iter_corpus(path):
+    """Yields (block_hash, json_block) in corpus order from any format written by BlockReadWrite."""
+    block_rw = BlockReadWrite()
+    if path.endswith(CORPUS_SUFFIX):
+        with BlockCorpusReader(path) as reader:
+            yield from reader
+    elif path.endswith(".jsonl"):
+        for entry in block_rw.iter_blocks_from_disk(path):
+            yield entry["h"], entry["b"]
+    else:
+        res = block_rw.read_blocks_from_disk(path)
+        for hash_list, block_list in zip(res["h"], res["b"]):
+            yield from zip(hash_list, block_list)
+
+
+def shard_of(account, shards):
+    # stable across processes, unlike hash()
+    return zlib.crc32(account.encode()) % shards
+
+
+def node_of(account, shards, nodes):
+    # independent of shard_of : the accounts of every shard are spread over all nodes,
+    # even when shards and nodes share a factor
+    return (zlib.crc32(account.encode()) // shards) % nodes
+
+
+class RatePacer:
+    """Spaces calls to wait() {rate} per second on an absolute schedule.
+
+    A caller that fell behind isn't slowed down until it is back on schedule.
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self._start = None
+        self._count = 0
+
+    async def wait(self):
+        now = time.monotonic()
+        if self._start is None:
+            self._start = now
+        delay = self._start + self._count / self.rate - now
+        self._count = self._count + 1
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class ReplayEngine:
+    """Publishes a block corpus at a fixed rate, spread over several nodes.
+
+    Every account is pinned to one node and its blocks are published one after
+    the other in corpus order, blocks of different accounts run concurrently
+    (at most max_in_flight).
+    """
+
+    def __init__(self, nodes_rpc, bps, max_in_flight=64, max_retries=5, async_process=False,
+                 tracker=None):
+        self.publishers = [
+            BlockPublisher(nano_rpc,
+                           max_retries=max_retries,
+                           async_process=async_process,
+                           tracker=tracker) for nano_rpc in nodes_rpc
+        ]
+        self.bps = bps
+        self.max_in_flight = max_in_flight
+
+    async def replay(self, blocks, shard=0, shards=1):
+        """Replays the (block_hash, json_block) pairs of this shard. Returns the shard's stats."""
+        stats = {"blocks": 0, "published": 0, "errors": 0, "attempts": 0,
+                 "started_at": time.time(), "finished_at": None}
+        pacer = RatePacer(self.bps)
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+        account_tails = {}  # account -> publish task of its latest block
+        tasks = set()
+
+        async def publish(block, publisher, previous_task):
+            try:
+                if previous_task is not None:
+                    await asyncio.wait({previous_task})
+                return await publisher.publish(block)
+            finally:
+                in_flight.release()
+
+        def on_done(task, account):
+            tasks.discard(task)
+            if account_tails.get(account) is task:
+                account_tails.pop(account)
+            if task.cancelled():
+                return  # the replay itself was cancelled
+            result = task.result()
+            stats["attempts"] += result["attempts"]
+            if result["published"]:
+                stats["published"] += 1
+            else:
+                stats["errors"] += 1
+
+        try:
+            for block_hash, json_block in blocks:
+                account = json_block["account"]
+                if shards > 1 and shard_of(account, shards) != shard:
+                    continue
+                await in_flight.acquire()
+                await pacer.wait()
+                publisher = self.publishers[node_of(account, shards, len(self.publishers))]
+                task = asyncio.create_task(
+                    publish({"hash": block_hash, "block": json_block}, publisher,
+                            account_tails.get(account)))
+                task.add_done_callback(lambda t, a=account: on_done(t, a))
+                account_tails[account] = task
+                tasks.add(task)
+                stats["blocks"] += 1
+
+            if tasks:
+                await asyncio.wait(set(tasks))
+        except asyncio.CancelledError:
+            # stop the publishes in flight along with the replay
+            for task in list(tasks):
+                task.cancel()
+            raise
+        stats["finished_at"] = time.time()
+        return stats
+
+
+def _replay_shard(path, rpc_urls, bps, shard, shards, max_in_flight, max_retries):
+    # entry point of a worker process : own event loop, own connection pools
+
+    async def run():
+        rpc_registry = NanoRpcRegistry()
+        try:
+            engine = ReplayEngine(rpc_registry.get_all(rpc_urls), bps,
+                                  max_in_flight=max_in_flight,
+                                  max_retries=max_retries)
+            return await engine.replay(iter_corpus(path), shard=shard, shards=shards)
+        finally:
+            await rpc_registry.close()
+
+    return asyncio.run(run())
+
+
+def merge_replay_stats(shard_stats, bps):
+    blocks = sum(stats["blocks"] for stats in shard_stats)
+    published = sum(stats["published"] for stats in shard_stats)
+    errors = sum(stats["errors"] for stats in shard_stats)
+    elapsed = max(stats["finished_at"] for stats in shard_stats) - min(
+        stats["started_at"] for stats in shard_stats)
+    return {
+        "blocks": blocks,
+        "published": published,
+        "errors": errors,
+        "attempts": sum(stats["attempts"] for stats in shard_stats),
+        "elapsed_s": round(elapsed, 3),
+        "target_bps": bps,
+        "achieved_bps": round(published / elapsed, 2) if elapsed > 0 else 0,
+        "error_rate": round(errors / blocks, 4) if blocks else 0
+    }
+
+
+async def replay_corpus(path, nodes_rpc, bps, workers=1, max_in_flight=64, max_retries=5,
+                        tracker=None):
+    """Replays the corpus at {path} at {bps} blocks per second to the given NanoRpc clients.
+
+    With workers > 1 the accounts are sharded over as many processes, each
+    publishing bps / workers. Returns the merged stats.
+    An optional LatencyTracker gets the publish time of every block, it needs a single worker.
+    """
+    if workers <= 1:
+        engine = ReplayEngine(nodes_rpc, bps,
+                              max_in_flight=max_in_flight,
+                              max_retries=max_retries,
+                              tracker=tracker)
+        return merge_replay_stats([await engine.replay(iter_corpus(path))], bps)
+    if tracker is not None:
+        raise ValueError("Latency tracking needs a single replay worker")
+
+    rpc_urls = [nano_rpc.get_url() for nano_rpc in nodes_rpc]
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        shard_stats = await asyncio.gather(*(
+            loop.run_in_executor(executor, _replay_shard, path, rpc_urls,
+                                 bps / workers, shard, workers,
+                                 max_in_flight, max_retries)
+            for shard in range(workers)))
+    return merge_replay_stats(shard_stats, bps)
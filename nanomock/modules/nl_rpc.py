@@ -1,26 +1,75 @@
 import traceback
 import secrets
+import asyncio
 import json
 import time
 from nanomock.internal.utils import logger
+from nanomock.modules.nl_block_publisher import BlockPublisher, DependencyScheduler, backoff_delay
+from nanomock.modules.nl_frontier_store import FrontierStore
 from nanomock.modules.nl_nanolib import NanoLibTools, get_account_public_key
 from nanorpc.client import NanoRpcTyped
-from nanomock.modules.nl_rpc_utils import format_account_data, format_balance_data
-
-# for block_creation, we store local frontier info, so that subsequant calls know about the most recent frontier without needing to publish the block to the ledger.
-_FRONTIER_INFO = {}
+from nanomock.modules.nl_rpc_utils import format_account_data, format_balance_data, DifficultyCache
 
 
 class NanoRpc:
-    def __init__(self, url, username=None, password=None, wrap_json=False):
+    def __init__(self, url, username=None, password=None, wrap_json=False, session_pool=None, frontier_store=None,
+                 offline=False, difficulty_ttl_s=30, work_engine=None, work_cache=None):
         self.url = url
         self.nano_lib = NanoLibTools()
+        # offline : create_block only reads the local frontier store and signs / solves work locally
+        self.offline = offline
+        self.work_engine = work_engine
+        # optional WorkCache : precomputes the work of the next block of every new frontier
+        self.work_cache = work_cache
+        self.difficulty_cache = DifficultyCache(self.active_difficulty, ttl_s=difficulty_ttl_s)
+        # for block_creation, we store local frontier info, so that subsequent calls know about the most recent frontier without needing to publish the block to the ledger.
+        self.frontier_store = frontier_store if frontier_store is not None else FrontierStore()
         self.nanorpc = NanoRpcTyped(
             url=url, username=username, password=password, wrap_json=wrap_json)
+        self.session_pool = session_pool
+        if session_pool is not None:
+            # reuse the keep-alive connections of the pool instead of one session per request
+            self.nanorpc.rpc._request = self._pooled_request
 
     def get_url(self):
         return self.url
 
+    def set_offline_difficulty(self, network_minimum, network_receive_minimum=None):
+        # no active_difficulty rpc will be issued for local block creation anymore
+        self.difficulty_cache.pin(network_minimum, network_receive_minimum)
+
+    async def load_frontiers(self, accounts):
+        """Seeds the local frontier store once, before creating blocks offline.
+
+        Returns {account: account_info response} for the accounts that were not stored
+        (unopened accounts included).
+        """
+        not_loaded = {}
+
+        async def load(account):
+            account_info = await self.account_info(account)
+            if account_info and "error" not in account_info:
+                self.frontier_store.set(account, account_info["frontier"],
+                                        account_info["balance"],
+                                        account_info["representative"])
+            else:
+                not_loaded[account] = account_info
+
+        await asyncio.gather(*(load(account) for account in accounts))
+        return not_loaded
+
+    async def _pooled_request(self, payloads):
+        rpc = self.nanorpc.rpc
+        session = self.session_pool.get_session(self.url, auth=rpc.auth)
+        async with session.post(self.url, json=payloads[0], headers=rpc.headers) as response:
+            response_data = await response.json()
+            if rpc.wrap_json and not isinstance(response_data, dict):
+                response_data = {
+                    "msg": response_data,
+                    "error": "wrapped into valid json"
+                }
+            return response_data
+
     async def account_balance(self, account, include_only_confirmed):
         return await self.nanorpc.account_balance(account, include_only_confirmed=include_only_confirmed)
 
@@ -58,6 +107,11 @@ class NanoRpc:
         return await self.nanorpc.process(block, force=force, subtype=subtype, json_block=json_block, async_=async_)
 
     async def work_generate(self, block_hash, use_peers=None, difficulty=None, multiplier=None, account=None, version=None, block=None, json_block=True):
+        if self.work_cache is not None and multiplier is None:
+            cache_difficulty = difficulty or (await self.difficulty_cache.get())["network_minimum"]
+            work = await self.work_cache.get(block_hash, cache_difficulty)
+            if work is not None:
+                return {"work": work, "difficulty": cache_difficulty, "hash": block_hash}
         return await self.nanorpc.work_generate(block_hash, use_peers=use_peers, difficulty=difficulty, multiplier=multiplier, account=account, version=version, block=block, json_block=json_block)
 
     async def account_create(self, wallet, index=None, work=None):
@@ -84,11 +138,28 @@ class NanoRpc:
     def generate_seed(self):
         return secrets.token_hex(32)
 
-    async def check_balances(self, seed, start_index=0, end_index=50):
+    async def check_balances(self, seed, start_index=0, end_index=50, chunk_size=1000, include_only_confirmed=True):
+        # keys are derived locally and balances fetched with one accounts_balances call per chunk
+        accounts = [
+            self.nano_lib.nanolib_account_data(seed=seed, index=index)["account"]
+            for index in range(start_index, end_index + 1)
+        ]
+        chunks = [accounts[i:i + chunk_size] for i in range(0, len(accounts), chunk_size)]
+        responses = await asyncio.gather(*(
+            self.accounts_balances(chunk, include_only_confirmed=include_only_confirmed)
+            for chunk in chunks))
+
         result = []
-        for index in range(start_index, end_index + 1):
-            nano_account = await self.generate_account(seed, index)
-            result.append(self.check_balance(nano_account["account"]))
+        for chunk, response in zip(chunks, responses):
+            # a failed call must not be reported as empty accounts
+            if not isinstance(response, dict) or "error" in response:
+                raise ValueError(
+                    f"accounts_balances failed for {len(chunk)} accounts ({chunk[0]} ...) : {response}")
+            balances = response.get("balances", {})
+            for account in chunk:
+                # unopened accounts are reported under "errors" by recent nodes
+                balance = balances.get(account, {"balance": "0", "pending": "0"})
+                result.append(format_balance_data(balance, account))
         return result
 
     async def generate_account(self, seed, index):
@@ -110,9 +181,9 @@ class NanoRpc:
 
         return format_balance_data(response, account)
 
-    async def block_confirmed(self, json_block=True, block_hash=None):
-        if json_block:
-            block_hash = await self.block_hash(json_block)["hash"]
+    async def block_confirmed(self, json_block=None, block_hash=None):
+        if block_hash is None and isinstance(json_block, dict):
+            block_hash = self.nano_lib.get_block_hash(json_block)
         if not block_hash:
             return False
 
@@ -224,8 +295,13 @@ class NanoRpc:
                            in_memory=False,
                            add_in_memory=False,
                            read_in_memory=False,
-                           use_rpc=True):
+                           use_rpc=True,
+                           offline=None):
         try:
+            offline = self.offline if offline is None else offline
+            if offline:
+                use_rpc = False
+                in_memory = True
             if in_memory:
                 add_in_memory = True
                 read_in_memory = True
@@ -236,110 +312,144 @@ class NanoRpc:
                 source_account_data = self.nano_lib.nanolib_account_data(
                     seed=source_seed, index=source_index)
 
-            if read_in_memory:
-                if source_account_data["account"] in _FRONTIER_INFO:
-                    source_account_info = _FRONTIER_INFO[
-                        source_account_data["account"]]
-                else:
-                    source_account_info = await self.account_info(
-                        source_account_data["account"])
-            else:
-                source_account_info = await self.account_info(
-                    source_account_data["account"])
-
-            if representative is None:
-                representative = source_account_info["representative"]
-            if "balance" in source_account_info:
-                balance = source_account_info["balance"]
-            if "frontier" in source_account_info:
-                previous = source_account_info["frontier"]
+            # blocks of the same account are built one after the other, other accounts run concurrently
+            async with self.frontier_store.lock(source_account_data["account"]):
+                block = await self._build_block(sub_type, source_account_data,
+                                                link, destination_account,
+                                                representative, amount_raw,
+                                                add_in_memory, read_in_memory,
+                                                use_rpc, offline)
 
-            if sub_type == "open" or sub_type == "receive":
-                # destination_account = source_account_data["account"]
-                if "error" in source_account_info:
-                    sub_type = "open"
-                    if use_rpc:
-                        previous = "0" * 64
-                    else:
-                        previous = None
-                    balance = amount_raw
-                    # link = link
+        except Exception as e:
+            traceback.print_exc()
+            block = {
+                "success": False,
+                "block": {},
+                "hash": None,
+                "subtype": sub_type,
+                "error": str(e)
+            }
+        return block
+
+    async def _build_block(self, sub_type, source_account_data, link,
+                           destination_account, representative, amount_raw,
+                           add_in_memory, read_in_memory, use_rpc, offline):
+        frontier_record = None
+        if read_in_memory:
+            frontier_record = self.frontier_store.get(
+                source_account_data["account"])
+
+        if frontier_record is not None:
+            source_account_info = frontier_record.to_account_info()
+        elif offline:
+            # accounts without local frontier are considered unopened, unless the store evicted accounts
+            if sub_type not in ("open", "receive") or self.frontier_store.evicted:
+                raise ValueError(
+                    f'{source_account_data["account"]} is unknown to the local frontier store. Can\'t create a {sub_type} block offline.'
+                    + (f' {self.frontier_store.evicted} accounts were evicted, it may be opened already (see frontier_store_max_accounts).'
+                       if self.frontier_store.evicted else ''))
+            source_account_info = {"error": "Account not found"}
+        else:
+            source_account_info = await self.account_info(
+                source_account_data["account"])
+
+        if representative is None:
+            representative = source_account_info["representative"]
+        if "balance" in source_account_info:
+            balance = source_account_info["balance"]
+        if "frontier" in source_account_info:
+            previous = source_account_info["frontier"]
+
+        if sub_type == "open" or sub_type == "receive":
+            # destination_account = source_account_data["account"]
+            if "error" in source_account_info:
+                sub_type = "open"
+                if use_rpc:
+                    previous = "0" * 64
                 else:
-                    sub_type = "receive"
-                    previous = source_account_info["frontier"]
-                    balance = int(
-                        source_account_info["balance"]) + int(amount_raw)
-                    # link = link
-
-            elif sub_type == "send":
-                link = get_account_public_key(account_id=destination_account)
-                balance = int(source_account_info["balance"]) - int(amount_raw)
+                    previous = None
+                balance = amount_raw
+                # link = link
+            else:
+                sub_type = "receive"
                 previous = source_account_info["frontier"]
-
-            elif sub_type == "change":
-                amount_raw = "0"
-                destination_account = source_account_data["account"]
+                balance = int(
+                    source_account_info["balance"]) + int(amount_raw)
                 # link = link
 
-            elif sub_type == "epoch":
-                if use_rpc:
-                    pass
-                else:
-                    balance = int(source_account_info["balance"])
+        elif sub_type == "send":
+            link = get_account_public_key(account_id=destination_account)
+            balance = int(source_account_info["balance"]) - int(amount_raw)
+            previous = source_account_info["frontier"]
+
+        elif sub_type == "change":
+            amount_raw = "0"
+            destination_account = source_account_data["account"]
+            # link = link
 
+        elif sub_type == "epoch":
             if use_rpc:
-                block = await self.block_create("state",
-                                                balance,
-                                                source_account_data["private"],
-                                                representative,
-                                                link,
-                                                previous,
-                                                json_block=True)
+                pass
             else:
-                active_difficulty = await self.active_difficulty()
-                lib_block = self.nano_lib.create_state_block(
-                    source_account_data["account"],
-                    representative,
-                    previous,
-                    balance,
-                    link,
-                    source_account_data["private"],
-                    difficulty=active_difficulty["network_minimum"])
-
-                block = {
-                    "hash": lib_block.block_hash,
-                    "difficulty": lib_block.difficulty,
-                    "block": json.loads(lib_block.json())
-                }
-
-            block["private"] = source_account_data["private"]
-            block["subtype"] = sub_type
-            block["amount_raw"] = amount_raw
-
-            if "error" in block:
-                block["success"] = False
-                block["block"] = {}
-                block["hash"] = None
+                balance = int(source_account_info["balance"])
+
+        difficulty, work = None, None
+        if not use_rpc or self.work_cache is not None:
+            difficulty = (await self.difficulty_cache.get())["network_minimum"]
+        if self.work_cache is not None and previous not in (None, "0" * 64):
+            # work speculatively solved when the previous block was created
+            work = await self.work_cache.get(previous, difficulty)
+
+        if use_rpc:
+            block = await self.block_create("state",
+                                            balance,
+                                            source_account_data["private"],
+                                            representative,
+                                            link,
+                                            previous,
+                                            work=work,
+                                            json_block=True)
+        else:
+            block_params = {
+                "account": source_account_data["account"],
+                "representative": representative,
+                "previous": previous,
+                "balance": balance,
+                "link": link,
+                "key": source_account_data["private"],
+                "difficulty": difficulty,
+                "work": work
+            }
+            if self.work_engine is not None:
+                # solve work and sign in the process pool, the event loop stays responsive
+                lib_block = await self.work_engine.create_state_block(**block_params)
             else:
-                block["success"] = True
-                block["error"] = None
-                if add_in_memory:
-                    _FRONTIER_INFO[source_account_data["account"]] = {
-                        "frontier": block["hash"],
-                        "balance": balance,
-                        "representative": representative
-                    }
-            block["block"]["subtype"] = sub_type
+                lib_block = self.nano_lib.create_state_block(**block_params)
 
-        except Exception as e:
-            traceback.print_exc()
             block = {
-                "success": False,
-                "block": {},
-                "hash": None,
-                "subtype": sub_type,
-                "error": str(e)
+                "hash": lib_block.block_hash,
+                "difficulty": lib_block.difficulty,
+                "block": json.loads(lib_block.json())
             }
+
+        block["private"] = source_account_data["private"]
+        block["subtype"] = sub_type
+        block["amount_raw"] = amount_raw
+
+        if "error" in block:
+            block["success"] = False
+            block["block"] = {}
+            block["hash"] = None
+        else:
+            block["success"] = True
+            block["error"] = None
+            if add_in_memory:
+                self.frontier_store.set(source_account_data["account"],
+                                        block["hash"], balance,
+                                        representative)
+            if self.work_cache is not None:
+                self.work_cache.precompute(block["hash"], difficulty)
+        block["block"]["subtype"] = sub_type
         return block
 
     async def get_block_result(self, block, broadcast, source_seed=None, source_index=None, exit_after_s=2):
@@ -382,10 +492,45 @@ class NanoRpc:
         return result
 
     async def _try_publish_block(self, block, start_time, exit_after_s):
+        attempt = 0
         while True:
             if time.time() - start_time > exit_after_s:
                 return None
             publish = await self.process(block["block"], json_block=True)
             if publish is not None:
                 return publish
-            time.sleep(0.5)  # Sleep briefly before trying again
+            # never block the event loop while waiting for the next attempt
+            await asyncio.sleep(backoff_delay(attempt))
+            attempt += 1
+
+    def get_publisher(self, max_in_flight=32, max_retries=5, async_process=False, tracker=None, validator=None):
+        return BlockPublisher(self,
+                              max_in_flight=max_in_flight,
+                              max_retries=max_retries,
+                              async_process=async_process,
+                              tracker=tracker,
+                              validator=validator)
+
+    async def publish_blocks(self, blocks, max_in_flight=32, max_retries=5, async_process=False, tracker=None,
+                             validator=None):
+        """Yields one publish result per block as each publish completes (see BlockPublisher)."""
+        publisher = self.get_publisher(max_in_flight=max_in_flight,
+                                       max_retries=max_retries,
+                                       async_process=async_process,
+                                       tracker=tracker,
+                                       validator=validator)
+        async for result in publisher.publish_many(blocks):
+            yield result
+
+    async def publish_block_dag(self, blocks, max_in_flight=32, max_retries=5, tracker=None, validator=None):
+        """Like publish_blocks, but a block is only sent once its previous block and its source send are published.
+
+        Blocks are always processed synchronously, an async_ acknowledgment doesn't mean the block is on the ledger.
+        """
+        scheduler = DependencyScheduler(
+            self.get_publisher(max_in_flight=max_in_flight,
+                               max_retries=max_retries,
+                               tracker=tracker,
+                               validator=validator))
+        async for result in scheduler.publish_many(blocks):
+            yield result
@@ -0,0 +1,82 @@
+import asyncio
+from aiohttp import ClientSession, TCPConnector
+
+from nanomock.modules.nl_rpc import NanoRpc
+from nanomock.modules.nl_frontier_store import FrontierStore
+
+DEFAULT_POOL_SIZE = 16
+DEFAULT_IDLE_TIMEOUT_S = 30
+
+
+class RpcSessionPool:
+    """Keeps one keep-alive aiohttp session (and connection pool) per rpc url."""
+
+    def __init__(self, pool_size=None, idle_timeout=None):
+        self.pool_size = int(pool_size or DEFAULT_POOL_SIZE)
+        self.idle_timeout = float(idle_timeout or DEFAULT_IDLE_TIMEOUT_S)
+        # url -> (session, loop). aiohttp sessions are bound to the loop they were created in
+        self._sessions = {}
+
+    def get_session(self, url, auth=None) -> ClientSession:
+        loop = asyncio.get_running_loop()
+        session, session_loop = self._sessions.get(url, (None, None))
+
+        if session is None or session.closed or session_loop is not loop:
+            if session is not None:
+                self._discard(session, session_loop)
+            connector = TCPConnector(limit=self.pool_size,
+                                     keepalive_timeout=self.idle_timeout)
+            session = ClientSession(connector=connector, auth=auth)
+            self._sessions[url] = (session, loop)
+        return session
+
+    @staticmethod
+    def _discard(session, session_loop):
+        """Closes a session bound to another loop than the running one."""
+        if session.closed:
+            return
+        if session_loop.is_running():
+            # loop of another thread : close the session in its own loop
+            asyncio.run_coroutine_threadsafe(session.close(), session_loop)
+            return
+        # a finished loop can't await session.close() anymore : the session is marked closed
+        # and releases its connector, whose transports are dropped with their loop
+        session.detach()
+
+    async def close(self):
+        loop = asyncio.get_running_loop()
+        for session, session_loop in self._sessions.values():
+            if session_loop is loop:
+                if not session.closed:
+                    await session.close()
+            else:
+                self._discard(session, session_loop)
+        self._sessions.clear()
+
+
+class NanoRpcRegistry:
+    """One NanoRpc client per url, all sharing the same RpcSessionPool and FrontierStore.
+
+    All nodes of a registry belong to the same network, so they share one local frontier ledger.
+    """
+
+    def __init__(self, pool_size=None, idle_timeout=None, frontier_store=None):
+        self.session_pool = RpcSessionPool(pool_size=pool_size,
+                                           idle_timeout=idle_timeout)
+        self.frontier_store = frontier_store if frontier_store is not None else FrontierStore()
+        self._clients = {}
+
+    def get(self, url, username=None, password=None) -> NanoRpc:
+        if url not in self._clients:
+            self._clients[url] = NanoRpc(url,
+                                         username=username,
+                                         password=password,
+                                         session_pool=self.session_pool,
+                                         frontier_store=self.frontier_store)
+        return self._clients[url]
+
+    def get_all(self, urls):
+        return [self.get(url) for url in urls]
+
+    async def close(self):
+        await self.session_pool.close()
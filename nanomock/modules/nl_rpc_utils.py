@@ -1,3 +1,5 @@
+import asyncio
+import time
 from enum import Enum
 
 
@@ -27,7 +29,7 @@ def format_account_data(response, seed, index):
 def format_balance_data(response, account):
     balance_format = BalanceFormat.NANO
     balance_raw = int(response["balance"])
-    pending_raw = int(response["pending"])
+    pending_raw = int(response.get("pending", response.get("receivable", 0)))
 
     # Apply the multiplier based on the chosen format
     multiplier = balance_format.value
@@ -43,3 +45,41 @@ def format_balance_data(response, account):
         "pending": _truncate(pending),
         "total": _truncate(total)
     }
+
+
+class DifficultyCache:
+    """Caches the active_difficulty response for ttl_s seconds.
+
+    A pinned difficulty (see pin) never expires and never triggers an rpc call.
+    """
+
+    def __init__(self, fetch, ttl_s=30):
+        self.fetch = fetch
+        self.ttl_s = ttl_s
+        self._difficulty = None
+        self._expires_at = 0
+        self._lock = None
+        self._lock_loop = None
+
+    def pin(self, network_minimum, network_receive_minimum=None):
+        self._difficulty = {
+            "network_minimum": network_minimum,
+            "network_receive_minimum": network_receive_minimum or network_minimum
+        }
+        self._expires_at = float("inf")
+
+    def invalidate(self):
+        self._expires_at = 0
+
+    async def get(self):
+        if time.monotonic() < self._expires_at:
+            return self._difficulty
+        loop = asyncio.get_running_loop()
+        if self._lock_loop is not loop:
+            self._lock, self._lock_loop = asyncio.Lock(), loop
+        async with self._lock:
+            # another coroutine may have refreshed the value while we waited
+            if time.monotonic() >= self._expires_at:
+                self._difficulty = await self.fetch()
+                self._expires_at = time.monotonic() + self.ttl_s
+        return self._difficulty
@@ -0,0 +1,249 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+
+from aiohttp import ClientSession, WSMsgType
+
+from nanomock.internal.utils import logger
+
+
+class NodeWebSocket:
+    """One websocket connection to a node, multiplexing every subscribed topic.
+
+    Listeners registered with add_listener are called with
+    (node_name, topic, message, received_at) for every incoming notification.
+    Close listeners (add_close_listener) are called with (node_name, error) when
+    the node closes the connection or the connection fails, not on close().
+    """
+
+    def __init__(self, node_name, ws_url, heartbeat_s=20):
+        self.node_name = node_name
+        self.ws_url = ws_url
+        self.heartbeat_s = heartbeat_s
+        self._session = None
+        self._ws = None
+        self._reader_task = None
+        self._listeners = []
+        self._close_listeners = []
+        self._closing = False
+        self.error = None
+
+    @property
+    def connected(self):
+        return self._ws is not None and not self._ws.closed
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def add_close_listener(self, callback):
+        self._close_listeners.append(callback)
+
+    async def connect(self):
+        if self.connected:
+            return
+        self._closing, self.error = False, None
+        self._session = ClientSession()
+        self._ws = await self._session.ws_connect(self.ws_url,
+                                                  heartbeat=self.heartbeat_s)
+        self._reader_task = asyncio.create_task(self._read())
+
+    async def send(self, payload):
+        await self._ws.send_str(json.dumps(payload))
+
+    async def subscribe(self, topic, options=None):
+        payload = {"action": "subscribe", "topic": topic}
+        if options:
+            payload["options"] = options
+        await self.send(payload)
+
+    async def update(self, topic, options):
+        await self.send({"action": "update", "topic": topic, "options": options})
+
+    def _dispatch(self, raw, received_at):
+        try:
+            data = json.loads(raw)
+        except ValueError as exc:
+            logger.warning("Websocket %s sent malformed json: %s", self.ws_url, exc)
+            return
+        if not isinstance(data, dict) or "topic" not in data or "message" not in data:
+            return  # acks and keepalive responses
+        for listener in self._listeners:
+            # a failing listener must neither stop the reader nor the other listeners
+            try:
+                listener(self.node_name, data["topic"], data["message"], received_at)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Websocket %s listener failed", self.ws_url)
+
+    async def _read(self):
+        try:
+            async for msg in self._ws:
+                if msg.type == WSMsgType.TEXT:
+                    self._dispatch(msg.data, time.time())
+                elif msg.type == WSMsgType.ERROR:
+                    self.error = self._ws.exception()
+                    logger.warning("Websocket %s error: %s", self.ws_url, self.error)
+        except Exception as exc:  # pylint: disable=broad-except
+            self.error = exc
+        if self._closing:
+            return
+        self.error = self.error or ConnectionError(f"Websocket {self.ws_url} closed by the node")
+        logger.warning("Websocket %s of %s lost: %s", self.ws_url, self.node_name, self.error)
+        for listener in self._close_listeners:
+            listener(self.node_name, self.error)
+
+    async def close(self):
+        self._closing = True
+        if self._ws is not None:
+            await self._ws.close()
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+        if self._session is not None:
+            await self._session.close()
+        self._ws, self._session, self._reader_task = None, None, None
+
+
+class _ConfirmationWaiter:
+
+    def __init__(self, hashes, nodes, future):
+        # nodes None : a confirmation from any node is enough
+        self.nodes = None if nodes is None else set(nodes)
+        self.remaining = {block_hash: None if nodes is None else set(nodes) for block_hash in hashes}
+        self.future = future
+
+    def confirm(self, block_hash, node_name):
+        if block_hash not in self.remaining:
+            return
+        nodes = self.remaining[block_hash]
+        if nodes is not None:
+            nodes.discard(node_name)
+        if nodes is None or not nodes:
+            self.remaining.pop(block_hash)
+        if not self.remaining and not self.future.done():
+            self.future.set_result(True)
+
+    def fail(self, error):
+        if not self.future.done():
+            self.future.set_exception(error)
+
+
+class ConfirmationSubscriber:
+    """Push based confirmation tracking over the confirmation topic of every node.
+
+    nodes_ws maps node names to their ws_url (see ConfigParser.get_nodes_ws).
+    accounts restricts the node side subscription, hashes are filtered locally.
+    When a node's websocket is lost, waiters that can no longer complete
+    raise its ConnectionError instead of waiting for their timeout.
+    """
+
+    def __init__(self, nodes_ws, accounts=None, max_tracked=10**6):
+        self.sockets = {
+            node_name: NodeWebSocket(node_name, ws_url)
+            for node_name, ws_url in nodes_ws.items()
+        }
+        self.accounts = list(accounts) if accounts else None
+        self.max_tracked = max_tracked
+        self._confirmed = OrderedDict()  # hash -> {node_name: received_at}
+        self._waiters = {}  # hash -> [_ConfirmationWaiter]
+        self._listeners = []
+
+    def add_listener(self, callback):
+        # callback(node_name, message, received_at) for every confirmation
+        self._listeners.append(callback)
+
+    def _subscription_options(self):
+        options = {"include_block": False}
+        if self.accounts:
+            options["accounts"] = self.accounts
+        return options
+
+    async def start(self):
+        for socket in self.sockets.values():
+            socket.add_listener(self._on_message)
+            socket.add_close_listener(self._on_socket_lost)
+        await asyncio.gather(*(socket.connect() for socket in self.sockets.values()))
+        await asyncio.gather(*(socket.subscribe("confirmation", self._subscription_options())
+                               for socket in self.sockets.values()))
+
+    async def watch_accounts(self, accounts):
+        accounts = list(accounts)
+        self.accounts = (self.accounts or []) + accounts
+        await asyncio.gather(*(socket.update("confirmation", {"accounts_add": accounts})
+                               for socket in self.sockets.values()))
+
+    def _on_message(self, node_name, topic, message, received_at):
+        if topic != "confirmation":
+            return
+        block_hash = message["hash"]
+        node_times = self._confirmed.setdefault(block_hash, {})
+        node_times.setdefault(node_name, received_at)
+        self._confirmed.move_to_end(block_hash)
+        if len(self._confirmed) > self.max_tracked:
+            self._confirmed.popitem(last=False)
+
+        for waiter in self._waiters.get(block_hash, []):
+            waiter.confirm(block_hash, node_name)
+        for listener in self._listeners:
+            listener(node_name, message, received_at)
+
+    def _get_lost_error(self, nodes):
+        # error of a lost socket the waiter depends on, None while it can still complete
+        if nodes is None:
+            if any(socket.connected for socket in self.sockets.values()):
+                return None
+            nodes = self.sockets
+        for node_name in nodes:
+            socket = self.sockets.get(node_name)
+            if socket is not None and socket.error is not None:
+                return socket.error
+        return None
+
+    def _on_socket_lost(self, node_name, error):
+        waiters = {id(waiter): waiter
+                   for block_waiters in self._waiters.values() for waiter in block_waiters}
+        for waiter in waiters.values():
+            if self._get_lost_error(waiter.nodes) is not None:
+                waiter.fail(error)
+
+    def get_confirmations(self, block_hash):
+        return self._confirmed.get(block_hash, {})
+
+    async def wait_for_confirmations(self, hashes, nodes=None, timeout=None):
+        """Waits until every hash is confirmed by any node (nodes=None) or by all given nodes.
+
+        Returns {hash: {node_name: received_at}}. Raises asyncio.TimeoutError after timeout seconds.
+        """
+        hashes = list(dict.fromkeys(hashes))
+        waiter = _ConfirmationWaiter(hashes, nodes,
+                                     asyncio.get_running_loop().create_future())
+        for block_hash in hashes:
+            self._waiters.setdefault(block_hash, []).append(waiter)
+            for node_name in self.get_confirmations(block_hash):
+                waiter.confirm(block_hash, node_name)
+        if not hashes:
+            waiter.future.set_result(True)
+        lost_error = self._get_lost_error(waiter.nodes)
+        if lost_error is not None:
+            waiter.fail(lost_error)
+
+        try:
+            await asyncio.wait_for(waiter.future, timeout)
+        finally:
+            for block_hash in hashes:
+                block_waiters = self._waiters.get(block_hash, [])
+                if waiter in block_waiters:
+                    block_waiters.remove(waiter)
+                if not block_waiters:
+                    self._waiters.pop(block_hash, None)
+
+        return {block_hash: dict(self.get_confirmations(block_hash)) for block_hash in hashes}
+
+    async def close(self):
+        await asyncio.gather(*(socket.close() for socket in self.sockets.values()))
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
@@ -0,0 +1,79 @@
+import asyncio
+from collections import OrderedDict
+
+from nano_lib_py.work import solve_work, validate_work
+from nano_lib_py.exceptions import InvalidWork
+
+
+class WorkCache:
+    """Speculative proof-of-work for the next block of an account.
+
+    The work of a block only depends on its previous hash, so as soon as a block
+    is created the work for its successor can be solved in the background.
+    Entries are keyed by that hash (the new frontier) and evicted least recently
+    used first once max_entries is reached.
+    """
+
+    def __init__(self, work_engine=None, max_entries=10000):
+        self.work_engine = work_engine
+        self.max_entries = max_entries
+        self._works = OrderedDict()  # work_hash -> work
+        self._pending = {}  # work_hash -> asyncio.Task
+
+    def __len__(self):
+        return len(self._works)
+
+    def __contains__(self, work_hash):
+        return work_hash in self._works or work_hash in self._pending
+
+    def put(self, work_hash, work):
+        self._works[work_hash] = work
+        self._works.move_to_end(work_hash)
+        while len(self._works) > self.max_entries:
+            self._works.popitem(last=False)
+
+    async def _solve(self, work_hash, difficulty):
+        if self.work_engine is not None:
+            return await self.work_engine.solve_work(work_hash, difficulty)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, solve_work, work_hash, difficulty)
+
+    async def _precompute(self, work_hash, difficulty):
+        try:
+            work = await self._solve(work_hash, difficulty)
+            if work:
+                self.put(work_hash, work)
+            return work
+        finally:
+            self._pending.pop(work_hash, None)
+
+    def precompute(self, work_hash, difficulty):
+        """Starts solving the work for work_hash in the background (must be called from a running loop)."""
+        if work_hash in self or len(self._pending) >= self.max_entries:
+            return
+        self._pending[work_hash] = asyncio.create_task(
+            self._precompute(work_hash, difficulty))
+
+    def _is_valid(self, work_hash, work, difficulty):
+        try:
+            validate_work(work_hash, work, difficulty)
+            return True
+        except InvalidWork:
+            return False
+
+    async def get(self, work_hash, difficulty):
+        """Returns cached or in-flight work meeting difficulty, None otherwise. Entries are consumed."""
+        task = self._pending.get(work_hash)
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            # asyncio.wait neither raises the task's errors nor cancels it
+            await asyncio.wait({task})
+
+        work = self._works.pop(work_hash, None)
+        if work is None or not self._is_valid(work_hash, work, difficulty):
+            return None
+        return work
+
+    def cancel_pending(self):
+        for task in self._pending.values():
+            task.cancel()
+        self._pending.clear()
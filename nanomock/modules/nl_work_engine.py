@@ -0,0 +1,87 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from nano_lib_py import Block
+from nano_lib_py.work import solve_work
+
+from nanomock.modules.nl_nanolib import NanoLibTools
+
+
+def _create_state_blocks_chunk(chunk):
+    # runs inside a worker process. Blocks travel back as dicts, Block instances aren't meant to be pickled
+    nano_lib = NanoLibTools()
+    return [
+        nano_lib.create_state_block(**block_params).to_dict()
+        for block_params in chunk
+    ]
+
+
+def _solve_work(work_hash, difficulty):
+    return solve_work(block_hash=work_hash, difficulty=difficulty)
+
+
+def _chunks(items, chunk_size):
+    for i in range(0, len(items), chunk_size):
+        yield items[i:i + chunk_size]
+
+
+class WorkEngine:
+    """Solves work and signs state blocks in a process pool sized to the host's cores.
+
+    Every method is awaitable and leaves the event loop free while the pool works.
+    Each block_params dict takes the arguments of NanoLibTools.create_state_block.
+    """
+
+    def __init__(self, max_workers=None, chunk_size=8):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), func, *args)
+
+    async def create_state_block(self, **block_params) -> Block:
+        blocks = await self.create_state_blocks([block_params])
+        return blocks[0]
+
+    async def create_state_blocks(self, block_params_list) -> list:
+        """Returns the signed blocks with work, in submission order."""
+        block_params_list = list(block_params_list)
+        chunk_results = await asyncio.gather(*(
+            self._run(_create_state_blocks_chunk, chunk)
+            for chunk in _chunks(block_params_list, self.chunk_size)))
+
+        blocks = []
+        for chunk_params, chunk_blocks in zip(
+                _chunks(block_params_list, self.chunk_size), chunk_results):
+            for block_params, block_dict in zip(chunk_params, chunk_blocks):
+                blocks.append(
+                    Block.from_dict(block_dict,
+                                    verify=False,
+                                    difficulty=block_params.get("difficulty")))
+        return blocks
+
+    async def solve_work(self, work_hash, difficulty) -> str:
+        return await self._run(_solve_work, work_hash, difficulty)
+
+    async def solve_works(self, work_hashes, difficulty) -> list:
+        return await asyncio.gather(*(self.solve_work(work_hash, difficulty)
+                                      for work_hash in work_hashes))
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
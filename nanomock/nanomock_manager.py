@@ -15,7 +15,15 @@ from nanomock.internal.dependency_checker import DependencyChecker
 from nanomock.modules.nl_parse_config import ConfigParser, ConfigReadWrite
 from nanomock.internal.nl_initialise import InitialBlocks
 from nanomock.docker import create_docker_interface
-from nanomock.modules.nl_rpc import NanoRpc
+from nanomock.modules.nl_rpc_pool import NanoRpcRegistry
+from nanomock.modules.nl_frontier_store import FrontierStore
+from nanomock.modules.nl_websocket import ConfirmationSubscriber
+from nanomock.modules.nl_latency import LatencyTracker
+from nanomock.modules.nl_replay import replay_corpus, iter_corpus
+from nanomock.modules.nl_corpus_verifier import verify_corpus
+from nanomock.modules.nl_corpus_cache import CorpusCache
+from nanomock.modules.nl_ledger_snapshot import snapshot_ledgers, restore_ledgers, FRONTIERS_FILE
+from nanomock.modules.nl_network_archive import export_network, import_network
 from nanomock.internal.utils import log_on_success, shutil_rmtree, extract_packaged_services_to_disk, subprocess_run_capture_output
 from nanomock.internal.utils import logger
 
@@ -47,6 +55,13 @@ class NanoLocalManager:
 
         self.docker_interface = create_docker_interface(
             self.compose_yml_path, self.project_name)
+        # one keep-alive connection pool per node for the lifetime of the manager
+        self.rpc_registry = NanoRpcRegistry(
+            pool_size=self.conf_p.get_config_value("rpc_pool_size"),
+            idle_timeout=self.conf_p.get_config_value("rpc_idle_timeout_s"),
+            frontier_store=FrontierStore(
+                network=self.conf_p.get_network_name(),
+                max_accounts=self.conf_p.get_config_value("frontier_store_max_accounts")))
 
     def _initialize_command_mapping(self):
         # (command_method , validation_method)
@@ -67,6 +82,11 @@ class NanoLocalManager:
             'down': (self.remove_containers, None),
             'destroy': (lambda: self.destroy(remove_files=True), None),
             'rpc': (self.run_rpc, self._validator_rpc),
+            'replay': (self.replay, self._validator_replay),
+            'snapshot': (self.snapshot, self._validator_snapshot),
+            'restore': (self.restore, self._validator_snapshot),
+            'export': (self.export_network, self._validator_archive),
+            'import': (self.import_network, self._validator_archive),
             'conf_edit': (self.conf_edit, self._validator_conf_edit)
         }
 
@@ -188,7 +208,7 @@ class NanoLocalManager:
         nodes_block_count = []
 
         nodes_rpc = ([
-            NanoRpc(self.conf_p.get_node_rpc(node)) for node in nodes_name
+            self.rpc_registry.get(self.conf_p.get_node_rpc(node)) for node in nodes_name
         ] if nodes_name is not None else self._get_all_rpc())
 
         async def get_block_count_for_node(node_rpc):
@@ -250,15 +270,19 @@ class NanoLocalManager:
         return '\n' + '\n'.join(report)
 
 
+    def get_confirmation_subscriber(self, nodes: Optional[List[str]] = None, accounts=None) -> ConfirmationSubscriber:
+        # use as "async with manager.get_confirmation_subscriber() as subscriber:"
+        return ConfirmationSubscriber(self.conf_p.get_nodes_ws(nodes), accounts=accounts)
+
     def _get_all_rpc(self):
-        return [NanoRpc(x) for x in self.conf_p.get_nodes_rpc()]
+        return self.rpc_registry.get_all(self.conf_p.get_nodes_rpc())
 
     async def _is_rpc_available(self,
                                 container: str,
                                 timeout: int = 3) -> Tuple[str, bool]:
         rpc_url = self.conf_p.get_node_rpc(container)
         try:
-            nano_rpc = NanoRpc(rpc_url)
+            nano_rpc = self.rpc_registry.get(rpc_url)
             block_count = await nano_rpc.block_count()
             if block_count:
                 return container, True
@@ -365,6 +389,90 @@ class NanoLocalManager:
 
         return nodes, payload
 
+    def _validator_replay(self, nodes=None, payload=None):
+        if payload is None:
+            raise ValueError(
+                "payload must be provided '{\"path\" : ... , \"bps\": ...}'")
+        if "path" not in payload:
+            raise ValueError("key \"path\" must be provided")
+        if "bps" not in payload:
+            raise ValueError("key \"bps\" must be provided")
+        if float(payload["bps"]) <= 0:
+            raise ValueError("bps must be greater than 0")
+        if payload.get("latency") and int(payload.get("workers", 1)) > 1:
+            raise ValueError("\"latency\" needs a single worker")
+
+        return nodes, payload
+
+    def _validator_snapshot(self, nodes=None, payload=None):
+        payload = payload or {}
+        name = str(payload.get("name", "default"))
+        if not name or name in (".", "..") or os.sep in name:
+            raise ValueError(f"\"{name}\" is not a valid snapshot name")
+        payload["name"] = name
+        return nodes, payload
+
+    def _get_snapshot_path(self, name):
+        # next to nano_nodes, reset_nodes_data must not delete the snapshot ledgers
+        return Path(self.nano_nodes_path).parent / "nano_snapshots" / name
+
+    @log_on_success
+    async def snapshot(self, payload=None, nodes=None):
+        nodes = nodes or self.conf_p.get_nodes_name()
+        snapshot_path = self._get_snapshot_path(payload["name"])
+
+        # a consistent ledger copy needs stopped nodes
+        await self.stop_containers(nodes)
+        try:
+            stats = snapshot_ledgers(self.nano_nodes_path, snapshot_path, nodes)
+            self.rpc_registry.frontier_store.snapshot(snapshot_path / FRONTIERS_FILE)
+        finally:
+            await self.start_containers(nodes)
+        return None, f'Snapshot "{payload["name"]}" of {len(nodes)} nodes saved to {snapshot_path} : {json.dumps(stats)}'
+
+    @log_on_success
+    async def restore(self, payload=None, nodes=None):
+        nodes = nodes or self.conf_p.get_nodes_name()
+        snapshot_path = self._get_snapshot_path(payload["name"])
+        if not snapshot_path.is_dir():
+            raise ValueError(f'Snapshot "{payload["name"]}" doesn\'t exist ({snapshot_path})')
+
+        await self.stop_containers(nodes)
+        try:
+            stats = restore_ledgers(snapshot_path, self.nano_nodes_path, nodes)
+            # local frontiers must match the restored ledgers
+            if (snapshot_path / FRONTIERS_FILE).exists():
+                self.rpc_registry.frontier_store.restore(snapshot_path / FRONTIERS_FILE)
+            else:
+                self.rpc_registry.frontier_store.clear()
+        finally:
+            await self.start_containers(nodes)
+        return None, f'Snapshot "{payload["name"]}" restored on {len(nodes)} nodes : {json.dumps(stats)}'
+
+    def _validator_archive(self, nodes=None, payload=None):
+        if payload is None or "path" not in payload:
+            raise ValueError(
+                "payload must be provided '{\"path\" : \"network.tar.gz\"}'")
+        return nodes, payload
+
+    @log_on_success
+    async def export_network(self, payload=None):
+        # a consistent ledger copy needs stopped nodes
+        nodes = self.conf_p.get_nodes_name()
+        await self.stop_containers(nodes)
+        try:
+            stats = export_network(self.nano_nodes_path, payload["path"],
+                                   level=payload.get("level", 6))
+        finally:
+            await self.start_containers(nodes)
+        return None, f'Network exported to {payload["path"]} : {json.dumps(stats)}'
+
+    @log_on_success
+    async def import_network(self, payload=None):
+        stats = import_network(payload["path"], self.nano_nodes_path)
+        await self.start_containers()
+        return None, f'Network imported from {payload["path"]} : {json.dumps(stats)}'
+
     @log_on_success
     async def run_rpc(self, payload=None, nodes=None):
         if nodes is None:
@@ -372,18 +480,78 @@ class NanoLocalManager:
 
         tasks = []
         for node in nodes:
-            node_rpc = NanoRpc(self.conf_p.get_node_rpc(node))
+            node_rpc = self.rpc_registry.get(self.conf_p.get_node_rpc(node))
             task = node_rpc.nanorpc.rpc.process_payloads([payload])
             tasks.append(task)
 
         responses = await asyncio.gather(*tasks)
         return None, json.dumps(responses, indent=2)
 
+    @log_on_success
+    async def replay(self, payload=None, nodes=None):
+        if nodes is None:
+            nodes = self.conf_p.get_nodes_name()
+
+        nodes_rpc = [
+            self.rpc_registry.get(self.conf_p.get_node_rpc(node))
+            for node in nodes
+        ]
+        if payload.get("verify"):
+            await self.verify_corpus(payload["path"], nodes_rpc[0])
+
+        subscriber, tracker = None, None
+        if payload.get("latency"):
+            subscriber = self.get_confirmation_subscriber(nodes)
+            tracker = LatencyTracker(subscriber)
+            await subscriber.start()
+            await tracker.start()
+        try:
+            stats = await replay_corpus(payload["path"],
+                                        nodes_rpc,
+                                        float(payload["bps"]),
+                                        workers=int(payload.get("workers", 1)),
+                                        max_in_flight=int(payload.get("max_in_flight", 64)),
+                                        max_retries=int(payload.get("max_retries", 5)),
+                                        tracker=tracker)
+            if tracker is not None:
+                stats["latency"] = await self._write_latency(
+                    subscriber, tracker, nodes, payload["latency"],
+                    float(payload.get("latency_timeout_s", 30)))
+        finally:
+            if subscriber is not None:
+                await subscriber.close()
+        return stats, json.dumps(stats, indent=2)
+
+    async def _write_latency(self, subscriber, tracker, nodes, path, timeout):
+        # confirmations still arrive after the last publish
+        try:
+            await subscriber.wait_for_confirmations(list(tracker.published), nodes=nodes,
+                                                    timeout=timeout)
+        except asyncio.TimeoutError:
+            pass  # blocks still unconfirmed are reported as such
+        tracker.write_results(path)
+        return tracker.report()["network"]
+
+    async def verify_corpus(self, path, nano_rpc=None):
+        """Checks chains, balances, hashes, signatures and work of a corpus, raises ValueError if any chain is broken."""
+        nano_rpc = nano_rpc or self.rpc_registry.get(self.conf_p.get_nodes_rpc()[0])
+        difficulty = await nano_rpc.difficulty_cache.get()
+        report = await verify_corpus(
+            iter_corpus(path),
+            difficulty=difficulty["network_minimum"],
+            receive_difficulty=difficulty["network_receive_minimum"],
+            epoch_signers=[self.conf_p.get_genesis_account_data()["public"]])
+        if report["errors"]:
+            account, first_error = next(iter(report["errors"].items()))
+            raise ValueError(
+                f'{path} has {len(report["errors"])} broken account chains. First : {account} at block {first_error["index"]} ({first_error["hash"]}) : {first_error["error"]}')
+        return report
 
     @log_on_success
     async def init_wallets(self):
         init_blocks = InitialBlocks(self.conf_p,
-                                    self.conf_p.get_nodes_rpc()[0])
+                                    self.conf_p.get_nodes_rpc()[0],
+                                    rpc_registry=self.rpc_registry)
 
         async def process_node(node_name):
             await self._wait_for_rpc_availability([node_name])
@@ -419,11 +587,22 @@ class NanoLocalManager:
                 node_name,
                 seed=self.conf_p.get_node_config(node_name)["seed"])
 
+    def _get_init_bundle_cache(self):
+        # initial blocks only depend on nl_config.toml, they are cached unless init_bundle_cache_enable = false
+        if self.conf_p.get_config_value("init_bundle_cache_enable") is False:
+            return None
+        return CorpusCache(
+            cache_dir=self.conf_p.get_config_value("init_bundle_cache_dir")
+            or os.path.join(Path.home(), ".cache", "nanomock", "init_bundles"),
+            suffix=".json")
+
     @log_on_success
     async def init_nodes(self):
         await self.init_wallets()
         init_blocks = InitialBlocks(self.conf_p,
-                                    self.conf_p.get_nodes_rpc()[0])
+                                    self.conf_p.get_nodes_rpc()[0],
+                                    rpc_registry=self.rpc_registry,
+                                    bundle_cache=self._get_init_bundle_cache())
         return await init_blocks.publish_initial_blocks()
 
     @log_on_success
@@ -435,8 +614,9 @@ class NanoLocalManager:
         genesis_name = self.conf_p.get_nodes_name()[0]
         self.start_containers([genesis_name])
         init_blocks = InitialBlocks(self.conf_p,
-                                    self.conf_p.get_nodes_rpc()[0])
-        return init_blocks.publish_initial_blocks(move_weight=False)
+                                    self.conf_p.get_nodes_rpc()[0],
+                                    rpc_registry=self.rpc_registry)
+        return await init_blocks.publish_initial_blocks(move_weight=False)
 
     @log_on_success
     async def reset_nodes_data(self, nodes: Optional[List[str]] = None):
@@ -523,6 +703,9 @@ class NanoLocalManager:
         }
         return filtered_args
 
+    async def close(self):
+        await self.rpc_registry.close()
+
     async def execute_command(self, command, nodes=None, payload=None):
         if command not in self.command_mapping:
             raise ValueError(f"Invalid command: {command}")
@@ -0,0 +1,45 @@
+from nano_lib_py.work import get_work_value
+from nanomock.modules.nl_nanolib import NanoLibTools
+
+SEED = "0" * 64
+SEND_DIFFICULTY = "fff0000000000000"
+RECEIVE_DIFFICULTY = "0000000000000000"
+
+
+class CorpusBuilder:
+    """Builds signed (hash, json_block) corpus entries for two accounts a and b."""
+
+    def __init__(self, seed=SEED):
+        self.nano_lib = NanoLibTools()
+        self.a = self.nano_lib.nanolib_account_data(seed=seed, index=0)
+        self.b = self.nano_lib.nanolib_account_data(seed=seed, index=1)
+
+    def block(self, account_data, previous, balance, link, difficulty="0000000000000000", subtype=None):
+        lib_block = self.nano_lib.create_state_block(account=account_data["account"],
+                                                     representative=account_data["account"],
+                                                     previous=previous,
+                                                     balance=balance,
+                                                     link=link,
+                                                     key=account_data["private"],
+                                                     difficulty=difficulty)
+        json_block = lib_block.to_dict()
+        if subtype:
+            json_block["subtype"] = subtype
+        return lib_block.block_hash, json_block
+
+    def receive_block(self, account_data, previous, balance, link, subtype):
+        # receive threshold work that is below the send threshold
+        while True:
+            block = self.block(account_data, previous, balance, link, RECEIVE_DIFFICULTY, subtype)
+            work_hash = previous or account_data["public"]
+            if get_work_value(block_hash=work_hash, work=block[1]["work"]) < int(SEND_DIFFICULTY, 16):
+                return block
+
+    def mixed_corpus(self):
+        """open (receive threshold), send (send threshold), open and receive (receive threshold)."""
+        a_open = self.receive_block(self.a, None, 100, "AB" * 32, "open")
+        a_send = self.block(self.a, a_open[0], 60, self.b["public"], SEND_DIFFICULTY, "send")
+        a_send_2 = self.block(self.a, a_send[0], 50, self.b["public"], SEND_DIFFICULTY, "send")
+        b_open = self.receive_block(self.b, None, 40, a_send[0], "open")
+        b_receive = self.receive_block(self.b, b_open[0], 50, a_send_2[0], "receive")
+        return [a_open, a_send, a_send_2, b_open, b_receive]
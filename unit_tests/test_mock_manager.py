@@ -5,7 +5,10 @@ from argparse import Namespace
 from os import environ
 import pytest
 import logging
-from unittest.mock import patch
+from unittest.mock import patch, AsyncMock
+import asyncio
+from nanomock.modules.nl_block_corpus import BlockCorpusWriter
+from unit_tests.corpus_builders import CorpusBuilder
 
 
 class TestManager:
@@ -52,4 +55,133 @@ class TestManager:
             and record.message == "0/2 containers online"
             for record in caplog.records)
 
-        assert success_record_found, "Expected log record not found"
\ No newline at end of file
+        assert success_record_found, "Expected log record not found"
+
+class TestReplayVerify:
+    """replay with "verify": true, without docker."""
+
+    SEND_DIFFICULTY = "fff0000000000000"
+    RECEIVE_DIFFICULTY = "0000000000000000"
+
+    def setup_method(self, method):
+        with patch("nanomock.nanomock_manager.create_docker_interface"), \
+                patch("nanomock.nanomock_manager.DependencyChecker"):
+            self.manager = NanoLocalManager(
+                "unit_tests/configs/mock_nl_config",
+                "unittest",
+                config_file="enable_voting_config.toml")
+        self.nano_rpc = self.manager.rpc_registry.get(self.manager.conf_p.get_nodes_rpc()[0])
+        self.nano_rpc.set_offline_difficulty(self.SEND_DIFFICULTY, self.RECEIVE_DIFFICULTY)
+
+    def teardown_method(self, method):
+        asyncio.run(self.manager.close())
+
+    def _write_corpus(self, tmp_path, blocks):
+        path = str(tmp_path / "blocks.corpus")
+        with BlockCorpusWriter(path) as writer:
+            for block_hash, json_block in blocks:
+                writer.write_block(json_block, block_hash)
+        return path
+
+    def _replay(self, path):
+
+        async def run():
+            with patch("nanomock.nanomock_manager.replay_corpus") as replay_corpus:
+                replay_corpus.return_value = {"published": 5}
+                await self.manager.replay({"path": path, "bps": 100, "verify": True})
+                return replay_corpus
+
+        return asyncio.run(run())
+
+    def test_mixed_subtype_corpus_is_replayed(self, tmp_path):
+        blocks = CorpusBuilder().mixed_corpus()
+        replay_corpus = self._replay(self._write_corpus(tmp_path, blocks))
+        assert replay_corpus.called
+
+    def test_weak_send_aborts_replay(self, tmp_path):
+        builder = CorpusBuilder()
+        a_open = builder.receive_block(builder.a, None, 100, "AB" * 32, "open")
+        weak_send = builder.receive_block(builder.a, a_open[0], 60, builder.b["public"], "send")
+        with pytest.raises(ValueError, match="Work below difficulty"):
+            self._replay(self._write_corpus(tmp_path, [a_open, weak_send]))
+
+
+class TestReplayLatency:
+    """replay with "latency", without docker nor node websockets."""
+
+    def setup_method(self, method):
+        with patch("nanomock.nanomock_manager.create_docker_interface"), \
+                patch("nanomock.nanomock_manager.DependencyChecker"):
+            self.manager = NanoLocalManager(
+                "unit_tests/configs/mock_nl_config",
+                "unittest",
+                config_file="enable_voting_config.toml")
+
+    def teardown_method(self, method):
+        asyncio.run(self.manager.close())
+
+    def test_latency_results_written(self, tmp_path):
+        nodes = self.manager.conf_p.get_nodes_name()
+        subscriber = self.manager.get_confirmation_subscriber(nodes)
+        latency_path = tmp_path / "latency.json"
+
+        async def replay_corpus(*args, tracker=None, **kwargs):
+            tracker.mark_published("A" * 64, 100.0)
+            for node_name in nodes:
+                subscriber._on_message(node_name, "confirmation", {"hash": "A" * 64}, 100.2)
+            return {"published": 1}
+
+        async def noop(*args, **kwargs):
+            pass
+
+        with patch.object(self.manager, "get_confirmation_subscriber", return_value=subscriber), \
+                patch.object(subscriber, "start", noop), \
+                patch("nanomock.nanomock_manager.LatencyTracker.start", noop), \
+                patch("nanomock.nanomock_manager.replay_corpus", replay_corpus):
+            stats = asyncio.run(self.manager.replay({"path": "blocks.corpus", "bps": 100,
+                                                     "latency": str(latency_path)}))
+
+        assert stats["latency"]["all_confirmed"]["p50_ms"] == 200.0
+        assert latency_path.exists()
+
+    def test_latency_needs_single_worker(self):
+        with pytest.raises(ValueError, match="single worker"):
+            self.manager._validator_replay(payload={"path": "blocks.corpus", "bps": 100,
+                                                    "latency": "latency.json", "workers": 2})
+
+
+class TestRestartAfterStop:
+    """Nodes stopped for a ledger copy are started again when the copy fails."""
+
+    def setup_method(self, method):
+        with patch("nanomock.nanomock_manager.create_docker_interface"), \
+                patch("nanomock.nanomock_manager.DependencyChecker"):
+            self.manager = NanoLocalManager(
+                "unit_tests/configs/mock_nl_config",
+                "unittest",
+                config_file="enable_voting_config.toml")
+        self.manager.stop_containers = AsyncMock()
+        self.manager.start_containers = AsyncMock()
+
+    def teardown_method(self, method):
+        asyncio.run(self.manager.close())
+
+    def test_snapshot_failure_restarts_nodes(self):
+        with patch("nanomock.nanomock_manager.snapshot_ledgers", side_effect=OSError("disk full")):
+            with pytest.raises(OSError, match="disk full"):
+                asyncio.run(self.manager.snapshot({"name": "failing"}, nodes=["nl_genesis"]))
+        self.manager.start_containers.assert_awaited_once_with(["nl_genesis"])
+
+    def test_restore_failure_restarts_nodes(self, tmp_path):
+        with patch.object(self.manager, "_get_snapshot_path", return_value=tmp_path), \
+                patch("nanomock.nanomock_manager.restore_ledgers", side_effect=OSError("disk full")):
+            with pytest.raises(OSError, match="disk full"):
+                asyncio.run(self.manager.restore({"name": "failing"}, nodes=["nl_genesis"]))
+        self.manager.start_containers.assert_awaited_once_with(["nl_genesis"])
+
+    def test_export_failure_restarts_nodes(self, tmp_path):
+        nodes = self.manager.conf_p.get_nodes_name()
+        with patch("nanomock.nanomock_manager.export_network", side_effect=OSError("disk full")):
+            with pytest.raises(OSError, match="disk full"):
+                asyncio.run(self.manager.export_network({"path": str(tmp_path / "network.tar.gz")}))
+        self.manager.start_containers.assert_awaited_once_with(nodes)
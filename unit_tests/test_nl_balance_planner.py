@@ -0,0 +1,45 @@
+import unittest
+from nanomock.modules.nl_balance_planner import (percent_of_raw, plan_account_split,
+                                                 plan_weight_distribution, scale_raw)
+
+MAX_RAW = 340282366920938463463374607431768211455
+
+
+class TestBalancePlanner(unittest.TestCase):
+
+    def test_exact_arithmetic(self):
+        self.assertEqual(scale_raw(MAX_RAW, 0.1), MAX_RAW // 10)
+        self.assertEqual(scale_raw(MAX_RAW, "0.333"), MAX_RAW * 333 // 1000)
+        self.assertEqual(percent_of_raw(MAX_RAW, 33.3), MAX_RAW * 333 // 1000)
+        self.assertEqual(percent_of_raw(7, 50), 3)
+
+    def test_split_plan(self):
+        plan = plan_account_split(10, 3, 5)
+
+        self.assertEqual(plan.splitting_depth, 2)
+        self.assertEqual(plan.level_sizes, (3, 7))
+        # depth 1 funds itself and up to 3 children, depth 2 only itself
+        self.assertEqual(plan.amounts, ((9 - 3 + 1) * 5, 5))
+        self.assertEqual(plan.required_raw, 3 * 35)
+        plan.validate(105, 3)
+        with self.assertRaises(ValueError):
+            plan.validate(104, 3)
+
+    def test_weight_distribution(self):
+        nodes = [
+            {"name": "genesis"},
+            {"name": "pr1", "vote_weight_percent": 60},
+            {"name": "pr2", "vote_weight_percent": 30},
+            {"name": "pr3", "balance": 200},
+        ]
+        plan = plan_weight_distribution(1000, nodes)
+
+        self.assertEqual(plan.requested, {"pr1": 600, "pr2": 300, "pr3": 200})
+        self.assertEqual(plan.balances, {"pr1": 600, "pr2": 300, "pr3": 100})
+        self.assertEqual(plan.remaining_raw, 0)
+        with self.assertRaises(ValueError):
+            plan.validate()
+
+
+if __name__ == '__main__':
+    unittest.main()
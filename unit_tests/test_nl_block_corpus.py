@@ -0,0 +1,84 @@
+import unittest
+import os
+import tempfile
+from nanomock.modules.nl_block_corpus import BlockCorpusReader, BlockCorpusWriter, INDEX_ENTRY
+from nanomock.modules.nl_nanolib import NanoLibTools
+
+
+class TestBlockCorpus(unittest.TestCase):
+
+    def setUp(self):
+        nano_lib = NanoLibTools()
+        self.blocks = []
+        previous = None
+        account_data = nano_lib.nanolib_account_data(seed="0" * 64, index=0)
+        for balance in range(10, 0, -1):
+            lib_block = nano_lib.create_state_block(
+                account=account_data["account"],
+                representative=account_data["account"],
+                previous=previous,
+                balance=balance,
+                link="AB" * 32,
+                key=account_data["private"],
+                difficulty="0000000000000000")
+            json_block = lib_block.to_dict()
+            json_block["subtype"] = "open" if previous is None else "send"
+            self.blocks.append({"hash": lib_block.block_hash, "block": json_block})
+            previous = lib_block.block_hash
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "blocks.corpus")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_roundtrip(self):
+        with BlockCorpusWriter(self.path) as writer:
+            for block in self.blocks:
+                writer.write(block)
+
+        with BlockCorpusReader(self.path) as reader:
+            self.assertEqual(len(reader), 10)
+            self.assertEqual(reader[0], self.blocks[0]["block"])
+            self.assertEqual(reader[-1], self.blocks[-1]["block"])
+            self.assertEqual(reader.get_hash(3), self.blocks[3]["hash"])
+            self.assertEqual([block_hash for block_hash, _ in reader],
+                             [block["hash"] for block in self.blocks])
+            for position, block in enumerate(self.blocks):
+                self.assertEqual(reader.index_of(block["hash"]), position)
+            self.assertEqual(reader.get_by_hash(self.blocks[5]["hash"]),
+                             self.blocks[5]["block"])
+            self.assertNotIn("F" * 64, reader)
+            with self.assertRaises(IndexError):
+                reader[10]
+
+    def test_index_merged_from_sorted_runs(self):
+        # 10 blocks, 3 index entries per run : 4 runs on disk merged on close
+        with BlockCorpusWriter(self.path, run_entries=3) as writer:
+            for block in self.blocks:
+                writer.write(block)
+            self.assertEqual(len(writer._runs), 3)
+            self.assertLessEqual(len(writer._run), 3 * INDEX_ENTRY.size)
+
+        with BlockCorpusReader(self.path) as reader:
+            self.assertEqual(len(reader), 10)
+            for position, block in enumerate(self.blocks):
+                self.assertEqual(reader.index_of(block["hash"]), position)
+            self.assertNotIn("0" * 64, reader)
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["blocks.corpus"])
+
+    def test_missing_hash_is_computed(self):
+        with BlockCorpusWriter(self.path) as writer:
+            writer.write_block(self.blocks[0]["block"])
+
+        with BlockCorpusReader(self.path) as reader:
+            self.assertEqual(reader.get_hash(0), self.blocks[0]["hash"])
+
+    def test_rejects_other_files(self):
+        with open(self.path, "wb") as f:
+            f.write(b"{}" * 32)
+        with self.assertRaises(ValueError):
+            BlockCorpusReader(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,215 @@
+import unittest
+import asyncio
+import time
+from nanomock.modules.nl_block_publisher import BlockPublisher, DependencyScheduler
+
+
+class MockProcessRpc:
+
+    def __init__(self, gap_responses=0, delay_s=0.001, fail_hashes=(), fail_error="Fork"):
+        self.gap_responses = gap_responses
+        self.fail_hashes = fail_hashes
+        self.fail_error = fail_error
+        self.delay_s = delay_s
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = []
+        self.call_times = []
+
+    async def process(self, block, json_block=True, async_=None):
+        self.calls.append((block["hash"], async_))
+        self.call_times.append(time.time())
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay_s)
+        self.in_flight -= 1
+        if block["hash"] in self.fail_hashes:
+            return {"error": self.fail_error}
+        if self.gap_responses > 0:
+            self.gap_responses -= 1
+            return {"error": "Gap previous block"}
+        if async_:
+            return {"started": "1"}
+        return {"hash": block["hash"]}
+
+
+class MockValidator:
+
+    def __init__(self, reject=()):
+        self.reject = reject
+        self.min_pool_batch = 512
+        self.batches = []
+        self.single_calls = 0
+
+    def validate_one(self, json_block, block_hash=None):
+        self.single_calls += 1
+        return "Invalid signature" if block_hash in self.reject else None
+
+    async def validate(self, blocks):
+        blocks = list(blocks)
+        self.batches.append(len(blocks))
+        return ["Invalid signature" if block_hash in self.reject else None for block_hash, _ in blocks]
+
+
+class TestBlockPublisher(unittest.TestCase):
+
+    def _blocks(self, count):
+        return [{"hash": f"{i:064X}", "block": {"hash": f"{i:064X}"}} for i in range(count)]
+
+    def test_publish_all_keeps_submission_order(self):
+        rpc = MockProcessRpc()
+        publisher = BlockPublisher(rpc, max_in_flight=4)
+        results = asyncio.run(publisher.publish_all(self._blocks(20)))
+
+        self.assertEqual([r["index"] for r in results], list(range(20)))
+        self.assertTrue(all(r["published"] for r in results))
+        self.assertLessEqual(rpc.max_in_flight, 4)
+
+    def test_retry_on_gap(self):
+        rpc = MockProcessRpc(gap_responses=2)
+        publisher = BlockPublisher(rpc, max_in_flight=1, backoff_base_s=0.001)
+        results = asyncio.run(publisher.publish_all(self._blocks(1)))
+
+        self.assertTrue(results[0]["published"])
+        self.assertEqual(results[0]["attempts"], 3)
+
+    def test_tracker_stamps_accepted_attempt(self):
+
+        class Tracker:
+            def __init__(self):
+                self.tracked, self.published = set(), {}
+
+            def track(self, block_hash):
+                self.tracked.add(block_hash)
+
+            def mark_published(self, block_hash, published_at=None):
+                self.published[block_hash] = published_at
+
+        rpc = MockProcessRpc(gap_responses=2)
+        tracker = Tracker()
+        publisher = BlockPublisher(rpc, max_in_flight=1, backoff_base_s=0.001, tracker=tracker)
+        block_hash = self._blocks(1)[0]["hash"]
+        asyncio.run(publisher.publish_all(self._blocks(1)))
+
+        self.assertEqual(tracker.tracked, {block_hash})
+        # the third attempt started after the second process call
+        self.assertGreater(tracker.published[block_hash], rpc.call_times[1])
+
+    def test_give_up_after_max_retries(self):
+        rpc = MockProcessRpc(gap_responses=10)
+        publisher = BlockPublisher(rpc, max_in_flight=1, max_retries=2, backoff_base_s=0.001)
+        results = asyncio.run(publisher.publish_all(self._blocks(1)))
+
+        self.assertFalse(results[0]["published"])
+        self.assertEqual(results[0]["error"], "Gap previous block")
+        self.assertEqual(len(rpc.calls), 3)
+
+    def test_async_process_flag(self):
+        rpc = MockProcessRpc()
+        publisher = BlockPublisher(rpc, async_process=True)
+        results = asyncio.run(publisher.publish_all(self._blocks(2)))
+
+        self.assertTrue(all(r["published"] for r in results))
+        self.assertTrue(all(async_ for _, async_ in rpc.calls))
+
+    def test_rejects_invalid_block_locally(self):
+        rpc = MockProcessRpc()
+        validator = MockValidator(reject=("0" * 64,))
+        publisher = BlockPublisher(rpc, validator=validator)
+        results = asyncio.run(publisher.publish_all(self._blocks(2)))
+
+        self.assertEqual([block_hash for block_hash, _ in rpc.calls], [f"{1:064X}"])
+        self.assertEqual([r["attempts"] for r in results], [0, 1])
+        self.assertEqual(results[0]["error"], "Rejected locally: Invalid signature")
+        # one batch validation, no per block check
+        self.assertEqual(validator.batches, [2])
+        self.assertEqual(validator.single_calls, 0)
+
+    def test_validates_in_batches(self):
+        rpc = MockProcessRpc()
+        validator = MockValidator()
+        publisher = BlockPublisher(rpc, max_in_flight=2, validator=validator)
+        results = asyncio.run(publisher.publish_all(self._blocks(7), validate_batch_size=3))
+
+        self.assertTrue(all(r["published"] for r in results))
+        self.assertEqual(validator.batches, [3, 3, 1])
+
+    def test_single_publish_validates(self):
+        rpc = MockProcessRpc()
+        publisher = BlockPublisher(rpc, validator=MockValidator(reject=("0" * 64,)))
+        result = asyncio.run(publisher.publish(self._blocks(1)[0]))
+
+        self.assertEqual(result["error"], "Rejected locally: Invalid signature")
+        self.assertEqual(rpc.calls, [])
+
+
+def _state_block(block_hash, previous, link):
+    block = {"hash": block_hash, "previous": previous, "link": link}
+    return {"hash": block_hash, "block": block}
+
+
+class TestDependencyScheduler(unittest.TestCase):
+
+    def setUp(self):
+        zero, other = "0" * 64, "AB" * 32
+        self.a0, self.a1, self.b0, self.c0 = ("A0" * 32, "A1" * 32, "B0" * 32, "C0" * 32)
+        # b0 receives the send a1, c0 is independent. Listed in reverse dependency order
+        self.blocks = [
+            _state_block(self.b0, zero, self.a1),
+            _state_block(self.a1, self.a0, other),
+            _state_block(self.c0, zero, other),
+            _state_block(self.a0, zero, other),
+        ]
+
+    def test_publishes_dependencies_first(self):
+        rpc = MockProcessRpc()
+        scheduler = DependencyScheduler(BlockPublisher(rpc, max_in_flight=4))
+        results = asyncio.run(scheduler.publish_all(self.blocks))
+
+        self.assertTrue(all(r["published"] for r in results))
+        order = [block_hash for block_hash, _ in rpc.calls]
+        self.assertLess(order.index(self.a0), order.index(self.a1))
+        self.assertLess(order.index(self.a1), order.index(self.b0))
+        # independent roots are sent together
+        self.assertEqual(set(order[:2]), {self.a0, self.c0})
+        self.assertEqual(rpc.max_in_flight, 2)
+
+    def test_skips_dependents_of_failed_block(self):
+        rpc = MockProcessRpc(fail_hashes=(self.a0,))
+        scheduler = DependencyScheduler(BlockPublisher(rpc, max_in_flight=4))
+        results = asyncio.run(scheduler.publish_all(self.blocks))
+
+        published = {r["hash"]: r["published"] for r in results}
+        self.assertEqual(published, {self.a0: False, self.a1: False, self.b0: False, self.c0: True})
+        self.assertEqual(sorted(block_hash for block_hash, _ in rpc.calls), sorted([self.a0, self.c0]))
+        self.assertEqual(results[0]["attempts"], 0)
+
+    def test_old_block_satisfies_dependents(self):
+        rpc = MockProcessRpc(fail_hashes=(self.a0,), fail_error="Old block")
+        scheduler = DependencyScheduler(BlockPublisher(rpc, max_in_flight=4))
+        results = asyncio.run(scheduler.publish_all(self.blocks))
+
+        published = {r["hash"]: r["published"] for r in results}
+        self.assertEqual(published, {self.a0: False, self.a1: True, self.b0: True, self.c0: True})
+        self.assertEqual(len(rpc.calls), 4)
+
+    def test_skips_dependents_of_rejected_block(self):
+        rpc = MockProcessRpc()
+        validator = MockValidator(reject=(self.a1,))
+        scheduler = DependencyScheduler(BlockPublisher(rpc, max_in_flight=4, validator=validator))
+        results = asyncio.run(scheduler.publish_all(self.blocks))
+
+        errors = {r["hash"]: r["error"] for r in results}
+        self.assertEqual(errors[self.a1], "Rejected locally: Invalid signature")
+        self.assertEqual(errors[self.b0], f"Dependency not published: {self.a1}")
+        self.assertEqual(sorted(block_hash for block_hash, _ in rpc.calls), sorted([self.a0, self.c0]))
+        self.assertEqual(validator.batches, [4])
+        self.assertEqual(validator.single_calls, 0)
+
+    def test_rejects_async_process(self):
+        with self.assertRaises(ValueError):
+            DependencyScheduler(BlockPublisher(MockProcessRpc(), async_process=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
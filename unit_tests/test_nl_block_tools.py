@@ -1,7 +1,19 @@
 import unittest
 from unittest.mock import MagicMock
-from nanomock.internal.nl_block_tools import BlockReadWrite
+from nanomock.internal.nl_block_tools import BlockReadWrite, BlockGenerator, iter_bounded
+from nanomock.modules.nl_rpc import NanoRpc
+from nanomock.modules.nl_work_engine import WorkEngine
+from nanomock.modules.nl_corpus_cache import CorpusCache
+from nanomock.modules.nl_block_corpus import BlockCorpusReader
+from nanomock.modules.nl_nanolib import NanoLibTools
+from unittest.mock import patch
+import asyncio
 import json
+import os
+import tempfile
+import tracemalloc
+
+REPRESENTATIVE = "nano_1111111111111111111111111111111111111111111111111111hifc8npp"
 
 
 class TestBlockTools(unittest.TestCase):
@@ -29,6 +41,237 @@ class TestBlockTools(unittest.TestCase):
         self.block_rw.conf_rw.write_json.assert_called_with(
             "output_path", test_data["dict_rpc_block_list_expected_output"])
 
+    def test_block_generator_needs_an_rpc(self):
+        with self.assertRaisesRegex(ValueError, "rpc_url, nano_rpc or config_parser"):
+            BlockGenerator()
+
+
+class TestAccountSplitter(unittest.TestCase):
+
+    def setUp(self):
+        nano_rpc = NanoRpc("http://127.0.0.1:45900", offline=True)
+        nano_rpc.set_offline_difficulty("0000000000000000")
+        self.source = nano_rpc.nano_lib.nanolib_account_data(seed="1" * 64,
+                                                             index=0)
+        nano_rpc.frontier_store.set(self.source["account"], "AB" * 32,
+                                    10**30, REPRESENTATIVE)
+
+        async def check_balance(account, include_only_confirmed=True):
+            return {"balance_raw": str(10**30)}
+
+        async def account_info(account, **kwargs):
+            # the node ledger : nothing of the generated blocks is published
+            return {"frontier": "AB" * 32, "balance": str(10**30),
+                    "representative": REPRESENTATIVE}
+
+        nano_rpc.check_balance = check_balance
+        nano_rpc.account_info = account_info
+        self.block_gen = BlockGenerator(nano_rpc=nano_rpc)
+
+    def test_split_levels(self):
+        levels = [list(level) for level in self.block_gen.get_split_levels(10, 3)]
+        self.assertEqual(levels[0], [(None, range(0, 3))])
+        self.assertEqual(levels[1][2], (2, range(9, 10)))
+        self.assertEqual(len(levels), self.block_gen.get_spliting_depth(10, 3))
+
+    def test_blocks_in_dependency_order(self):
+        blocks = asyncio.run(
+            self.block_gen.blockgen_account_splitter(
+                source_private_key=self.source["private"],
+                destination_seed="2" * 64,
+                number_of_accounts=10,
+                split_count=3,
+                representative=REPRESENTATIVE,
+                final_account_balance_raw=1))
+
+        self.assertEqual(len(blocks), 20)
+        self.assertTrue(all(block["success"] for block in blocks))
+        seen = {"AB" * 32}
+        for block in blocks:
+            json_block = block["block"]
+            if block["subtype"] == "open":
+                self.assertIn(json_block["link"], seen)
+            else:
+                self.assertIn(json_block["previous"], seen)
+            seen.add(block["hash"])
+        opened_indexes = sorted(block["account_data"]["source_index"]
+                                for block in blocks
+                                if block["subtype"] == "open")
+        self.assertEqual(opened_indexes, list(range(10)))
+
+    def test_unreadable_source_balance(self):
+        nano_rpc = self.block_gen.get_nano_rpc_default()
+
+        async def check_balance(account, include_only_confirmed=True):
+            return None  # rpc error
+
+        nano_rpc.check_balance = check_balance
+        with self.assertRaisesRegex(ValueError, "could not be read"):
+            asyncio.run(self.block_gen.blockgen_account_splitter(
+                source_private_key=self.source["private"],
+                destination_seed="2" * 64,
+                number_of_accounts=4,
+                representative=REPRESENTATIVE,
+                final_account_balance_raw=1))
+
+    def test_stream_blocks_to_disk(self):
+        block_rw = BlockReadWrite()
+        blocks = self.block_gen.blockgen_account_splitter_iter(
+            source_private_key=self.source["private"],
+            destination_seed="2" * 64,
+            number_of_accounts=5,
+            split_count=2,
+            representative=REPRESENTATIVE,
+            final_account_balance_raw=1,
+            max_concurrency=1)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "blocks.jsonl")
+            count = asyncio.run(block_rw.write_blocks_stream(blocks, path))
+            res = block_rw.read_blocks_from_disk(path)
+
+        self.assertEqual(count, 10)
+        self.assertEqual(len(res["h"][0]), 10)
+        self.assertEqual(res["s"], [["2" * 64]])
+        self.assertEqual(res["b"][0][1]["subtype"], "open")
+
+    def test_stream_to_corpus_memory_is_bounded(self):
+        block_rw = BlockReadWrite()
+        json_block = NanoLibTools().create_state_block(
+            account=self.source["account"],
+            representative=REPRESENTATIVE,
+            previous="AB" * 32,
+            balance=1,
+            link="0" * 64,
+            key=self.source["private"],
+            difficulty="0000000000000000").to_dict()
+
+        def blocks(count):
+            for i in range(count):
+                yield {"hash": f"{i:064X}", "block": json_block}
+
+        def peak_while_writing(path, count):
+            tracemalloc.start()
+            try:
+                asyncio.run(block_rw.write_blocks_stream(blocks(count), path))
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        with tempfile.TemporaryDirectory() as tmp_dir, patch(
+                "nanomock.modules.nl_block_corpus.INDEX_RUN_ENTRIES", 256):
+            small = peak_while_writing(os.path.join(tmp_dir, "small.corpus"), 1000)
+            large = peak_while_writing(os.path.join(tmp_dir, "large.corpus"), 10000)
+            with BlockCorpusReader(os.path.join(tmp_dir, "large.corpus")) as reader:
+                self.assertEqual(len(reader), 10000)
+                self.assertEqual(reader.index_of(f"{9999:064X}"), 9999)
+
+        # 9000 more blocks : an index held in memory would add well over 300KB
+        self.assertLess(large - small, 64 * 1024)
+
+    def test_cached_corpus(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = CorpusCache(tmp_dir)
+            params = dict(source_private_key=self.source["private"],
+                          destination_seed="2" * 64,
+                          number_of_accounts=4,
+                          split_count=2,
+                          representative=REPRESENTATIVE,
+                          final_account_balance_raw=1)
+            path = asyncio.run(self.block_gen.blockgen_account_splitter_cached(cache, **params))
+            modified = os.path.getmtime(path)
+            frontier_store = self.block_gen.get_nano_rpc_default().frontier_store
+            heads = dict(frontier_store._records)
+
+            # the local frontiers moved ahead, the ledger didn't : still a hit
+            self.block_gen.blockgen_account_splitter_iter = None
+            self.assertEqual(
+                asyncio.run(self.block_gen.blockgen_account_splitter_cached(cache, **params)), path)
+
+            # next run on a fresh ledger : the frontier store gets the heads of the cached corpus
+            self.setUp()
+            self.block_gen.blockgen_account_splitter_iter = None
+            self.assertEqual(
+                asyncio.run(self.block_gen.blockgen_account_splitter_cached(cache, **params)), path)
+            frontier_store = self.block_gen.get_nano_rpc_default().frontier_store
+            self.assertEqual(dict(frontier_store._records), heads)
+
+            with BlockCorpusReader(path) as reader:
+                self.assertEqual(len(reader), 8)
+            self.assertGreaterEqual(os.path.getmtime(path), modified)
+
+
+class TestDeepForks(unittest.TestCase):
+
+    def setUp(self):
+        nano_rpc = NanoRpc("http://127.0.0.1:45900", offline=True)
+        nano_rpc.set_offline_difficulty("0000000000000000")
+        source = nano_rpc.nano_lib.nanolib_account_data(seed="1" * 64, index=0)
+        nano_rpc.frontier_store.set(source["account"], "AB" * 32, 10**30,
+                                    REPRESENTATIVE)
+        self.work_engine = WorkEngine(max_workers=2)
+        self.block_gen = BlockGenerator(nano_rpc=nano_rpc,
+                                        work_engine=self.work_engine)
+
+    def tearDown(self):
+        self.work_engine.shutdown()
+
+    def test_fork_levels(self):
+        fork_blocks = asyncio.run(
+            self.block_gen.make_deep_forks("1" * 64, 0, "2" * 64, 10, peer_count=3,
+                                           forks_per_peer=2, max_depth=3))
+
+        gap_hash = fork_blocks["gap"][0]["hash"]
+        forks = fork_blocks["forks"]
+        self.assertEqual(len(forks), 3 * 6 * 2)
+        self.assertTrue(all(block["success"] for block in forks))
+        self.assertEqual(len({block["hash"] for block in forks}), len(forks))
+
+        levels = [forks[i:i + 12] for i in range(0, len(forks), 12)]
+        level_sources = [gap_hash] + [level[1]["hash"] for level in levels]
+        for level, level_source in zip(levels, level_sources):
+            sends, opens = level[0::2], level[1::2]
+            # every send of a level forks the same frontier
+            self.assertEqual({send["block"]["previous"] for send in sends}, {level_source})
+            for send, open_block in zip(sends, opens):
+                self.assertEqual(open_block["subtype"], "open")
+                self.assertEqual(open_block["block"]["link"], send["hash"])
+
+    def test_close_keeps_shared_work_engine(self):
+        self.block_gen.close()
+        self.assertIs(self.block_gen.get_work_engine(), self.work_engine)
+
+    def test_close_shuts_down_own_work_engine(self):
+        block_gen = BlockGenerator(nano_rpc=NanoRpc("http://127.0.0.1:45900", offline=True))
+        with block_gen:
+            work_engine = block_gen.get_work_engine()
+            asyncio.run(work_engine.solve_work("AB" * 32, "0000000000000000"))
+            executor = work_engine._executor
+        self.assertIsNone(block_gen.work_engine)
+        with self.assertRaises(RuntimeError):
+            executor.submit(int)
+
+
+class TestIterBounded(unittest.TestCase):
+
+    def test_limits_in_flight(self):
+        state = {"in_flight": 0, "max_in_flight": 0}
+
+        async def work(i):
+            state["in_flight"] += 1
+            state["max_in_flight"] = max(state["max_in_flight"],
+                                         state["in_flight"])
+            await asyncio.sleep(0.001 * (i % 3))
+            state["in_flight"] -= 1
+            return i
+
+        async def run():
+            return [i async for i in iter_bounded((work(i) for i in range(20)), 4)]
+
+        results = asyncio.run(run())
+        self.assertEqual(sorted(results), list(range(20)))
+        self.assertEqual(state["max_in_flight"], 4)
+
 
 if __name__ == '__main__':
     unittest.main()
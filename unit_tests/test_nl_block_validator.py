@@ -0,0 +1,71 @@
+import unittest
+import asyncio
+from nano_lib_py.work import get_work_value
+from nanomock.modules.nl_block_validator import BlockValidator, hash_state_block, validate_block
+from nanomock.modules.nl_nanolib import NanoLibTools
+
+
+class TestBlockValidator(unittest.TestCase):
+
+    def setUp(self):
+        nano_lib = NanoLibTools()
+        account_data = nano_lib.nanolib_account_data(seed="0" * 64, index=0)
+        self.blocks = []
+        previous = None
+        for balance in range(8, 0, -1):
+            lib_block = nano_lib.create_state_block(account=account_data["account"],
+                                                    representative=account_data["account"],
+                                                    previous=previous,
+                                                    balance=balance,
+                                                    link="AB" * 32,
+                                                    key=account_data["private"],
+                                                    difficulty="0000000000000000")
+            self.blocks.append((lib_block.block_hash, lib_block.to_dict()))
+            previous = lib_block.block_hash
+
+    def test_local_hash(self):
+        for block_hash, json_block in self.blocks:
+            self.assertEqual(hash_state_block(json_block), block_hash)
+        # extra keys like subtype are ignored
+        self.assertEqual(hash_state_block(dict(self.blocks[0][1], subtype="open")), self.blocks[0][0])
+
+    def test_validate_block(self):
+        block_hash, json_block = self.blocks[1]
+        self.assertIsNone(validate_block(json_block, block_hash, difficulty="0000000000000000"))
+        self.assertEqual(validate_block(dict(json_block, balance="9")), "Invalid signature")
+        self.assertIn("Hash mismatch", validate_block(json_block, "00" * 32))
+        self.assertIn("Work below", validate_block(json_block, difficulty="ffffffffffffffff"))
+
+    def test_receive_threshold_by_subtype(self):
+        block_hash, json_block = self.blocks[1]
+        work_value = get_work_value(block_hash=json_block["previous"], work=json_block["work"])
+        # the work meets the receive threshold but not the send threshold
+        difficulty = f"{work_value + 1:016x}"
+        receive_difficulty = f"{work_value:016x}"
+
+        receive_block = dict(json_block, subtype="receive")
+        self.assertIsNone(validate_block(receive_block, block_hash, difficulty,
+                                         receive_difficulty=receive_difficulty))
+        self.assertIn("Work below", validate_block(dict(json_block, subtype="send"), block_hash,
+                                                   difficulty, receive_difficulty=receive_difficulty))
+        # without a receive threshold, every block needs the send threshold
+        self.assertIn("Work below", validate_block(receive_block, block_hash, difficulty))
+
+    def test_batches_in_process_pool(self):
+        tampered = (self.blocks[3][0], dict(self.blocks[3][1], signature="00" * 64))
+        blocks = self.blocks[:3] + [tampered] + self.blocks[4:]
+
+        async def run():
+            with BlockValidator(max_workers=2, chunk_size=3, min_pool_batch=4) as validator:
+                hashes = await validator.hash_blocks(json_block for _, json_block in blocks)
+                valid, rejected = await validator.filter_valid(blocks)
+                return hashes, valid, rejected
+
+        hashes, valid, rejected = asyncio.run(run())
+        self.assertEqual(hashes, [block_hash for block_hash, _ in self.blocks])
+        self.assertEqual(len(valid), 7)
+        self.assertEqual(rejected, [(tampered, "Invalid signature")])
+
+
+if __name__ == '__main__':
+    unittest.main()
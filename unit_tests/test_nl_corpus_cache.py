@@ -0,0 +1,67 @@
+import unittest
+import asyncio
+import os
+import tempfile
+from nanomock.modules.nl_corpus_cache import CorpusCache, corpus_key
+
+
+class TestCorpusCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = CorpusCache(self.tmp_dir.name, max_bytes=250)
+        self.generated = []
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _generate(self, size):
+
+        async def generate(path):
+            self.generated.append(path)
+            with open(path, "wb") as f:
+                f.write(b"0" * size)
+
+        return generate
+
+    def test_key_is_canonical(self):
+        self.assertEqual(corpus_key(a=1, b="x"), corpus_key(b="x", a=1))
+        self.assertNotEqual(corpus_key(a=1), corpus_key(a=2))
+
+    def test_hit_skips_generation(self):
+        key = corpus_key(split_count=2)
+        first = asyncio.run(self.cache.get_or_generate(key, self._generate(100)))
+        second = asyncio.run(self.cache.get_or_generate(key, self._generate(100)))
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.generated), 1)
+        self.assertEqual(os.path.getsize(first), 100)
+
+    def test_evicts_least_recently_used(self):
+        keys = [corpus_key(index=i) for i in range(3)]
+        asyncio.run(self.cache.get_or_generate(keys[0], self._generate(100)))
+        asyncio.run(self.cache.get_or_generate(keys[1], self._generate(100)))
+        os.utime(self.cache.get_path(keys[0]), (0, 0))
+        os.utime(self.cache.get_path(keys[1]), (1, 1))
+        self.cache.get(keys[0])  # refreshes keys[0]
+        asyncio.run(self.cache.get_or_generate(keys[2], self._generate(100)))
+
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertIsNotNone(self.cache.get(keys[2]))
+        self.assertLessEqual(self.cache.size(), 250)
+
+    def test_failed_generation_leaves_nothing(self):
+
+        async def generate(path):
+            with open(path, "wb") as f:
+                f.write(b"0")
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(self.cache.get_or_generate(corpus_key(a=1), generate))
+        self.assertEqual(os.listdir(self.tmp_dir.name), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
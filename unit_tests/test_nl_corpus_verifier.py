@@ -0,0 +1,62 @@
+import unittest
+import asyncio
+from nanomock.modules.nl_corpus_verifier import verify_corpus
+from unit_tests.corpus_builders import CorpusBuilder, SEND_DIFFICULTY, RECEIVE_DIFFICULTY
+
+
+class TestCorpusVerifier(unittest.TestCase):
+
+    def setUp(self):
+        self.builder = CorpusBuilder()
+        self.a, self.b = self.builder.a, self.builder.b
+        self.a_open = self.builder.block(self.a, None, 100, "AB" * 32)
+        self.a_send = self.builder.block(self.a, self.a_open[0], 60, self.b["public"])
+
+    def _verify(self, blocks, difficulty=None):
+        return asyncio.run(verify_corpus(iter(blocks), difficulty=difficulty,
+                                         batch_size=2, max_workers=2))
+
+    def test_valid_corpus(self):
+        b_open = self.builder.block(self.b, None, 40, self.a_send[0])
+        report = self._verify([self.a_open, self.a_send, b_open])
+        self.assertEqual(report, {"blocks": 3, "errors": {}})
+
+    def test_amount_mismatch(self):
+        b_open = self.builder.block(self.b, None, 41, self.a_send[0])
+        report = self._verify([self.a_open, self.a_send, b_open])
+        self.assertEqual(list(report["errors"]), [self.b["account"]])
+        self.assertIn("41 raw", report["errors"][self.b["account"]]["error"])
+
+    def test_broken_previous_reports_first_block_only(self):
+        orphan = self.builder.block(self.a, "CD" * 32, 50, self.b["public"])
+        after = self.builder.block(self.a, orphan[0], 40, self.b["public"])
+        report = self._verify([self.a_open, orphan, after])
+        self.assertEqual(report["errors"][self.a["account"]]["index"], 1)
+
+    def test_receive_threshold_for_opens_and_receives(self):
+        blocks = self.builder.mixed_corpus()
+        report = asyncio.run(verify_corpus(iter(blocks), difficulty=SEND_DIFFICULTY,
+                                           receive_difficulty=RECEIVE_DIFFICULTY,
+                                           batch_size=2, max_workers=2))
+        self.assertEqual(report, {"blocks": 5, "errors": {}})
+
+        # a send only carrying receive threshold work is still rejected
+        weak_send = self.builder.receive_block(self.a, blocks[0][0], 60, self.b["public"], "send")
+        report = asyncio.run(verify_corpus(iter([blocks[0], weak_send]), difficulty=SEND_DIFFICULTY,
+                                           receive_difficulty=RECEIVE_DIFFICULTY, max_workers=1))
+        self.assertIn("Work below difficulty", report["errors"][self.a["account"]]["error"])
+
+    def test_crypto_checks(self):
+        bad_signature = dict(self.a_send[1], signature="00" * 64)
+        report = self._verify([self.a_open, (self.a_send[0], bad_signature)])
+        self.assertEqual(report["errors"][self.a["account"]]["error"], "Invalid signature")
+
+        report = self._verify([("FF" * 32, self.a_open[1])])
+        self.assertIn("Hash mismatch", report["errors"][self.a["account"]]["error"])
+
+        report = self._verify([self.a_open], difficulty="ffffffffffffffff")
+        self.assertIn("Work below difficulty", report["errors"][self.a["account"]]["error"])
+
+
+if __name__ == '__main__':
+    unittest.main()
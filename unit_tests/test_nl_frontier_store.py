@@ -0,0 +1,69 @@
+import unittest
+import asyncio
+import tempfile
+import os
+from nanomock.modules.nl_frontier_store import FrontierStore, FrontierRecord
+
+
+class TestFrontierStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = FrontierStore(network="unittest_network")
+
+    def test_set_get(self):
+        self.store.set("nano_a", "A" * 64, "100", "nano_rep")
+        self.assertEqual(self.store.get("nano_a"),
+                         FrontierRecord("A" * 64, 100, "nano_rep"))
+        self.assertEqual(self.store.get("nano_a").to_account_info(), {
+            "frontier": "A" * 64,
+            "balance": "100",
+            "representative": "nano_rep"
+        })
+        self.assertIsNone(self.store.get("nano_b"))
+
+    def test_lru_eviction(self):
+        store = FrontierStore(max_accounts=2)
+        store.set("nano_a", "A" * 64, 1, "nano_rep")
+        store.set("nano_b", "B" * 64, 2, "nano_rep")
+        store.get("nano_a")  # nano_b is now the least recently used
+        store.set("nano_c", "C" * 64, 3, "nano_rep")
+
+        self.assertEqual(len(store), 2)
+        self.assertIn("nano_a", store)
+        self.assertNotIn("nano_b", store)
+        self.assertEqual(store.evicted, 1)
+
+    def test_snapshot_restore(self):
+        self.store.set("nano_a", "A" * 64, 10**38, "nano_rep")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "frontiers.json")
+            self.store.snapshot(path)
+
+            restored = FrontierStore(network="unittest_network").restore(path)
+            self.assertEqual(restored.get("nano_a").balance, 10**38)
+
+            with self.assertRaises(ValueError):
+                FrontierStore(network="other_network").restore(path)
+
+    def test_account_locks(self):
+        order = []
+
+        async def hold(account, name, delay):
+            async with self.store.lock(account):
+                order.append(f"{name}_start")
+                await asyncio.sleep(delay)
+                order.append(f"{name}_end")
+
+        async def run():
+            await asyncio.gather(hold("nano_a", "a1", 0.02),
+                                 hold("nano_a", "a2", 0),
+                                 hold("nano_b", "b1", 0))
+
+        asyncio.run(run())
+        # same account is serialized, the other account does not wait
+        self.assertLess(order.index("a1_end"), order.index("a2_start"))
+        self.assertLess(order.index("b1_end"), order.index("a1_end"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+import unittest
+import asyncio
+import os
+import tempfile
+from nano_lib_py import Block
+from nanomock.internal.nl_initialise import InitialBlocks
+from nanomock.modules.nl_corpus_cache import CorpusCache
+from nanomock.modules.nl_parse_config import ConfigParser
+from nanomock.modules.nl_rpc_pool import NanoRpcRegistry
+
+GENESIS_FRONTIER = "AB" * 32
+
+
+class TestInitialBlocks(unittest.TestCase):
+
+    def setUp(self):
+        self._create_init_blocks()
+
+    def _create_init_blocks(self, genesis_frontier=GENESIS_FRONTIER, bundle_cache=None):
+        # a fresh InitialBlocks on its own registry, as a new nanomock process would have
+        self.conf_p = ConfigParser("unit_tests/configs/mock_nl_config",
+                                   "conf_edit_config.toml")
+        self.registry = NanoRpcRegistry()
+        self.addCleanup(asyncio.run, self.registry.close())
+        self.init_blocks = InitialBlocks(self.conf_p, "http://127.0.0.1:45900",
+                                         rpc_registry=self.registry,
+                                         bundle_cache=bundle_cache)
+        nano_rpc = self.init_blocks.nanorpc
+        nano_rpc.set_offline_difficulty("0000000000000000")
+        self.processed = []
+        genesis_account = self.conf_p.get_genesis_account_data()["account"]
+
+        async def account_info(account, *args, **kwargs):
+            if account == genesis_account:
+                return {"frontier": genesis_frontier, "balance": str(2**128 - 1),
+                        "representative": genesis_account}
+            return {"error": "Account not found"}
+
+        self.difficulty_logs = 0
+
+        async def active_difficulty():
+            self.difficulty_logs += 1
+            return {"network_current": "0", "network_receive_current": "0"}
+
+        async def process(block, json_block=True, async_=None):
+            await asyncio.sleep(0.001)
+            self.processed.append(block)
+            return {"hash": nano_rpc.nano_lib.get_block_hash(block)}
+
+        nano_rpc.account_info = account_info
+        nano_rpc.active_difficulty = active_difficulty
+        nano_rpc.process = process
+
+    def test_build_initial_blocks(self):
+        pipeline = asyncio.run(self.init_blocks.build_initial_blocks())
+        subtypes = [block["subtype"] for block, _ in pipeline]
+
+        # 2 epochs, canary, burn, 2 PR sends, then the canary and PR opens
+        self.assertEqual(subtypes, ["epoch", "epoch", "send", "send", "send", "send",
+                                    "open", "open", "open"])
+        genesis_chain = [block for block, _ in pipeline[:6]]
+        self.assertEqual(genesis_chain[0]["block"]["previous"], GENESIS_FRONTIER)
+        for previous, block in zip(genesis_chain, genesis_chain[1:]):
+            self.assertEqual(block["block"]["previous"], previous["hash"])
+        # each PR gets half of what genesis keeps after the canary and burn sends
+        remaining = 2**128 - 2 - int(self.conf_p.get_all()["burn_amount"])
+        self.assertEqual([int(block["block"]["balance"]) for block, _ in pipeline[-2:]],
+                         [remaining // 2, remaining // 2])
+        self.assertEqual(pipeline[-1][0]["block"]["representative"],
+                         pipeline[-1][0]["block"]["account"])
+
+    def test_publish_opens_after_their_send(self):
+        log = asyncio.run(self.init_blocks.publish_initial_blocks())
+        published = [self.init_blocks.nanorpc.nano_lib.get_block_hash(block)
+                     for block in self.processed]
+
+        self.assertEqual(len(published), 9)
+        for block in self.processed:
+            if block["previous"] != GENESIS_FRONTIER and block["previous"] in published:
+                self.assertLess(published.index(block["previous"]),
+                                published.index(self.init_blocks.nanorpc.nano_lib.get_block_hash(block)))
+            if block["subtype"] == "open":
+                self.assertLess(published.index(block["link"]),
+                                published.index(self.init_blocks.nanorpc.nano_lib.get_block_hash(block)))
+        # the canary open doesn't wait for the rest of the genesis chain
+        subtypes = [block["subtype"] for block in self.processed]
+        self.assertLess(subtypes.index("open"), len(subtypes) - 3)
+        self.assertFalse(any(line for line in log if "NOT PUBLISHED" in str(line)))
+        # before, after each of the 2 epochs and at the end
+        self.assertEqual(self.difficulty_logs, 4)
+
+    def test_rejected_genesis_block_fails_init(self):
+        nano_rpc = self.init_blocks.nanorpc
+        published = nano_rpc.process
+
+        async def reject_epochs(block, json_block=True, async_=None):
+            if block["subtype"] == "epoch":
+                return {"error": "Block is invalid"}
+            return await published(block, json_block, async_)
+
+        nano_rpc.process = reject_epochs
+        with self.assertRaisesRegex(ValueError, r'rejected "EPOCH 1 .*" \(Block is invalid\)'):
+            asyncio.run(self.init_blocks.publish_initial_blocks())
+        self.assertEqual(self.processed, [])
+        # the local genesis frontier is back to the ledger one
+        genesis_account = self.conf_p.get_genesis_account_data()["account"]
+        self.assertEqual(nano_rpc.frontier_store.get(genesis_account).frontier, GENESIS_FRONTIER)
+
+    def test_unreadable_genesis_fails_init(self):
+        nano_rpc = self.init_blocks.nanorpc
+
+        async def account_info(account, *args, **kwargs):
+            return {"error": "Unable to connect"}
+
+        nano_rpc.account_info = account_info
+        genesis_account = self.conf_p.get_genesis_account_data()["account"]
+        with self.assertRaisesRegex(ValueError, f"{genesis_account} .*Unable to connect"):
+            asyncio.run(self.init_blocks.publish_initial_blocks())
+        self.assertEqual(self.processed, [])
+
+    def _bundle_cache(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        return CorpusCache(tmp_dir.name, suffix=".json")
+
+    def _genesis_hash(self):
+        return Block.from_json(self.conf_p.get_genesis_block(), verify=False).block_hash
+
+    def test_bundle_cache_miss_writes_bundle(self):
+        cache = self._bundle_cache()
+        genesis_hash = self._genesis_hash()
+        self._create_init_blocks(genesis_frontier=genesis_hash, bundle_cache=cache)
+        asyncio.run(self.init_blocks.publish_initial_blocks())
+
+        self.assertIsNotNone(cache.get(self.init_blocks.get_bundle_key()))
+        self.assertEqual(self.processed[0]["previous"], genesis_hash)
+
+    def test_bundle_cache_hit_replays_blocks(self):
+        cache = self._bundle_cache()
+        genesis_hash = self._genesis_hash()
+        self._create_init_blocks(genesis_frontier=genesis_hash, bundle_cache=cache)
+        asyncio.run(self.init_blocks.publish_initial_blocks())
+        generated = self.processed
+        key = self.init_blocks.get_bundle_key()
+        mtime = os.path.getmtime(cache.get_path(key))
+
+        # a new init of the same config replays the cached blocks
+        self._create_init_blocks(genesis_frontier=genesis_hash, bundle_cache=cache)
+
+        async def no_build(*args, **kwargs):
+            raise AssertionError("cached blocks expected")
+
+        self.init_blocks.build_initial_blocks = no_build
+        asyncio.run(self.init_blocks.publish_initial_blocks())
+        # the replayed epoch blocks still log the difficulty
+        self.assertEqual(self.difficulty_logs, 4)
+        self.assertEqual(sorted(block["signature"] for block in self.processed),
+                         sorted(block["signature"] for block in generated))
+        self.assertEqual(len(os.listdir(cache.cache_dir)), 1)
+        self.assertGreaterEqual(os.path.getmtime(cache.get_path(key)), mtime)
+
+    def test_bundle_cache_skipped_beyond_genesis(self):
+        # blocks beyond genesis : nothing is read from or written to the cache
+        cache = self._bundle_cache()
+        self._create_init_blocks(bundle_cache=cache)
+        asyncio.run(self.init_blocks.publish_initial_blocks())
+        self.assertEqual(self.processed[0]["previous"], GENESIS_FRONTIER)
+        self.assertEqual(os.listdir(cache.cache_dir), [])
+
+    def test_bundle_difficulty_compared_as_numbers(self):
+        # "0xFF00..." is the highest threshold, as a string it sorts below "0xf000..."
+        self.conf_p.get_all()["NANO_TEST_EPOCH_2"] = "0xFF00000000000000"
+        self.conf_p.get_all()["NANO_TEST_EPOCH_2_RECV"] = "0xf000000000000000"
+        key = self.init_blocks.get_bundle_key()
+        self.conf_p.get_all()["NANO_TEST_EPOCH_2_RECV"] = "0x0000000000000001"
+        self.assertEqual(self.init_blocks.get_bundle_key(), key)
+        self.conf_p.get_all()["NANO_TEST_EPOCH_2"] = "0xff00000000000001"
+        self.assertNotEqual(self.init_blocks.get_bundle_key(), key)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import json
+import os
+import tempfile
+from nanomock.modules.nl_latency import LatencyTracker, percentile
+from nanomock.modules.nl_websocket import ConfirmationSubscriber
+from nanomock.modules.nl_nanolib import NanoLibTools
+
+REPRESENTATIVE = "nano_1111111111111111111111111111111111111111111111111111hifc8npp"
+
+
+class TestLatencyTracker(unittest.TestCase):
+
+    def setUp(self):
+        subscriber = ConfirmationSubscriber({
+            "node_1": "ws://127.0.0.1:47900",
+            "node_2": "ws://127.0.0.1:47901"
+        })
+        self.tracker = LatencyTracker(subscriber)
+        account = NanoLibTools().nanolib_account_data(seed="0" * 64, index=0)
+        self.json_block = {
+            "type": "state",
+            "account": account["account"],
+            "previous": "0" * 64,
+            "representative": REPRESENTATIVE,
+            "balance": "1",
+            "link": "AB" * 32,
+            "subtype": "open"
+        }
+        self.block_hash = NanoLibTools().get_block_hash(self.json_block)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertIsNone(percentile([], 50))
+
+    def test_report(self):
+        self.tracker.mark_published(self.block_hash, 100.0)
+        self.tracker._on_message("node_1", "new_unconfirmed_block", self.json_block, 100.010)
+        self.tracker._on_message("node_2", "new_unconfirmed_block", self.json_block, 100.020)
+        self.tracker._on_confirmation("node_1", {"hash": self.block_hash}, 100.200)
+        self.tracker._on_confirmation("node_2", {"hash": self.block_hash}, 100.300)
+        self.tracker.mark_published("F" * 64, 100.0)
+
+        report = self.tracker.report()
+
+        self.assertEqual(report["blocks_published"], 2)
+        self.assertEqual(report["nodes"]["node_1"]["seen"]["p50_ms"], 10.0)
+        self.assertEqual(report["nodes"]["node_2"]["confirmed"]["p99_ms"], 300.0)
+        self.assertEqual(report["network"]["first_confirmed"]["p50_ms"], 200.0)
+        self.assertEqual(report["network"]["all_confirmed"]["p50_ms"], 300.0)
+        self.assertEqual(report["network"]["unconfirmed"], 1)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "latency.json")
+            self.tracker.write_results(path)
+            with open(path, "r", encoding="utf-8") as f:
+                self.assertEqual(json.load(f), report)
+
+    def test_records_tracked_blocks_only(self):
+        self.tracker._on_confirmation("node_1", {"hash": self.block_hash}, 100.200)
+        self.tracker._on_message("node_1", "new_unconfirmed_block", self.json_block, 100.010)
+        self.assertEqual((self.tracker.seen, self.tracker.confirmed), ({}, {}))
+
+        # seen before the process call returned
+        self.tracker.track(self.block_hash)
+        self.tracker._on_message("node_1", "new_unconfirmed_block", self.json_block, 100.010)
+        self.tracker._on_confirmation("node_1", {"hash": "F" * 64}, 100.200)
+        self.tracker.mark_published(self.block_hash, 100.0)
+        self.assertEqual(list(self.tracker.seen), [self.block_hash])
+        self.assertEqual(self.tracker.confirmed, {})
+        self.assertEqual(self.tracker.report()["nodes"]["node_1"]["seen"]["p50_ms"], 10.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import os
+import tempfile
+from pathlib import Path
+from nanomock.modules.nl_ledger_snapshot import snapshot_ledgers, restore_ledgers, get_node_dir
+
+
+class TestLedgerSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.nodes_path = Path(self.tmp_dir.name) / "nano_nodes"
+        self.snapshot_path = Path(self.tmp_dir.name) / "nano_snapshots" / "default"
+        self.node_names = ["genesis", "pr1"]
+        for node_name in self.node_names:
+            node_dir = get_node_dir(self.nodes_path, node_name)
+            (node_dir / "rocksdb").mkdir(parents=True)
+            (node_dir / "data.ldb").write_bytes(b"ledger " + node_name.encode())
+            (node_dir / "wallets.ldb").write_bytes(b"wallets")
+            (node_dir / "rocksdb" / "000001.sst").write_bytes(b"table")
+            (node_dir / "rocksdb" / "MANIFEST-000001").write_bytes(b"manifest")
+            (node_dir / "config-node.toml").write_text("kept")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_snapshot_and_restore(self):
+        stats = snapshot_ledgers(self.nodes_path, self.snapshot_path, self.node_names)
+        self.assertEqual(stats["files"], 8)
+        self.assertEqual(stats["reflink"] + stats["hardlink"] + stats["copy"], 8)
+        self.assertFalse((self.snapshot_path / "genesis" / "config-node.toml").exists())
+
+        node_dir = get_node_dir(self.nodes_path, "genesis")
+        # the node keeps writing after the snapshot
+        (node_dir / "data.ldb").write_bytes(b"changed")
+        (node_dir / "rocksdb" / "000002.sst").write_bytes(b"new table")
+
+        restore_ledgers(self.snapshot_path, self.nodes_path, self.node_names)
+
+        self.assertEqual((node_dir / "data.ldb").read_bytes(), b"ledger genesis")
+        self.assertFalse((node_dir / "rocksdb" / "000002.sst").exists())
+        self.assertEqual((node_dir / "config-node.toml").read_text(), "kept")
+        self.assertEqual((self.snapshot_path / "genesis" / "data.ldb").read_bytes(), b"ledger genesis")
+
+    def test_ledger_is_never_hardlinked(self):
+        snapshot_ledgers(self.nodes_path, self.snapshot_path, self.node_names)
+        source = get_node_dir(self.nodes_path, "pr1") / "data.ldb"
+        self.assertNotEqual(os.stat(source).st_ino,
+                            os.stat(self.snapshot_path / "pr1" / "data.ldb").st_ino)
+
+    def test_restore_missing_node(self):
+        snapshot_ledgers(self.nodes_path, self.snapshot_path, ["genesis"])
+        with self.assertRaises(ValueError):
+            restore_ledgers(self.snapshot_path, self.nodes_path, self.node_names)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+import os
+import tempfile
+from nanomock.modules.nl_nanolib import NanoLibTools, _expand_private_key
+from nanomock.modules.nl_keystore import KeyStore
+
+SEED = "1110000000000000000000000000000000000000000000000000000000000001"
+
+
+class TestKeyDerivation(unittest.TestCase):
+
+    def test_cached_derivation_returns_fresh_dicts(self):
+        nano_lib = NanoLibTools()
+        account_data = nano_lib.nanolib_account_data(seed=SEED, index=0)
+        account_data["mutated"] = True
+        hits_before = _expand_private_key.cache_info().hits
+
+        account_data_2 = nano_lib.nanolib_account_data(seed=SEED, index=0)
+
+        self.assertEqual(account_data_2["account"],
+                         "nano_1ge7edbt774uw7z8exomwiu19rd14io1nocyin5jwpiit3133p9eaaxn74ub")
+        self.assertNotIn("mutated", account_data_2)
+        self.assertGreater(_expand_private_key.cache_info().hits, hits_before)
+
+    def test_keystore_roundtrip(self):
+        expected = NanoLibTools().nanolib_account_data(seed=SEED, index=3)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "keys.sqlite")
+            with KeyStore(path, flush_every=2) as keystore:
+                NanoLibTools(keystore=keystore).nanolib_account_data(seed=SEED, index=3)
+
+            with KeyStore(path) as keystore:
+                self.assertEqual(keystore.get(SEED, 3), expected)
+                self.assertIsNone(keystore.get(SEED, 4))
+                self.assertEqual(
+                    NanoLibTools(keystore=keystore).nanolib_account_data(seed=SEED, index=3),
+                    expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import gzip
+import io
+import os
+import tarfile
+import tempfile
+from pathlib import Path
+from nanomock.modules.nl_network_archive import ParallelGzipWriter, PipelinedGzipReader, export_network, import_network, _EOF
+
+
+class TestNetworkArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_path = Path(self.tmp_dir.name)
+        self.nodes_path = self.tmp_path / "nano_nodes"
+        (self.nodes_path / "genesis" / "NanoTest").mkdir(parents=True)
+        (self.nodes_path / "docker-compose.yml").write_text("services: {}")
+        (self.nodes_path / "dc_nano_local_env").write_text("NANO_TEST_EPOCH_1=0x000000000000000f")
+        (self.nodes_path / "genesis" / "NanoTest" / "data.ldb").write_bytes(os.urandom(300_000))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_parallel_gzip_round_trip(self):
+        data = os.urandom(50_000) + b"a" * 100_000
+        out = io.BytesIO()
+        with ParallelGzipWriter(out, chunk_size=7_000, max_workers=4) as writer:
+            for i in range(0, len(data), 3_000):
+                writer.write(data[i:i + 3_000])
+
+        # one gzip member per chunk, readable by the standard gzip module
+        self.assertEqual(gzip.decompress(out.getvalue()), data)
+        out.seek(0)
+        reader = PipelinedGzipReader(out, read_size=1_000)
+        self.assertEqual(reader.read(10) + reader.read(), data)
+
+    def test_decompressed_chunks_are_bounded(self):
+        # 20MB of zeros compress to a few KB, a single read must not expand them at once
+        data = gzip.compress(b"\0" * 20_000_000)
+        with PipelinedGzipReader(io.BytesIO(data), read_size=64_000) as reader:
+            sizes = []
+            while True:
+                chunk = reader._chunks.get()
+                if chunk is _EOF:
+                    break
+                sizes.append(len(chunk))
+        self.assertEqual(sum(sizes), 20_000_000)
+        self.assertLessEqual(max(sizes), 64_000)
+
+    def test_close_stops_reading_ahead(self):
+        data = gzip.compress(os.urandom(2_000_000), compresslevel=1)
+        reader = PipelinedGzipReader(io.BytesIO(data), read_size=1_000, max_chunks=2)
+        self.assertEqual(len(reader.read(10)), 10)
+        reader.close()
+        self.assertFalse(reader._thread.is_alive())
+        self.assertEqual(reader.read(), b"")
+
+    def test_export_import(self):
+        archive = self.tmp_path / "network.tar.gz"
+        stats = export_network(self.nodes_path, archive, max_workers=2)
+        self.assertGreater(stats["bytes"], 300_000)
+        with tarfile.open(archive, "r:gz") as tar:
+            self.assertIn("nano_nodes/genesis/NanoTest/data.ldb", tar.getnames())
+
+        target = self.tmp_path / "imported"
+        stats = import_network(archive, target)
+        self.assertEqual(stats["files"], 3)
+        for name in ["docker-compose.yml", "dc_nano_local_env", "genesis/NanoTest/data.ldb"]:
+            self.assertEqual((target / name).read_bytes(), (self.nodes_path / name).read_bytes())
+
+    def test_import_into_existing_network(self):
+        archive = self.tmp_path / "network.tar.gz"
+        export_network(self.nodes_path, archive)
+        with self.assertRaises(ValueError):
+            import_network(archive, self.nodes_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+import asyncio
+import json
+import os
+import tempfile
+import time
+from nanomock.modules.nl_replay import ReplayEngine, iter_corpus, merge_replay_stats
+
+
+class MockNodeRpc:
+
+    def __init__(self, name, calls):
+        self.name = name
+        self.calls = calls
+
+    async def process(self, block, json_block=True, async_=None):
+        self.calls.append((self.name, block["account"], block["balance"]))
+        await asyncio.sleep(0.002)
+        return {"hash": block["hash"]}
+
+
+class TestReplayEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.blocks = []
+        for i in range(30):
+            account = f"nano_account_{i % 6}"
+            # balance encodes the position of the block within its account
+            self.blocks.append((f"{i:064X}", {
+                "account": account,
+                "balance": str(i // 6),
+                "hash": f"{i:064X}"
+            }))
+
+    def test_rate_order_and_spread(self):
+        calls = []
+        engine = ReplayEngine([MockNodeRpc("node_1", calls), MockNodeRpc("node_2", calls)],
+                              bps=300, max_in_flight=8)
+        start = time.monotonic()
+        stats = asyncio.run(engine.replay(iter(self.blocks)))
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(stats["blocks"], 30)
+        self.assertEqual(stats["published"], 30)
+        self.assertGreaterEqual(elapsed, 29 / 300)
+        self.assertEqual({node for node, _, _ in calls}, {"node_1", "node_2"})
+
+        nodes_by_account = {}
+        balances_by_account = {}
+        for node, account, balance in calls:
+            self.assertEqual(nodes_by_account.setdefault(account, node), node)
+            balances_by_account.setdefault(account, []).append(int(balance))
+        for balances in balances_by_account.values():
+            self.assertEqual(balances, sorted(balances))
+
+    def test_shards_split_accounts(self):
+        seen = []
+        for shard in range(3):
+            calls = []
+            engine = ReplayEngine([MockNodeRpc("node_1", calls)], bps=10000)
+            stats = asyncio.run(engine.replay(iter(self.blocks), shard=shard, shards=3))
+            seen.extend(calls)
+            self.assertEqual(stats["blocks"], len(calls))
+        self.assertEqual(len(seen), 30)
+
+    def test_every_shard_spreads_over_all_nodes(self):
+        # 4 workers and 4 nodes share a factor : each worker must still reach every node
+        blocks = [(f"{i:064X}", {"account": f"nano_account_{i}", "balance": "0", "hash": f"{i:064X}"})
+                  for i in range(200)]
+        for shard in range(4):
+            calls = []
+            engine = ReplayEngine([MockNodeRpc(f"node_{n}", calls) for n in range(4)], bps=100000)
+            asyncio.run(engine.replay(iter(blocks), shard=shard, shards=4))
+            self.assertEqual({node for node, _, _ in calls}, {f"node_{n}" for n in range(4)})
+
+    def test_cancelled_replay(self):
+
+        async def run():
+            calls = []
+            engine = ReplayEngine([MockNodeRpc("node_1", calls)], bps=10000, max_in_flight=30)
+            task = asyncio.create_task(engine.replay(iter(self.blocks)))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            # done callbacks of the cancelled publishes run on the next iterations
+            await asyncio.sleep(0.01)
+
+        loop = asyncio.new_event_loop()
+        errors = []
+        loop.set_exception_handler(lambda _, context: errors.append(context))
+        try:
+            loop.run_until_complete(run())
+        finally:
+            loop.close()
+        self.assertEqual(errors, [])
+
+    def test_merge_stats(self):
+        stats = merge_replay_stats([
+            {"blocks": 10, "published": 9, "errors": 1, "attempts": 12, "started_at": 100.0, "finished_at": 101.0},
+            {"blocks": 10, "published": 10, "errors": 0, "attempts": 10, "started_at": 100.5, "finished_at": 102.0},
+        ], 10)
+        self.assertEqual(stats["elapsed_s"], 2.0)
+        self.assertEqual(stats["achieved_bps"], 9.5)
+        self.assertEqual(stats["error_rate"], 0.05)
+
+    def test_iter_jsonl_corpus(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "blocks.jsonl")
+            with open(path, "w", encoding="utf-8") as f:
+                for block_hash, block in self.blocks[:3]:
+                    f.write(json.dumps({"h": block_hash, "b": block}) + "\n")
+            self.assertEqual(list(iter_corpus(path)), self.blocks[:3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import unittest
+import asyncio
+from nanomock.modules.nl_rpc import NanoRpc
+from nanomock.modules.nl_rpc_utils import DifficultyCache
+from nanomock.modules.nl_frontier_store import FrontierStore
+
+REPRESENTATIVE = "nano_1111111111111111111111111111111111111111111111111111hifc8npp"
+SEED = "0" * 64
+
+
+async def _no_rpc(*args, **kwargs):
+    raise AssertionError("no rpc call expected in offline mode")
+
+
+class TestOfflineBlockCreation(unittest.TestCase):
+
+    def setUp(self):
+        self.nano_rpc = NanoRpc("http://127.0.0.1:45900", offline=True)
+        self.nano_rpc.set_offline_difficulty("0000000000000000")
+        self.nano_rpc.account_info = _no_rpc
+        self.nano_rpc.active_difficulty = _no_rpc
+        self.nano_rpc.block_create = _no_rpc
+
+    def test_open_then_send_without_rpc(self):
+
+        async def create_blocks():
+            open_block = await self.nano_rpc.create_block(
+                "receive",
+                source_seed=SEED,
+                source_index=0,
+                representative=REPRESENTATIVE,
+                amount_raw=5,
+                link="CD" * 32)
+            destination = self.nano_rpc.nano_lib.nanolib_account_data(
+                seed=SEED, index=1)["account"]
+            send_block = await self.nano_rpc.create_block(
+                "send",
+                source_seed=SEED,
+                source_index=0,
+                destination_account=destination,
+                amount_raw=2)
+            return open_block, send_block
+
+        open_block, send_block = asyncio.run(create_blocks())
+
+        self.assertEqual(open_block["subtype"], "open")
+        self.assertTrue(send_block["success"])
+        self.assertEqual(send_block["block"]["previous"], open_block["hash"])
+        self.assertEqual(send_block["block"]["balance"], "3")
+
+    def test_send_from_unknown_account_fails(self):
+        block = asyncio.run(
+            self.nano_rpc.create_block("send",
+                                       source_seed=SEED,
+                                       source_index=7,
+                                       destination_account=REPRESENTATIVE,
+                                       amount_raw=1))
+        self.assertFalse(block["success"])
+        self.assertIn("unknown to the local frontier store", block["error"])
+
+    def test_receive_on_evicted_account_fails(self):
+        nano_rpc = NanoRpc("http://127.0.0.1:45900", offline=True,
+                           frontier_store=FrontierStore(max_accounts=1))
+        nano_rpc.set_offline_difficulty("0000000000000000")
+
+        async def create_blocks():
+            blocks = []
+            # opening account 1 evicts the already opened account 0
+            for index in (0, 1, 0):
+                blocks.append(await nano_rpc.create_block(
+                    "receive",
+                    source_seed=SEED,
+                    source_index=index,
+                    representative=REPRESENTATIVE,
+                    amount_raw=5,
+                    link="CD" * 32))
+            return blocks
+
+        first_open, _, receive = asyncio.run(create_blocks())
+
+        self.assertEqual(first_open["subtype"], "open")
+        self.assertEqual(nano_rpc.frontier_store.evicted, 1)
+        # a second open of account 0 would fork its chain
+        self.assertFalse(receive["success"])
+        self.assertIn("unknown to the local frontier store", receive["error"])
+
+
+class TestCheckBalances(unittest.TestCase):
+
+    def test_chunked_bulk_balances(self):
+        nano_rpc = NanoRpc("http://127.0.0.1:45900")
+        calls = []
+
+        async def accounts_balances(accounts, include_only_confirmed=None):
+            calls.append(accounts)
+            # every second account is unopened
+            return {
+                "balances": {
+                    account: {"balance": "1000000000000000000000000000000", "pending": "0"}
+                    for account in accounts[::2]
+                }
+            }
+
+        nano_rpc.accounts_balances = accounts_balances
+        balances = asyncio.run(
+            nano_rpc.check_balances(SEED, start_index=0, end_index=9, chunk_size=4))
+
+        self.assertEqual([len(chunk) for chunk in calls], [4, 4, 2])
+        self.assertEqual(len(balances), 10)
+        self.assertEqual(
+            balances[0]["account"],
+            nano_rpc.nano_lib.nanolib_account_data(seed=SEED, index=0)["account"])
+        self.assertEqual(balances[0]["balance"], "1.00000000")
+        self.assertEqual(balances[1]["balance_raw"], 0)
+
+    def test_rpc_failure_is_not_reported_as_zero(self):
+        nano_rpc = NanoRpc("http://127.0.0.1:45900")
+
+        for failed_response in (None, {"error": "Unable to parse JSON"}):
+
+            async def accounts_balances(accounts, include_only_confirmed=None,
+                                        response=failed_response):
+                return response
+
+            nano_rpc.accounts_balances = accounts_balances
+            with self.assertRaisesRegex(ValueError, "accounts_balances failed"):
+                asyncio.run(nano_rpc.check_balances(SEED, start_index=0, end_index=3))
+
+
+class TestDifficultyCache(unittest.TestCase):
+
+    def test_fetch_once_within_ttl(self):
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            return {"network_minimum": "fffffff800000000"}
+
+        cache = DifficultyCache(fetch, ttl_s=60)
+
+        async def get_many():
+            return await asyncio.gather(*(cache.get() for _ in range(10)))
+
+        results = asyncio.run(get_many())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results[0]["network_minimum"], "fffffff800000000")
+
+        cache.invalidate()
+        asyncio.run(cache.get())
+        self.assertEqual(len(calls), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
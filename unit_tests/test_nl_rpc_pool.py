@@ -0,0 +1,92 @@
+import unittest
+import asyncio
+import threading
+from nanomock.modules.nl_rpc_pool import NanoRpcRegistry
+
+
+class TestNanoRpcRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = NanoRpcRegistry(pool_size=4, idle_timeout=5)
+
+    def test_one_client_per_url(self):
+        rpc_1 = self.registry.get("http://127.0.0.1:45900")
+        rpc_2 = self.registry.get("http://127.0.0.1:45900")
+        rpc_3 = self.registry.get("http://127.0.0.1:45901")
+
+        self.assertIs(rpc_1, rpc_2)
+        self.assertIsNot(rpc_1, rpc_3)
+        self.assertIs(rpc_1.session_pool, rpc_3.session_pool)
+
+    def test_session_reused_within_loop(self):
+
+        async def get_sessions():
+            pool = self.registry.session_pool
+            session_1 = pool.get_session("http://127.0.0.1:45900")
+            session_2 = pool.get_session("http://127.0.0.1:45900")
+            connector_limit = session_1.connector.limit
+            await self.registry.close()
+            return session_1, session_2, connector_limit
+
+        session_1, session_2, connector_limit = asyncio.run(get_sessions())
+        self.assertIs(session_1, session_2)
+        self.assertEqual(connector_limit, 4)
+        self.assertTrue(session_1.closed)
+
+    def test_session_recreated_for_new_loop(self):
+
+        async def get_session():
+            session = self.registry.session_pool.get_session(
+                "http://127.0.0.1:45900")
+            await self.registry.close()
+            return session
+
+        self.assertIsNot(asyncio.run(get_session()),
+                         asyncio.run(get_session()))
+
+    def test_stale_session_closed_when_replaced(self):
+        pool = self.registry.session_pool
+
+        async def get_session():
+            return pool.get_session("http://127.0.0.1:45900")
+
+        stale_session = asyncio.run(get_session())
+        self.assertFalse(stale_session.closed)
+        asyncio.run(get_session())
+        self.assertTrue(stale_session.closed)
+        self.assertIsNone(stale_session.connector)
+
+    def test_close_discards_sessions_of_other_loops(self):
+        pool = self.registry.session_pool
+
+        async def get_session():
+            return pool.get_session("http://127.0.0.1:45901")
+
+        stale_session = asyncio.run(get_session())
+        asyncio.run(self.registry.close())
+        self.assertTrue(stale_session.closed)
+
+    def test_session_of_running_loop_closed_in_its_loop(self):
+        pool = self.registry.session_pool
+        other_loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=other_loop.run_forever)
+        thread.start()
+
+        async def get_session():
+            return pool.get_session("http://127.0.0.1:45900")
+
+        try:
+            other_session = asyncio.run_coroutine_threadsafe(get_session(),
+                                                             other_loop).result()
+            asyncio.run(get_session())
+            # the close was handed to the other loop, it is done once that loop ran it
+            asyncio.run_coroutine_threadsafe(asyncio.sleep(0), other_loop).result()
+            self.assertTrue(other_session.closed)
+        finally:
+            other_loop.call_soon_threadsafe(other_loop.stop)
+            thread.join()
+            other_loop.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
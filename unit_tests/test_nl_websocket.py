@@ -0,0 +1,120 @@
+import unittest
+import asyncio
+import json
+from aiohttp import web
+from nanomock.modules.nl_websocket import ConfirmationSubscriber
+from nanomock.internal.utils import logger
+
+HASH_1 = "A" * 64
+HASH_2 = "B" * 64
+
+
+class MockNodeWebSocket:
+    """Answers every confirmation subscription by confirming HASH_1 and HASH_2."""
+
+    def __init__(self):
+        self.subscriptions = []
+
+    async def handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for msg in ws:
+            payload = json.loads(msg.data)
+            self.subscriptions.append(payload)
+            for block_hash in (HASH_1, HASH_2):
+                await asyncio.sleep(0.01)
+                await ws.send_str(json.dumps({
+                    "topic": "confirmation",
+                    "time": "0",
+                    "message": {"account": "nano_x", "hash": block_hash}
+                }))
+        return ws
+
+
+class TestConfirmationSubscriber(unittest.TestCase):
+
+    def test_wait_for_confirmations(self):
+        node = MockNodeWebSocket()
+
+        async def run():
+            app = web.Application()
+            app.router.add_get("/", node.handle)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            port = runner.addresses[0][1]
+            nodes_ws = {
+                "node_1": f"ws://127.0.0.1:{port}",
+                "node_2": f"ws://127.0.0.1:{port}"
+            }
+            try:
+                async with ConfirmationSubscriber(nodes_ws, accounts=["nano_x"]) as subscriber:
+                    any_node = await subscriber.wait_for_confirmations([HASH_1], timeout=5)
+                    all_nodes = await subscriber.wait_for_confirmations(
+                        [HASH_1, HASH_2], nodes=["node_1", "node_2"], timeout=5)
+                    with self.assertRaises(asyncio.TimeoutError):
+                        await subscriber.wait_for_confirmations(["C" * 64], timeout=0.05)
+            finally:
+                await runner.cleanup()
+            return any_node, all_nodes
+
+        any_node, all_nodes = asyncio.run(run())
+
+        self.assertTrue(any_node[HASH_1])
+        self.assertEqual(set(all_nodes[HASH_2]), {"node_1", "node_2"})
+        self.assertEqual(node.subscriptions[0]["topic"], "confirmation")
+        self.assertEqual(node.subscriptions[0]["options"]["accounts"], ["nano_x"])
+
+    def test_bad_frames_and_lost_socket(self):
+
+        async def handle(request):
+            ws = web.WebSocketResponse()
+            await ws.prepare(request)
+            await ws.receive()  # subscription
+            await ws.send_str("not json")
+            for block_hash in (HASH_1, HASH_2):
+                await ws.send_str(json.dumps({
+                    "topic": "confirmation",
+                    "message": {"account": "nano_x", "hash": block_hash}
+                }))
+            await asyncio.sleep(0.05)
+            await ws.close()
+            return ws
+
+        def failing_listener(node_name, message, received_at):
+            if message["hash"] == HASH_1:
+                raise ValueError("listener bug")
+
+        async def run():
+            app = web.Application()
+            app.router.add_get("/", handle)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            port = runner.addresses[0][1]
+            try:
+                async with ConfirmationSubscriber({"node_1": f"ws://127.0.0.1:{port}"}) as subscriber:
+                    subscriber.add_listener(failing_listener)
+                    confirmed = await subscriber.wait_for_confirmations([HASH_1, HASH_2],
+                                                                        timeout=5)
+                    with self.assertRaises(ConnectionError):
+                        await subscriber.wait_for_confirmations(["C" * 64], timeout=5)
+                    # the socket is known to be gone, no need to wait at all
+                    with self.assertRaises(ConnectionError):
+                        await subscriber.wait_for_confirmations(["D" * 64], timeout=5)
+            finally:
+                await runner.cleanup()
+            return confirmed
+
+        with self.assertLogs(logger, level="WARNING") as logs:
+            confirmed = asyncio.run(run())
+
+        self.assertEqual(set(confirmed), {HASH_1, HASH_2})
+        self.assertTrue(any("malformed json" in line for line in logs.output))
+        self.assertTrue(any("listener failed" in line for line in logs.output))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import asyncio
+from nanomock.modules.nl_work_cache import WorkCache
+from nanomock.modules.nl_rpc import NanoRpc
+
+LOW_DIFFICULTY = "0000000000000000"
+WORK_HASH = "AB" * 32
+
+
+class TestWorkCache(unittest.TestCase):
+
+    def test_precompute_then_get(self):
+
+        async def run():
+            cache = WorkCache()
+            cache.precompute(WORK_HASH, LOW_DIFFICULTY)
+            self.assertIn(WORK_HASH, cache)
+            work = await cache.get(WORK_HASH, LOW_DIFFICULTY)
+            return cache, work
+
+        cache, work = asyncio.run(run())
+        self.assertEqual(len(work), 16)
+        self.assertEqual(len(cache), 0)  # entries are consumed
+
+    def test_work_below_difficulty_is_ignored(self):
+        cache = WorkCache()
+        cache.put(WORK_HASH, "0000000000000000")
+        self.assertIsNone(
+            asyncio.run(cache.get(WORK_HASH, "ffffffffffffffff")))
+
+    def test_lru_eviction(self):
+        cache = WorkCache(max_entries=2)
+        for i in range(3):
+            cache.put(f"{i:064X}", "0000000000000000")
+        self.assertEqual(len(cache), 2)
+        self.assertNotIn(f"{0:064X}", cache)
+
+    def test_chained_blocks_use_precomputed_work(self):
+        work_cache = WorkCache()
+        nano_rpc = NanoRpc("http://127.0.0.1:45900",
+                           offline=True,
+                           work_cache=work_cache)
+        nano_rpc.set_offline_difficulty(LOW_DIFFICULTY)
+        representative = "nano_1111111111111111111111111111111111111111111111111111hifc8npp"
+
+        async def run():
+            open_block = await nano_rpc.create_block("receive",
+                                                     source_seed="0" * 64,
+                                                     source_index=0,
+                                                     representative=representative,
+                                                     amount_raw=10,
+                                                     link="CD" * 32)
+            pending_work = open_block["hash"] in work_cache
+            await asyncio.sleep(0.1)
+            precomputed_work = work_cache._works.get(open_block["hash"])
+            send_block = await nano_rpc.create_block("send",
+                                                     source_seed="0" * 64,
+                                                     source_index=0,
+                                                     destination_account=representative,
+                                                     amount_raw=1)
+            return pending_work, precomputed_work, send_block
+
+        pending_work, precomputed_work, send_block = asyncio.run(run())
+        self.assertTrue(pending_work)
+        self.assertTrue(send_block["success"])
+        self.assertEqual(send_block["block"]["work"], precomputed_work)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import asyncio
+from nanomock.modules.nl_work_engine import WorkEngine
+from nanomock.modules.nl_nanolib import NanoLibTools
+
+REPRESENTATIVE = "nano_1111111111111111111111111111111111111111111111111111hifc8npp"
+LOW_DIFFICULTY = "0000000000000000"
+
+
+class TestWorkEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = WorkEngine(max_workers=2, chunk_size=2)
+        self.nano_lib = NanoLibTools()
+
+    def tearDown(self):
+        self.engine.shutdown()
+
+    def _block_params(self, index):
+        account_data = self.nano_lib.nanolib_account_data(seed="0" * 64,
+                                                          index=index)
+        return {
+            "account": account_data["account"],
+            "representative": REPRESENTATIVE,
+            "previous": None,
+            "balance": index + 1,
+            "link": f"{index:064X}",
+            "key": account_data["private"],
+            "difficulty": LOW_DIFFICULTY
+        }
+
+    def test_blocks_in_submission_order(self):
+        params = [self._block_params(i) for i in range(5)]
+        blocks = asyncio.run(self.engine.create_state_blocks(params))
+
+        self.assertEqual([block.balance for block in blocks], [1, 2, 3, 4, 5])
+        for block, block_params in zip(blocks, params):
+            self.assertEqual(block.account, block_params["account"])
+            block.verify_signature()
+            block.verify_work(difficulty=LOW_DIFFICULTY)
+
+    def test_same_block_as_inline_creation(self):
+        block_params = self._block_params(0)
+        block = asyncio.run(self.engine.create_state_block(**block_params))
+        inline_block = self.nano_lib.create_state_block(**block_params)
+
+        self.assertEqual(block.block_hash, inline_block.block_hash)
+        self.assertEqual(block.signature, inline_block.signature)
+
+
+if __name__ == '__main__':
+    unittest.main()